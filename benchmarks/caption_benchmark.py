@@ -0,0 +1,86 @@
+"""
+Florence-2 캡션 생성 처리량/지연 시간 벤치마크 (CPU 기준)
+
+동시 요청 수 1, 4, 16에서 요청별 지연 시간(p50/p95)과 처리량(req/s)을 측정합니다.
+배치 설정은 CAPTION_MAX_BATCH_SIZE, CAPTION_MAX_WAIT_MS 환경 변수로 조정합니다.
+
+사용 예:
+    CUDA_VISIBLE_DEVICES= python benchmarks/caption_benchmark.py --requests 16
+    CAPTION_MAX_BATCH_SIZE=1 python benchmarks/caption_benchmark.py   # 배치 없이 비교
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import io
+import time
+import argparse
+import asyncio
+import statistics
+from PIL import Image
+from services.image_processing_service import ImageProcessingService
+
+
+def make_test_images(count: int, image_path: str = None) -> list:
+    """벤치마크용 이미지 바이트 목록 (경로가 없으면 단색 이미지 생성)"""
+    if image_path:
+        with open(image_path, "rb") as image_file:
+            return [image_file.read()] * count
+
+    images = []
+    for i in range(count):
+        buffer = io.BytesIO()
+        Image.new("RGB", (512, 512), ((i * 37) % 256, (i * 91) % 256, (i * 53) % 256)).save(buffer, "JPEG")
+        images.append(buffer.getvalue())
+    return images
+
+
+async def run_level(service: ImageProcessingService, images: list, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(image_data: bytes):
+        async with semaphore:
+            started = time.perf_counter()
+            result = await service.process_image_async(image_data)
+            latencies.append(time.perf_counter() - started)
+            if "error" in result:
+                raise RuntimeError(result["error"])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(image_data) for image_data in images))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(images),
+        "throughput_rps": len(images) / elapsed,
+        "p50_s": statistics.median(latencies),
+        "p95_s": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+async def main(args):
+    service = ImageProcessingService()
+    # 근사 중복 캐시 적중은 측정에서 제외
+    service.caption_cache.max_entries = 0
+    print(f"device={service.device}, max_batch_size={service.batcher.max_batch_size}, max_wait={service.batcher.max_wait * 1000:.0f}ms")
+
+    # 워밍업
+    await service.process_image_async(make_test_images(1, args.image)[0])
+
+    for concurrency in args.concurrency:
+        result = await run_level(service, make_test_images(args.requests, args.image), concurrency)
+        print(
+            f"concurrency={result['concurrency']:>2}  requests={result['requests']}  "
+            f"throughput={result['throughput_rps']:.3f} req/s  "
+            f"p50={result['p50_s']:.2f}s  p95={result['p95_s']:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Florence-2 caption benchmark")
+    parser.add_argument("--requests", type=int, default=16, help="동시성 단계별 요청 수")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--image", type=str, default=None, help="테스트에 사용할 이미지 경로")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,113 @@
+"""
+Florence-2 캡션 추론 프로필(quality / balanced / fast) 비교 벤치마크
+
+같은 이미지 집합에 대해 프로필별 요청 지연 시간(평균/p50/p95)과
+quality 프로필 캡션 대비 단어 겹침(token F1)을 측정합니다.
+
+사용 예:
+    CUDA_VISIBLE_DEVICES= python benchmarks/caption_profile_benchmark.py --images ./sample_images
+    CAPTION_FAST_MODEL=microsoft/Florence-2-base python benchmarks/caption_profile_benchmark.py --images ./sample_images
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import re
+import time
+import argparse
+import statistics
+from collections import Counter
+from services.image_processing_service import ImageProcessingService, CAPTION_PROFILES
+from benchmarks.caption_benchmark import make_test_images
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+def load_images(images_dir: str, limit: int) -> list:
+    """폴더의 이미지 바이트 목록 (폴더가 없으면 단색 이미지 생성)"""
+    if not images_dir:
+        return make_test_images(limit)
+
+    paths = sorted(
+        os.path.join(images_dir, name)
+        for name in os.listdir(images_dir)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )[:limit]
+    images = []
+    for path in paths:
+        with open(path, "rb") as image_file:
+            images.append(image_file.read())
+    return images
+
+
+def token_f1(candidate: str, reference: str) -> float:
+    """두 캡션의 단어 단위 F1 (겹치는 단어 비율)"""
+    candidate_tokens = Counter(re.findall(r"\w+", candidate.lower()))
+    reference_tokens = Counter(re.findall(r"\w+", reference.lower()))
+    overlap = sum((candidate_tokens & reference_tokens).values())
+    if overlap == 0:
+        return 0.0
+    precision = overlap / sum(candidate_tokens.values())
+    recall = overlap / sum(reference_tokens.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def run_profile(service: ImageProcessingService, images: list, profile: str) -> dict:
+    # 모델 로드/워밍업은 측정에서 제외
+    service.process_image(images[0], profile)
+
+    latencies, captions = [], []
+    for image_data in images:
+        started = time.perf_counter()
+        result = service.process_image(image_data, profile)
+        latencies.append(time.perf_counter() - started)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        captions.append(result["description"])
+
+    latencies.sort()
+    return {
+        "profile": profile,
+        "captions": captions,
+        "mean_s": statistics.mean(latencies),
+        "p50_s": statistics.median(latencies),
+        "p95_s": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+def main(args):
+    service = ImageProcessingService()
+    # 근사 중복 캐시 적중은 측정에서 제외
+    service.caption_cache.max_entries = 0
+    images = load_images(args.images, args.limit)
+    print(f"device={service.device}, images={len(images)}, fast_model={CAPTION_PROFILES['fast']['model']}")
+
+    results = {profile: run_profile(service, images, profile) for profile in args.profiles}
+    reference = results.get("quality")
+
+    for profile, result in results.items():
+        line = (
+            f"{profile:>8}  mean={result['mean_s']:.2f}s  "
+            f"p50={result['p50_s']:.2f}s  p95={result['p95_s']:.2f}s"
+        )
+        if reference is not None and profile != "quality":
+            overlap = statistics.mean(
+                token_f1(candidate, expected)
+                for candidate, expected in zip(result["captions"], reference["captions"])
+            )
+            line += f"  token_f1_vs_quality={overlap:.3f}"
+        print(line)
+
+    if args.show_captions:
+        for index in range(len(images)):
+            print(f"\n[{index}]")
+            for profile, result in results.items():
+                print(f"  {profile:>8}: {result['captions'][index]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Florence-2 caption profile benchmark")
+    parser.add_argument("--images", type=str, default=None, help="테스트 이미지 폴더")
+    parser.add_argument("--limit", type=int, default=8, help="사용할 최대 이미지 수")
+    parser.add_argument("--profiles", nargs="+", default=list(CAPTION_PROFILES), choices=list(CAPTION_PROFILES))
+    parser.add_argument("--show-captions", action="store_true", help="프로필별 캡션 출력")
+    main(parser.parse_args())
@@ -0,0 +1,101 @@
+"""
+디퓨저 벡터 검색 지연 시간 벤치마크: Chroma 쿼리 vs 메모리 인덱스(DiffuserIndex)
+
+- chroma: 기존 방식 (PersistentClient 컬렉션에 query, n_results=k)
+- memory: 정규화된 NumPy 행렬 내적 + top-k (필터 없음 / 브랜드 pre-filter)
+- --model 옵션을 주면 KLUE-SRoBERTa 쿼리 임베딩 시간(캐시 미적중)과 쿼리 캐시 적중 시 전체 검색 시간도 측정합니다.
+
+임베딩은 브랜드별 군집이 있는 임의 벡터를 사용하므로 chromadb와 모델 없이도 실행할 수 있습니다.
+
+사용 예:
+    python benchmarks/diffuser_search_benchmark.py --diffusers 500 --queries 200
+    python benchmarks/diffuser_search_benchmark.py --model
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import time
+import argparse
+import tempfile
+import statistics
+import numpy as np
+from services.diffuser_index import DiffuserIndex, chromadb, embed_texts
+
+
+def make_data(args):
+    rng = np.random.default_rng(0)
+    brands = [f"brand{i}" for i in range(args.brands)]
+    centers = rng.normal(size=(len(brands), args.dimension))
+    brand_ids = rng.integers(0, len(brands), args.diffusers)
+    embeddings = (centers[brand_ids] + 0.5 * rng.normal(size=(args.diffusers, args.dimension))).astype(np.float32)
+    metadatas = [
+        {"id": i, "name_kr": f"디퓨저 {i}", "brand": brands[b], "category_id": int(rng.integers(1, 6)), "scent_description": "향 설명"}
+        for i, b in enumerate(brand_ids)
+    ]
+    queries = embeddings[rng.integers(0, args.diffusers, args.queries)] + 0.3 * rng.normal(size=(args.queries, args.dimension))
+    return metadatas, embeddings, queries.astype(np.float32)
+
+
+def timed(function, items) -> dict:
+    latencies = []
+    for item in items:
+        started = time.perf_counter()
+        function(item)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+    }
+
+
+def report(name: str, result: dict) -> None:
+    print(f"{name:<32} p50={result['p50_ms']:8.3f}ms p95={result['p95_ms']:8.3f}ms")
+
+
+def main(args):
+    metadatas, embeddings, queries = make_data(args)
+    print(f"diffusers={args.diffusers}, dimension={args.dimension}, queries={args.queries}, k={args.k}")
+
+    index = DiffuserIndex()
+    index.set_items(metadatas, embeddings)
+    report("memory", timed(lambda q: index.search_embedding(q, k=args.k), queries))
+    report("memory + brand filter", timed(lambda q: index.search_embedding(q, k=args.k, brands=["brand0"]), queries))
+    report("memory + category filter", timed(lambda q: index.search_embedding(q, k=args.k, category_ids=[1, 2]), queries))
+
+    if chromadb is None:
+        print("chromadb가 설치되어 있지 않아 Chroma 비교를 건너뜁니다.")
+    else:
+        with tempfile.TemporaryDirectory() as path:
+            client = chromadb.PersistentClient(path=path)
+            collection = client.get_or_create_collection(name="benchmark", embedding_function=None)
+            collection.add(
+                ids=[str(metadata["id"]) for metadata in metadatas],
+                embeddings=embeddings.tolist(),
+                metadatas=metadatas,
+            )
+            report("chroma", timed(lambda q: collection.query(query_embeddings=[q.tolist()], n_results=args.k), queries))
+            report("chroma + where brand", timed(
+                lambda q: collection.query(query_embeddings=[q.tolist()], n_results=args.k, where={"brand": "brand0"}), queries
+            ))
+
+    if args.model:
+        texts = [f"우디하고 따뜻한 분위기의 거실에 어울리는 향 {i}" for i in range(min(args.queries, 50))]
+        embed_texts(["warm up"])
+        report("query embedding (cache miss)", timed(lambda text: embed_texts([text]), texts))
+        for text in texts:
+            index.embed_query(text)
+        # 모델 임베딩 차원과 맞도록 인덱스를 실제 임베딩으로 교체
+        index.set_items(metadatas[:len(texts)], embed_texts(texts))
+        report("memory search (cache hit)", timed(lambda text: index.search(text, k=args.k), texts))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="diffuser vector search benchmark")
+    parser.add_argument("--diffusers", type=int, default=500)
+    parser.add_argument("--dimension", type=int, default=1024, help="KLUE-SRoBERTa-Large 임베딩 차원")
+    parser.add_argument("--brands", type=int, default=30)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--model", action="store_true", help="실제 KLUE-SRoBERTa 모델로 쿼리 임베딩/캐시 효과 측정")
+    main(parser.parse_args())
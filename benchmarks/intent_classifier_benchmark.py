@@ -0,0 +1,92 @@
+"""
+의도 분류 지연 시간 벤치마크: 로컬 분류기(KLUE-SRoBERTa 임베딩 + 로지스틱 회귀) vs GPT 의도 분류 호출
+
+- local: IntentClassifier.predict (문장 임베딩 + predict_proba)
+- gpt: LLMService.process_input과 같은 의도 분류 프롬프트로 GPTClient.generate_response 호출 (--gpt, OPENAI_API_KEY 필요)
+
+학습된 모델({INTENT_MODEL_DIR}/{task}.joblib)이 없으면 의도 로그로 임시 분류기를 학습해 측정합니다.
+
+사용 예:
+    python benchmarks/intent_classifier_benchmark.py --task chat_intent --queries 50
+    python benchmarks/intent_classifier_benchmark.py --gpt --queries 20
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import time
+import random
+import argparse
+import statistics
+from services.intent_classifier import INTENT_CLASSIFIERS, load_samples, train_classifier
+
+SAMPLE_INPUTS = [
+    "나 오늘 기분이 너무 우울해. 그래서 이런 기분을 떨쳐낼 수 있는 플로럴 계열의 향수를 추천해줘",
+    "향수를 추천받고 싶은데 뭐 좋은 거 있어?",
+    "오늘 날씨 어때?",
+    "출근할 때 입는 정장에 어울리는 향수 알려줘",
+    "거실에 둘 우디한 디퓨저 추천해줘",
+    "잠이 잘 오게 도와주는 향 있을까?",
+    "데이트 갈 때 뿌릴 달콤한 향수 추천해줘",
+    "안녕 반가워",
+]
+
+
+def timed(function, items) -> dict:
+    latencies = []
+    for item in items:
+        started = time.perf_counter()
+        function(item)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+    }
+
+
+def report(name: str, result: dict) -> None:
+    print(f"{name:<24} p50={result['p50_ms']:9.2f}ms p95={result['p95_ms']:9.2f}ms")
+
+
+def main(args):
+    intent_classifier = INTENT_CLASSIFIERS[args.task]
+    # 로컬 분류기가 확신하지 못해도 예측 시간을 재도록 threshold 무시
+    intent_classifier.threshold = 0.0
+
+    inputs = SAMPLE_INPUTS
+    if os.path.exists(intent_classifier.log_path):
+        texts, labels = load_samples(intent_classifier.log_path)
+        if not intent_classifier.loaded and len(set(labels)) >= 2:
+            print(f"학습된 모델이 없어 의도 로그 {len(texts)}개로 임시 분류기 학습")
+            intent_classifier.classifier = train_classifier(texts, labels)
+        inputs = [text.split("\n")[0].removeprefix("user_input: ") for text in texts] or SAMPLE_INPUTS
+    if not intent_classifier.loaded:
+        print("학습된 모델과 의도 로그가 없어 예시 문장으로 임시 분류기 학습")
+        intent_classifier.classifier = train_classifier(SAMPLE_INPUTS, ["1", "2", "2", "3", "4", "5", "1", "2"])
+
+    random.seed(0)
+    queries = [random.choice(inputs) for _ in range(args.queries)]
+    intent_classifier.predict("warm up", None)
+    report("local", timed(lambda text: intent_classifier.predict(text, None), queries))
+
+    if args.gpt:
+        from models.img_llm_client import GPTClient
+        from services.prompt_loader import PromptLoader
+
+        gpt_client = GPTClient(prompt_loader=PromptLoader(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "chat_prompt_template.json")))
+        report("gpt", timed(
+            lambda text: gpt_client.generate_response(
+                f"user_input: {text}\nimage_caption: None\n다음 사용자의 의도를 분류하세요.\n\n"
+                f"의도: (1) 향수 추천, (2) 일반 대화, (3) 패션 향수 추천, (4) 인테리어 기반 디퓨저 추천, (5) 테라피 목적 향수/디퓨저 추천"
+            ),
+            queries[:args.gpt_queries],
+        ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="intent classification latency benchmark")
+    parser.add_argument("--task", choices=sorted(INTENT_CLASSIFIERS), default="chat_intent")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--gpt", action="store_true", help="GPT 의도 분류 호출 지연 시간도 측정 (OPENAI_API_KEY 필요)")
+    parser.add_argument("--gpt-queries", type=int, default=10)
+    main(parser.parse_args())
@@ -0,0 +1,150 @@
+"""
+멀티 워커 배포 방식별 워커 메모리(RSS/PSS/USS) 비교 벤치마크
+
+- prefork: 마스터가 모델을 로드하고 gc.freeze() 후 워커를 fork (serve.py 방식, 가중치를 copy-on-write로 공유)
+- independent: 워커마다 모델을 따로 로드 (uvicorn --workers / gunicorn 기본 방식)
+
+각 워커는 추론을 한 번 실행한 뒤 모든 워커가 살아 있는 상태에서 /proc/self/smaps_rollup을 읽습니다.
+RSS는 공유 페이지를 워커마다 중복으로 세므로 실제 사용량은 PSS 합계(공유 페이지를 나누어 계산)로 비교합니다.
+
+사용 예:
+    python benchmarks/prefork_memory_benchmark.py --workers 4 --synthetic-mb 400
+    python benchmarks/prefork_memory_benchmark.py --workers 4 --convnext facebook/convnext-base-224 \
+        --sentence-transformers sentence-transformers/all-mpnet-base-v2
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gc
+import time
+import argparse
+import multiprocessing
+from services.model_registry import current_rss_bytes, load_convnext, load_sentence_transformer
+
+
+def memory_usage() -> dict:
+    """현재 프로세스의 RSS/PSS/USS/공유 메모리 (MB)"""
+    values = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[0].endswith(":") and parts[1].isdigit():
+                    values[parts[0][:-1]] = int(parts[1]) * 1024
+    except OSError:
+        rss = current_rss_bytes()
+        values = {"Rss": rss, "Pss": rss, "Private_Clean": rss}
+
+    to_mb = lambda value: value / 1024 / 1024
+    return {
+        "rss_mb": to_mb(values.get("Rss", 0)),
+        "pss_mb": to_mb(values.get("Pss", 0)),
+        "uss_mb": to_mb(values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)),
+        "shared_mb": to_mb(values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0)),
+    }
+
+
+def load_models(args) -> list:
+    import torch
+
+    models = []
+    if args.synthetic_mb:
+        # float32 Linear 층을 쌓아 지정한 크기의 가중치를 만듦 (모델 다운로드 없이 실행)
+        width = 1024
+        layers = max(1, int(args.synthetic_mb * 1024 * 1024 / (width * width * 4)))
+        model = torch.nn.Sequential(*[torch.nn.Linear(width, width) for _ in range(layers)])
+        model.eval()
+        models.append(("synthetic", model))
+    for name in args.convnext:
+        models.append(("convnext", load_convnext(name)))
+    for name in args.sentence_transformers:
+        models.append(("sentence_transformer", load_sentence_transformer(name)))
+    return models
+
+
+def run_inference(models: list) -> None:
+    import torch
+    from PIL import Image
+
+    with torch.inference_mode():
+        for kind, model in models:
+            if kind == "synthetic":
+                model(torch.randn(8, model[0].in_features))
+            elif kind == "convnext":
+                convnext, processor = model
+                convnext(**processor(images=[Image.new("RGB", (224, 224))], return_tensors="pt"))
+            else:
+                model.encode(["벤치마크 문장입니다."])
+
+
+def worker(args, models, barrier, results) -> None:
+    import torch
+
+    torch.set_num_threads(1)
+    started = time.perf_counter()
+    if models is None:
+        models = load_models(args)
+    load_seconds = time.perf_counter() - started
+
+    run_inference(models)
+    gc.collect()
+    # 모든 워커가 추론을 마치고 살아 있는 상태에서 측정 (PSS가 공유 페이지를 워커 수로 나누도록)
+    barrier.wait()
+    results.put({"pid": os.getpid(), "load_seconds": load_seconds, **memory_usage()})
+    barrier.wait()
+
+
+def run(mode: str, args) -> None:
+    context = multiprocessing.get_context("fork" if mode == "prefork" else "spawn")
+    barrier = context.Barrier(args.workers + 1)
+    results = context.Queue()
+
+    models = None
+    parent = None
+    if mode == "prefork":
+        started = time.perf_counter()
+        models = load_models(args)
+        print(f"[prefork] master load {time.perf_counter() - started:.1f}s")
+        gc.collect()
+        gc.freeze()
+
+    processes = [context.Process(target=worker, args=(args, models, barrier, results)) for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    if mode == "prefork":
+        parent = memory_usage()
+    rows = [results.get() for _ in processes]
+    barrier.wait()
+    for process in processes:
+        process.join()
+    if mode == "prefork":
+        gc.unfreeze()
+
+    print(f"[{mode}] workers={args.workers}")
+    for row in rows:
+        print(
+            f"  pid={row['pid']:>7} load={row['load_seconds']:6.1f}s rss={row['rss_mb']:8.1f}MB "
+            f"pss={row['pss_mb']:8.1f}MB uss={row['uss_mb']:8.1f}MB shared={row['shared_mb']:8.1f}MB"
+        )
+    total_pss = sum(row["pss_mb"] for row in rows) + (parent["pss_mb"] if parent else 0.0)
+    average_rss = sum(row["rss_mb"] for row in rows) / len(rows)
+    master = f" (master pss={parent['pss_mb']:.1f}MB 포함)" if parent else ""
+    print(f"  avg rss={average_rss:.1f}MB, total pss={total_pss:.1f}MB{master}")
+
+
+def main(args):
+    if not (args.synthetic_mb or args.convnext or args.sentence_transformers):
+        args.synthetic_mb = 400
+    for mode in args.modes:
+        run(mode, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="pre-fork worker memory benchmark")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", choices=["prefork", "independent"], default=["prefork", "independent"])
+    parser.add_argument("--synthetic-mb", type=float, default=0, help="임의 가중치 크기 (MB)")
+    parser.add_argument("--convnext", nargs="*", default=[], help="ConvNeXt 모델 id")
+    parser.add_argument("--sentence-transformers", nargs="*", default=[], help="SentenceTransformer 모델 id")
+    main(parser.parse_args())
@@ -0,0 +1,114 @@
+"""
+scentlens FAISS 인덱스 종류별 recall@k / 검색 지연 시간 / 메모리 비교 벤치마크
+
+정확한 검색(IndexFlatIP) 결과를 정답으로 두고 HNSW, IVF-Flat, IVF-PQ의
+recall@k, 쿼리당 지연 시간(p50/p95), 빌드 시간, 직렬화 크기를 측정합니다.
+
+임베딩은 저장된 scentlens 인덱스(SCENTLENS_INDEX_DIR/embeddings.npy)를 사용하며,
+없으면 --synthetic 옵션으로 군집 구조가 있는 임의 벡터를 생성합니다.
+
+사용 예:
+    python benchmarks/scentlens_index_benchmark.py --k 10
+    python benchmarks/scentlens_index_benchmark.py --synthetic 50000 --dimension 768 --nprobe 4 16 64
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import time
+import argparse
+import statistics
+import faiss
+import numpy as np
+from services.scentlens_index import IndexConfig, ScentlensIndexStore, apply_search_params, build_cpu_index
+
+
+def load_embeddings(args) -> np.ndarray:
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(max(1, args.synthetic // 50), args.dimension))
+        embeddings = centers[rng.integers(0, len(centers), args.synthetic)] + 0.3 * rng.normal(size=(args.synthetic, args.dimension))
+    else:
+        embeddings = np.load(ScentlensIndexStore().embeddings_path)
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def make_queries(embeddings: np.ndarray, count: int) -> np.ndarray:
+    """DB 벡터에 잡음을 더한 쿼리 (업로드 이미지가 상품 이미지와 비슷한 상황을 가정)"""
+    rng = np.random.default_rng(1)
+    queries = embeddings[rng.integers(0, len(embeddings), count)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+    return np.ascontiguousarray(queries / np.linalg.norm(queries, axis=1, keepdims=True), dtype=np.float32)
+
+
+def measure(index: faiss.Index, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        _, I = index.search(query.reshape(1, -1), k)
+        latencies.append(time.perf_counter() - started)
+        recalls.append(len(set(I[0]) & set(expected)) / k)
+
+    latencies.sort()
+    return {
+        f"recall@{k}": statistics.mean(recalls),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+    }
+
+
+def main(args):
+    faiss.omp_set_num_threads(args.threads)
+    embeddings = load_embeddings(args)
+    queries = make_queries(embeddings, args.queries)
+    print(f"vectors={len(embeddings)}, dimension={embeddings.shape[1]}, queries={len(queries)}, k={args.k}, threads={args.threads}")
+
+    exact = build_cpu_index(embeddings, IndexConfig("flat"))
+    _, truth = exact.search(queries, args.k)
+
+    # (이름, 빌드 설정, [(검색 파라미터 이름, 설정 목록)])
+    candidates = [("flat", IndexConfig("flat"), [])]
+    for m in args.hnsw_m:
+        candidates.append((f"hnsw M={m}", IndexConfig("hnsw", hnsw_m=m), [("efSearch", IndexConfig("hnsw", hnsw_m=m, ef_search=ef)) for ef in args.ef_search]))
+    candidates.append(("ivf_flat", IndexConfig("ivf_flat", nlist=args.nlist), [("nprobe", IndexConfig("ivf_flat", nlist=args.nlist, nprobe=n)) for n in args.nprobe]))
+    for pq_m in args.pq_m:
+        candidates.append((
+            f"ivf_pq m={pq_m}",
+            IndexConfig("ivf_pq", nlist=args.nlist, pq_m=pq_m),
+            [("nprobe", IndexConfig("ivf_pq", nlist=args.nlist, pq_m=pq_m, nprobe=n)) for n in args.nprobe],
+        ))
+
+    for name, build_config, search_configs in candidates:
+        started = time.perf_counter()
+        index = build_cpu_index(embeddings, build_config)
+        build_seconds = time.perf_counter() - started
+        size_mb = len(faiss.serialize_index(index)) / 1024 / 1024
+
+        for search_name, search_config in search_configs or [(None, build_config)]:
+            apply_search_params(index, search_config)
+            result = measure(index, queries, truth, args.k)
+            label = name
+            if search_name == "efSearch":
+                label += f" efSearch={search_config.ef_search}"
+            elif search_name == "nprobe":
+                label += f" nprobe={search_config.nprobe}"
+            print(
+                f"{label:<28} recall@{args.k}={result[f'recall@{args.k}']:.3f}  "
+                f"p50={result['p50_ms']:.3f}ms  p95={result['p95_ms']:.3f}ms  "
+                f"build={build_seconds:.2f}s  size={size_mb:.1f}MB"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="scentlens FAISS index benchmark")
+    parser.add_argument("--synthetic", type=int, default=0, help="임의 벡터 수 (0이면 저장된 임베딩 사용)")
+    parser.add_argument("--dimension", type=int, default=768, help="임의 벡터 차원")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=1, help="FAISS OpenMP 스레드 수")
+    parser.add_argument("--nlist", type=int, default=0, help="IVF 클러스터 수 (0이면 4 * sqrt(N))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--hnsw-m", type=int, nargs="+", default=[16, 32])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--pq-m", type=int, nargs="+", default=[16, 64])
+    main(parser.parse_args())
@@ -0,0 +1,135 @@
+"""
+scentlens 상품 검색(services.scentlens_index.match_products) 지연 시간 벤치마크
+
+기존 구현(후보 수를 늘려 가며 처음부터 반복 검색 + product_data 전체 순회)과
+현재 구현(단일 검색 + 상품 단위 중복 제거 + dict 조회)을 같은 인덱스에서 비교합니다.
+--product-aggregation을 주면 상품 단위 인덱스 검색의 지연 시간과 이미지 단위 결과 대비 상품 일치율도 측정합니다.
+
+사용 예:
+    python benchmarks/scentlens_search_benchmark.py --products 1400 5000 20000 --images-per-product 2
+    python benchmarks/scentlens_search_benchmark.py --product-aggregation mean max --rerank-candidates 0 20 50
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import time
+import argparse
+import statistics
+import numpy as np
+from services.scentlens_index import IndexConfig, ProductIndex, build_index, match_products, match_products_by_product, normalize_query
+
+
+def legacy_get_matching_products(index, embedding, db_images, product_data, threshold=0.3, k=10, max_results=10, max_rounds=50):
+    """변경 전 구현 (무한 반복을 막기 위해 max_rounds만 추가)"""
+    results = []
+    product_ids_set = set()
+    batch = k * 2
+
+    for _ in range(max_rounds):
+        if len(product_ids_set) >= max_results:
+            break
+        D, I = index.search(np.array(embedding).reshape(1, -1), k=batch)
+        for idx, i in enumerate(I[0]):
+            similarity = float(D[0][idx])
+            if similarity > threshold:
+                product_id = db_images[i]["product_id"]
+                if product_id not in product_ids_set:
+                    product_ids_set.add(product_id)
+                    results.append({"index": int(i), "id": db_images[i]["id"], "product_id": product_id, "url": db_images[i]["url"], "similarity": similarity})
+                    if len(product_ids_set) >= max_results:
+                        break
+        batch += k
+
+    matching_products = [
+        {
+            "id": item["id"],
+            "name": item["name_kr"],
+            "brand": item["brand"],
+            "content": item["content"],
+            "similarity": next((result["similarity"] for result in results if result["product_id"] == item["id"]), None),
+            "url": next((result["url"] for result in results if result["product_id"] == item["id"]), None),
+        }
+        for item in product_data if item["id"] in product_ids_set
+    ]
+    return sorted(matching_products, key=lambda x: x["similarity"], reverse=True)[:max_results]
+
+
+def make_catalog(products: int, images_per_product: int, dimension: int):
+    rng = np.random.default_rng(0)
+    product_vectors = rng.normal(size=(products, dimension))
+    embeddings = np.repeat(product_vectors, images_per_product, axis=0) + 0.5 * rng.normal(size=(products * images_per_product, dimension))
+    embeddings = (embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)).astype(np.float32)
+
+    db_images = [
+        {"id": i, "product_id": i // images_per_product, "url": f"https://example.com/{i}.jpg"}
+        for i in range(len(embeddings))
+    ]
+    product_data = [
+        {"id": product_id, "name_kr": f"상품 {product_id}", "brand": "brand", "content": ""}
+        for product_id in range(products)
+    ]
+    queries = embeddings[rng.integers(0, len(embeddings), 200)] + 0.1 * rng.normal(size=(200, dimension)).astype(np.float32)
+    return embeddings, db_images, product_data, queries
+
+
+def measure(fn, queries) -> dict:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        fn(query)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+    }
+
+
+def main(args):
+    for products in args.products:
+        embeddings, db_images, product_data, queries = make_catalog(products, args.images_per_product, args.dimension)
+        index = build_index(embeddings, IndexConfig(args.index_type))
+        product_by_id = {item["id"]: item for item in product_data}
+        image_by_id = {image["id"]: image for image in db_images}
+
+        for threshold in args.thresholds:
+            current_search = lambda q: match_products(
+                index, normalize_query(q), image_by_id, product_by_id, threshold=threshold, images_per_product=float(args.images_per_product)
+            )
+            legacy = measure(lambda q: legacy_get_matching_products(index, q, db_images, product_data, threshold=threshold), queries)
+            current = measure(current_search, queries)
+            print(
+                f"products={products:>6}  threshold={threshold:.2f}  "
+                f"legacy p50={legacy['p50_ms']:.2f}ms p95={legacy['p95_ms']:.2f}ms  "
+                f"current p50={current['p50_ms']:.2f}ms p95={current['p95_ms']:.2f}ms"
+            )
+
+            for aggregation in args.product_aggregation:
+                product_index = ProductIndex.build(embeddings, db_images, aggregation, IndexConfig(args.index_type))
+                for rerank_candidates in args.rerank_candidates:
+                    search = lambda q: match_products_by_product(
+                        product_index, normalize_query(q), embeddings, db_images, product_by_id, threshold=threshold, rerank_candidates=rerank_candidates
+                    )
+                    result = measure(search, queries)
+                    overlaps = []
+                    for query in queries:
+                        expected = {item["id"] for item in current_search(query)}
+                        if expected:
+                            overlaps.append(len(expected & {item["id"] for item in search(query)}) / len(expected))
+                    print(
+                        f"{'':>16}product index ({aggregation}, rerank={rerank_candidates:>3})  "
+                        f"p50={result['p50_ms']:.2f}ms p95={result['p95_ms']:.2f}ms  "
+                        f"overlap={statistics.mean(overlaps) if overlaps else 1.0:.3f}"
+                    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="scentlens product search benchmark")
+    parser.add_argument("--products", type=int, nargs="+", default=[1400, 10000])
+    parser.add_argument("--images-per-product", type=int, default=2)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--index-type", type=str, default="flat")
+    parser.add_argument("--product-aggregation", type=str, nargs="*", default=[], choices=["mean", "max"])
+    parser.add_argument("--rerank-candidates", type=int, nargs="+", default=[0, 50])
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.3, 0.6], help="높은 임계값은 결과가 부족한 경우를 재현")
+    main(parser.parse_args())
@@ -2,17 +2,39 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from fastapi import FastAPI
-from routers import llm_router, image_processing_router, image_generation_router, image_generation_description_router, diffuser_router, similar, review_summary_router, bookmark_router, product_router, scentlens, image_fetch_router
+from routers import llm_router, image_processing_router, image_generation_router, image_generation_description_router, diffuser_router, similar, review_summary_router, bookmark_router, product_router, scentlens, image_fetch_router, health_router
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from fastapi.staticfiles import StaticFiles
-from routers.scentlens import scentlens_init  # Import the init function from scentlens.py
-from contextlib import asynccontextmanager
+from routers.scentlens import scentlens_sync_loop
+from routers.diffuser_router import diffuser_pool_refresh_loop
+from services.embedding_backend import embedding_backend
+from services.readiness import readiness
+from services.model_registry import model_registry
+from contextlib import asynccontextmanager, suppress
+import asyncio
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    scentlens_init()
+    # 모델/인덱스 초기화는 백그라운드에서 동시에 실행하고 바로 요청을 받기 시작 (준비 상태는 /ready)
+    readiness.start()
+    # pre-fork 배포(serve.py)의 follower 워커는 주기 작업을 leader에게 맡김:
+    # 모델 유휴 해제는 copy-on-write로 공유된 가중치를 버리고 워커마다 따로 다시 로드하게 만들고,
+    # 추천 풀 갱신은 GPT 호출을 워커 수만큼 늘리므로 leader만 실행
+    follower = scentlens.SYNC_ROLE == "follower"
+    background_tasks = [
+        asyncio.create_task(scentlens_sync_loop()),
+        asyncio.create_task(diffuser_pool_refresh_loop(follower=follower)),
+    ]
+    if not follower:
+        background_tasks.append(asyncio.create_task(model_registry.run_idle_eviction()))
     yield
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await readiness.stop()
+    await embedding_backend.aclose()
 
 # 환경 변수 로드
 load_dotenv()
@@ -43,6 +65,7 @@ os.makedirs("generated_images", exist_ok=True)
 # static 파일 서빙 설정 - 경로 수정
 app.mount("/static", StaticFiles(directory="generated_images"), name="static")
 
+app.include_router(health_router.router, tags=["Health"])
 app.include_router(llm_router.router, prefix="/llm", tags=["LLM"])
 app.include_router(image_processing_router.router, prefix="/image-processing", tags=["Image Processing"])
 app.include_router(image_generation_router.router, prefix="/image-generation", tags=["Image Generation"])
@@ -1,6 +1,7 @@
 from dotenv import load_dotenv
 import logging, os
 from services.prompt_loader import PromptLoader
+from services.prompt_budget import prompt_stats
 from langchain_openai import ChatOpenAI
 
 # 로거 설정
@@ -32,7 +33,15 @@ class GPTClient:
         try:
             logger.info(f"🔹 Generating response for prompt: {prompt}...")
 
-            response = self.text_llm.invoke(prompt).content.strip()
+            message = self.text_llm.invoke(prompt)
+            response = message.content.strip()
+
+            # 실제 토큰 사용량 (cached: 프롬프트 캐싱으로 재사용된 입력 토큰)
+            usage = getattr(message, "usage_metadata", None) or {}
+            if usage:
+                cached_tokens = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+                prompt_stats.record_usage(usage.get("input_tokens", 0), cached_tokens, usage.get("output_tokens", 0))
+                logger.info(f"🧾 토큰 사용량: 입력 {usage.get('input_tokens', 0)} (캐시 {cached_tokens}), 출력 {usage.get('output_tokens', 0)}")
 
             logger.info(f"✅ Generated response: {response}...")
             return response
@@ -1,7 +1,10 @@
 import os
-from fastapi import APIRouter, Depends, HTTPException
+import time
+import asyncio
+from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel
-from services.diffuser_service import DiffuserRecommendationService
+from services.diffuser_service import DiffuserRecommendationService, format_server_timing
+from services.diffuser_pool import diffuser_pool
 from services.db_service import DBService
 from models.client import GPTClient
 import logging
@@ -40,14 +43,35 @@ def get_diffuser_service() -> DiffuserRecommendationService:
         logger.error(f"서비스 초기화 실패: {e}")
         raise
 
+# 카테고리별 추천 풀을 미리 채우고 주기적으로 항목 교체 (앱 시작 시 백그라운드 작업으로 실행)
+# follower 워커는 GPT를 호출하지 않고 leader가 저장한 풀만 다시 로드
+async def diffuser_pool_refresh_loop(follower: bool = False):
+    if follower:
+        await diffuser_pool.follow()
+    else:
+        await diffuser_pool.run(get_diffuser_service)
+
 @router.post("/recommend")
-async def recommend_diffusers(
-    request: DiffuserRecommendRequest,
-    diffuser_service: DiffuserRecommendationService = Depends(get_diffuser_service)
-) -> dict:
-    """디퓨저 추천 엔드포인트"""
+async def recommend_diffusers(request: DiffuserRecommendRequest, response: Response) -> dict:
+    """
+    디퓨저 추천 엔드포인트 (단계별 소요 시간은 Server-Timing 헤더로 반환)
+
+    미리 만들어 둔 추천 풀에서 응답하고, 풀이 아직 비어 있으면 GPT/DB로 실시간 추천합니다.
+    """
     try:
-        result = await diffuser_service.recommend_diffusers(request.user_input)
+        started = time.perf_counter()
+        result = diffuser_pool.sample(request.user_input)
+        if result is not None:
+            response.headers["Server-Timing"] = format_server_timing({"pool": time.perf_counter() - started})
+            return result
+
+        diffuser_service = await asyncio.to_thread(get_diffuser_service)
+        try:
+            timings = {}
+            result = await diffuser_service.recommend_diffusers(request.user_input, timings=timings)
+        finally:
+            await asyncio.to_thread(diffuser_service.db_service.close)
+        response.headers["Server-Timing"] = format_server_timing(timings)
         return result
     except Exception as e:
         logger.error(f"추천 처리 중 오류 발생: {e}")
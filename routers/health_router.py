@@ -0,0 +1,55 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from services.readiness import readiness
+from services.model_registry import model_registry
+from services.prompt_budget import prompt_stats
+from services.intent_classifier import INTENT_CLASSIFIERS
+from services.therapy_classifier import therapy_classifier
+from services.diffuser_pool import diffuser_pool
+
+router = APIRouter()
+
+
+@router.get("/health")
+async def health():
+    """프로세스 생존 여부 (모델 로드 상태와 무관하게 항상 200)"""
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready():
+    """
+    서브시스템별 초기화 상태를 반환합니다.
+    모두 준비되면 200, 로드 중이거나 실패한 서브시스템이 있으면 503.
+    """
+    return JSONResponse(
+        status_code=200 if readiness.all_ready else 503,
+        content={"ready": readiness.all_ready, "subsystems": readiness.status()},
+    )
+
+
+@router.get("/metrics/models")
+async def model_metrics():
+    """모델별 로드/해제 상태, 메모리 사용량, 로드 시간"""
+    return model_registry.stats()
+
+
+@router.get("/metrics/prompts")
+async def prompt_metrics():
+    """프롬프트별 토큰 수(호출 수, 평균/최대, 고정 앞부분, 후보 목록이 잘린 횟수)와 실제 OpenAI 토큰 사용량"""
+    return prompt_stats.snapshot()
+
+
+@router.get("/metrics/intent")
+async def intent_metrics():
+    """의도/테라피 분류기별 로컬/GPT 처리 비율, 지연 시간, 학습 정보"""
+    return {
+        **{task: classifier.snapshot() for task, classifier in INTENT_CLASSIFIERS.items()},
+        therapy_classifier.task: therapy_classifier.snapshot(),
+    }
+
+
+@router.get("/metrics/diffuser-pool")
+async def diffuser_pool_metrics():
+    """카테고리별 디퓨저 추천 풀 항목 수/가장 오래된 항목 나이, 풀 적중/미적중 수"""
+    return diffuser_pool.snapshot()
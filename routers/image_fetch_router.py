@@ -1,28 +1,88 @@
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
+from typing import Optional
 from services.image_fetch_service import ImageFetchService
+from services.image_variant_service import ImageVariantService
 import logging
-from fastapi.responses import Response
-from PIL import Image
 
 class ImageByteRequest(BaseModel):
     imagePath: str
+    # 파생 이미지 옵션 (하나라도 지정하면 리사이즈/포맷 변환된 이미지를 반환)
+    width: Optional[int] = None
+    height: Optional[int] = None
+    format: Optional[str] = None
+    quality: Optional[int] = None
+    fit: str = "contain"
 
 router = APIRouter()
 image_fetch_service = ImageFetchService()
+image_variant_service = ImageVariantService(image_fetch_service)
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 @router.post("/get-image")
-async def get_image(request: ImageByteRequest):
+async def get_image(request: ImageByteRequest, http_request: Request):
     """
-    Fetch and return the image as raw bytes.
+    Fetch and return the image as a streamed file response.
     """
     try:
         image_path = request.imagePath
-        return image_fetch_service.get_image(image_path)
+        if any(option is not None for option in (request.width, request.height, request.format, request.quality)):
+            return await image_variant_service.get_variant(
+                image_path,
+                width=request.width,
+                height=request.height,
+                image_format=request.format,
+                quality=request.quality,
+                fit=request.fit,
+                request_headers=http_request.headers,
+            )
+        return image_fetch_service.get_image(image_path, http_request.headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/get-image")
+async def get_image_by_query(imagePath: str, http_request: Request):
+    """
+    GET 버전의 이미지 조회 (브라우저/CDN 캐시 및 조건부 요청 재사용 가능)
+    """
+    try:
+        return image_fetch_service.get_image(imagePath, http_request.headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/variant")
+async def get_image_variant(
+    imagePath: str,
+    http_request: Request,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    format: str = "auto",
+    quality: Optional[int] = None,
+    fit: str = "contain",
+):
+    """
+    썸네일/포맷 변환 이미지 조회 (예: /variant?imagePath=/static/a.jpeg&width=320&format=webp)
+    format=auto이면 Accept 헤더에 따라 AVIF/WebP/JPEG 중 선택합니다.
+    """
+    try:
+        return await image_variant_service.get_variant(
+            imagePath,
+            width=width,
+            height=height,
+            image_format=format,
+            quality=quality,
+            fit=fit,
+            request_headers=http_request.headers,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"파생 이미지 생성 실패: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
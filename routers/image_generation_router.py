@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Body
 from pydantic import BaseModel
 from services.image_generation_service import ImageGenerationService
+from services.image_job_service import image_job_service
 import logging
 
 
@@ -34,3 +35,14 @@ async def generate_image(request: ImageRequest):
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+@router.get("/jobs/{job_id}")
+async def get_image_job(job_id: str):
+    """
+    백그라운드 이미지 생성 작업의 상태와 결과 경로를 반환합니다.
+    """
+    job = image_job_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="이미지 생성 작업을 찾을 수 없습니다.")
+    return job
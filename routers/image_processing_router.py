@@ -1,21 +1,32 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Depends
 from services.image_processing_service import ImageProcessingService
+from services.readiness import readiness
 
 router = APIRouter()
-image_processing_service = ImageProcessingService()
 
+# Florence-2 모델은 앱 시작 후 백그라운드에서 로드
+image_processing_service = ImageProcessingService(preload=False)
+readiness.register("caption", lambda: image_processing_service.get_model(image_processing_service.default_profile))
 
-@router.post("/process-image")
-async def process_image(file: UploadFile = File(...)):
+
+@router.post("/process-image", dependencies=[Depends(readiness.require("caption"))])
+async def process_image(
+    file: UploadFile = File(...),
+    profile: Optional[str] = Query(None, description="캡션 추론 프로필 (quality, balanced, fast). 생략 시 CAPTION_PROFILE"),
+):
     """
     업로드된 이미지를 처리하여 설명과 감정을 반환합니다.
     """
     try:
+        # 프로필 검증 (잘못된 값은 400)
+        profile = image_processing_service.resolve_profile(profile)
+
         # 업로드된 파일의 데이터 읽기
         image_data = await file.read()
 
-        # 이미지 처리
-        result = image_processing_service.process_image(image_data)
+        # 이미지 처리 (추론 워커에서 배치 처리되는 동안 이벤트 루프는 다른 요청을 처리)
+        result = await image_processing_service.process_image_async(image_data, profile)
 
         # 반환값 확인
         if "description" not in result:
@@ -26,6 +37,8 @@ async def process_image(file: UploadFile = File(...)):
             "imageProcessResult": result["description"]
         }
 
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
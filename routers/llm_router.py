@@ -4,6 +4,7 @@ from services.llm_service import LLMService
 from services.db_service import DBService
 from services.prompt_loader import PromptLoader
 from models.img_llm_client import GPTClient
+from services.readiness import readiness
 import logging
 
 logger = logging.getLogger(__name__)
@@ -51,7 +52,7 @@ def get_llm_service() -> LLMService:
         raise
 
 # 라우터에 엔드포인트 추가
-@router.post("/process-input")
+@router.post("/process-input", dependencies=[Depends(readiness.require("vector_db"))])
 async def process_input(input_data: dict, llm_service: LLMService = Depends(get_llm_service)):
     """
     사용자 입력 처리 및 대화/추천 결과 반환
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends
 from services.product_service import ProductService
 from pydantic import BaseModel
 from typing import Optional
+from services.readiness import readiness
 
 router = APIRouter()
 
@@ -12,7 +13,7 @@ class UserRequest(BaseModel):
 def get_product_service():
     return ProductService()
 
-@router.post("/recommend")
+@router.post("/recommend", dependencies=[Depends(readiness.require("vector_db"))])
 async def recommend_product(
     request: UserRequest, 
     product_service: ProductService = Depends(get_product_service)
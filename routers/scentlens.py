@@ -1,8 +1,15 @@
-from fastapi import FastAPI, File, UploadFile, APIRouter
+from fastapi import FastAPI, File, UploadFile, APIRouter, Depends, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-import requests, faiss, json, torch, io, os, logging
+from typing import Optional
+import faiss, json, io, os, logging, asyncio, secrets
 import numpy as np
 from services.db_service import DBService
+from services.perceptual_cache import PerceptualCache, compute_image_hash
+from services.scentlens_index import ProductIndex, ScentlensIndexStore, match_products, match_products_by_product, normalize_query, to_device, update_cpu_index
+from services.scentlens_client import ScentlensClientError
+from services.embedding_backend import embedding_backend
+from services.diffuser_index import refresh_diffuser_index
+from services.readiness import readiness
 
 os.environ["KMP_DUPLICATE_LIB_OK"] = "True"
 
@@ -11,16 +18,49 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # DB, FAISS 인덱스 초기화
-db_images = []
-db_embeddings = []
+db_service = None
+db_images = []  # 인덱스에 들어간 이미지 목록 (db_embeddings 행 순서)
+db_embeddings = np.zeros((0, 0), dtype=np.float32)
+image_by_id = {}  # 이미지 id(FAISS 라벨) -> 이미지 정보
 index = None
+product_index = None  # 상품 단위 집계 벡터 인덱스 (SCENTLENS_PRODUCT_AGGREGATION=mean/max일 때만 사용)
 product_data = []
+product_by_id = {}  # 상품 id -> 상품 정보
+images_per_product = 1.0  # 상품당 평균 이미지 수 (검색 후보 수 추정용)
+
+# 상품 수가 부족할 때 후보를 늘려 재검색하는 최대 후보 수
+MAX_SEARCH_CANDIDATES = int(os.getenv("SCENTLENS_MAX_SEARCH_CANDIDATES", "1024"))
+
+# 검색 결과에 포함할 최소 코사인 유사도 (-1 ~ 1)
+# 쿼리를 정규화하기 전에는 점수가 쿼리 임베딩 크기(ConvNeXt pooler_output은 1보다 훨씬 큼)만큼 커져 0.3이 사실상 필터 역할을 하지 않았음
+SIMILARITY_THRESHOLD = float(os.getenv("SCENTLENS_SIMILARITY_THRESHOLD", "0.3"))
+
+# 증분 동기화 주기 (0이면 주기 동기화 비활성화) 및 주기 동기화 시 DB에서 JSON 캐시를 먼저 갱신할지 여부
+SYNC_INTERVAL_SECONDS = int(os.getenv("SCENTLENS_SYNC_INTERVAL_SECONDS", "600"))
+SYNC_REFRESH_CACHE = os.getenv("SCENTLENS_SYNC_REFRESH_CACHE", "true").lower() == "true"
+
+# pre-fork 배포(serve.py)에서는 leader 워커만 동기화하고,
+# follower 워커는 leader가 저장한 인덱스의 매니페스트가 바뀌면 디스크에서 다시 로드
+SYNC_ROLE = os.getenv("SCENTLENS_SYNC_ROLE", "leader")
+loaded_manifest_version = None
+
+# 설정하면 관리자 동기화 엔드포인트에 X-Admin-Token 헤더가 필요
+ADMIN_TOKEN = os.getenv("SCENTLENS_ADMIN_TOKEN")
+
+# 같은/근사 중복 업로드 이미지는 원격 임베딩 호출 없이 캐시된 임베딩 재사용
+embedding_cache = PerceptualCache("scentlens-embedding")
+
+# FAISS 인덱스 저장소 (재시작 시 저장된 인덱스를 로드한 뒤 바뀐 이미지만 동기화)
+index_store = ScentlensIndexStore()
+
+# 시작 시 동기화, 주기 동기화, 관리자 동기화가 동시에 실행되지 않도록 함
+sync_lock = asyncio.Lock()
 
 router = APIRouter()
 
-# 서버 시작 전 미리 실행할 코드; 서버를 initialize하여 데이터 로드, 이미지 다운로드, 임베딩 계산, FAISS 인덱스 생성을 미리 수행
-def scentlens_init():
-    global db_images, db_embeddings, index, product_data
+# 서버 시작 후 백그라운드에서 실행할 코드; 저장된 FAISS 인덱스를 로드하고, 상품 이미지 캐시와 달라진 이미지만 임베딩 계산 후 반영
+async def scentlens_init():
+    global db_service
 
     db_config = {
         "host": os.getenv("DB_HOST"),
@@ -31,173 +71,284 @@ def scentlens_init():
     }
     db_service = DBService(db_config)
 
-    # JSON 데이터 로드
-    product_image_data = db_service.load_cached_product_image_data()
-    perfume_data = db_service.load_cached_perfume_data()
-    diffuser_data = db_service.load_cached_diffuser_data()
-    product_data = perfume_data + diffuser_data
+    # 저장된 인덱스가 현재 임베딩 모델로 만든 것이면 그대로 로드 (상품 이미지 변경분은 아래 동기화에서 반영)
+    loaded = await asyncio.to_thread(index_store.load, embedding_backend.name)
+    if loaded is not None:
+        swap_state(*loaded)
 
-    if not product_image_data or not product_data:
-        logger.error("Initialization failed due to missing or invalid data.")
-        return
+    await sync_index()
 
-    # 이미지 다운로드
-    downloaded_images = download_images(product_image_data)
-    if not downloaded_images:
-        logger.error("Initialization failed due to image downloading errors.")
-        return
+readiness.register("scentlens", scentlens_init)
 
-    # 임베딩 계산
-    embeddings_data = compute_embeddings(downloaded_images)
-    if not embeddings_data:
-        logger.error("Initialization failed due to embedding computation errors.")
+# 주기적으로 DB -> JSON 캐시 갱신 후 증분 동기화 (시작 시 초기화가 끝난 뒤부터)
+# 갱신된 디퓨저 캐시로 디퓨저 벡터 인덱스도 다시 동기화 (바뀐 디퓨저만 임베딩, Chroma 쓰기는 leader만)
+async def scentlens_sync_loop():
+    if SYNC_INTERVAL_SECONDS <= 0 or not await readiness.wait("scentlens"):
         return
 
-    # DB에 이미지 및 임베딩 저장
-    populate_db(embeddings_data)
-
-    # FAISS 인덱스 생성
-    create_faiss_index()
-
-# 이미지 다운로드를 위한 배치 요청을 전송하고 응답을 반환
-def download_images(product_image_data):
-    try:
-        download_images_url = os.getenv("SCENTLENS_SERVER_URL") + "/download_images/"
-        response = requests.post(download_images_url, json=product_image_data)
-        if response.status_code == 200:
-            logger.info("Successfully downloaded images.")
-            return response.json()
-        else:
-            logger.error(f"Failed to download images. Status code: {response.status_code}")
-            return None
-    except Exception as e:
-        logger.error(f"Error during image downloading: {e}")
-        return None
-
-# 다운로드된 이미지에 대해 임베딩 계산을 위한 배치 요청을 전송
-def compute_embeddings(downloaded_images):
-    try:
-        get_or_compute_embeddings_url = os.getenv("SCENTLENS_SERVER_URL") + "/get_or_compute_embeddings/"
-        response = requests.post(get_or_compute_embeddings_url, json=downloaded_images)
-        if response.status_code == 200:
-            logger.info("Successfully computed embeddings.")
-            return response.json()
-        else:
-            logger.error(f"Failed to compute embeddings. Status code: {response.status_code}")
-            return None
-    except Exception as e:
-        logger.error(f"Error during embedding computation: {e}")
-        return None
-
-# DB에 이미지 및 임베딩 데이터 저장
-def populate_db(embeddings_data):
-    global db_images, db_embeddings
-
-    for item in embeddings_data:
-        if item["status"] == "success":
-            db_images.append({"id": item["id"], "url": item["url"], "product_id": item["product_id"]})
-            embedding = torch.tensor(item["embedding"])
-            db_embeddings.append(embedding)
-        else:
-            logger.error(f"Failed to process embedding for image ID {item['id']} from URL {item['url']}: {item['error']}")
+    while True:
+        await asyncio.sleep(SYNC_INTERVAL_SECONDS)
+        try:
+            if SYNC_ROLE == "follower":
+                await reload_index_if_changed()
+            else:
+                await sync_index(refresh_cache=SYNC_REFRESH_CACHE)
+        except Exception as e:
+            logger.error(f"Periodic scentlens index sync failed: {e}")
+        try:
+            await asyncio.to_thread(refresh_diffuser_index, SYNC_ROLE != "follower")
+        except Exception as e:
+            logger.error(f"Periodic diffuser index sync failed: {e}")
+
+# 다른 프로세스가 저장한 인덱스로 교체 (follower 워커용)
+async def reload_index_if_changed() -> bool:
+    global product_data, product_by_id
+
+    if index_store.manifest_version() == loaded_manifest_version:
+        return False
+
+    loaded = await asyncio.to_thread(index_store.load, embedding_backend.name)
+    if loaded is None:
+        return False
+    product_image_data, products = await asyncio.to_thread(load_product_data)
+    if products:
+        product_data = products
+        product_by_id = {item["id"]: item for item in products}
+    swap_state(*loaded)
+    logger.info(f"✅ 저장된 scentlens 인덱스로 교체했습니다: {len(db_images)}개")
+    return True
+
+# 상품/상품 이미지 JSON 캐시를 DB 기준으로 갱신 (변경이 없으면 파일을 다시 쓰지 않음)
+def refresh_product_cache():
+    if db_service.connection is None:
+        db_service.connection = db_service.connect_to_db()
+    else:
+        db_service.connection.ping(reconnect=True)
+    db_service.cache_perfume_data()
+    db_service.cache_diffuser_data()
+    db_service.cache_product_image_data()
 
-# 계산된 임베딩을 사용하여 FAISS 인덱스를 생성
-def create_faiss_index():
-    global db_embeddings, index
+# JSON 캐시에서 상품 이미지 목록과 상품 정보 로드
+def load_product_data():
+    product_image_data = db_service.load_cached_product_image_data()
+    perfume_data = db_service.load_cached_perfume_data()
+    diffuser_data = db_service.load_cached_diffuser_data()
+    return product_image_data, perfume_data + diffuser_data
+
+# 상품 이미지 캐시와 인덱스에 들어간 이미지 비교
+def diff_images(product_image_data, indexed_images):
+    """
+    Returns:
+        (삭제할 이미지 id 목록, 임베딩을 계산해 추가할 이미지 목록)
+        url이나 product_id가 바뀐 이미지는 삭제 후 다시 추가합니다.
+    """
+    current = {item["id"]: item for item in product_image_data}
+    indexed = {image["id"]: image for image in indexed_images}
+
+    def unchanged(image_id):
+        image, item = indexed[image_id], current[image_id]
+        return image["url"] == item["url"] and image["product_id"] == item["product_id"]
+
+    removed_ids = [image_id for image_id in indexed if image_id not in current or not unchanged(image_id)]
+    added = [item for image_id, item in current.items() if image_id not in indexed or not unchanged(image_id)]
+    return removed_ids, added
+
+def normalize_embeddings(embeddings, dimension):
+    embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, dimension)
+    return embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+# 현재 상태의 복사본에 삭제/추가를 적용한 새 상태 생성 후 디스크에 저장 (작업 스레드에서 실행)
+def build_synced_state(current_index, current_embeddings, current_images, removed_ids, added_images, added_embeddings):
+    removed = set(removed_ids)
+    keep_rows = [row for row, image in enumerate(current_images) if image["id"] not in removed]
+
+    images = [current_images[row] for row in keep_rows] + added_images
+    if added_images:
+        dimension = added_embeddings.shape[1]
+    else:
+        dimension = current_embeddings.shape[1] if current_embeddings.ndim == 2 and current_embeddings.shape[1] else 1
+    if keep_rows and added_images and current_embeddings.shape[1] != dimension:
+        raise ValueError(f"저장된 임베딩과 새 임베딩의 차원이 다릅니다: {current_embeddings.shape[1]} != {dimension}")
+
+    embeddings = np.concatenate([
+        np.asarray(current_embeddings[keep_rows], dtype=np.float32).reshape(-1, dimension),
+        added_embeddings.reshape(-1, dimension),
+    ])
+    ids = np.array([image["id"] for image in images], dtype=np.int64)
+    added_ids = np.array([image["id"] for image in added_images], dtype=np.int64)
+
+    cpu_index = update_cpu_index(
+        current_index, embeddings, ids, np.array(sorted(removed), dtype=np.int64), added_embeddings, added_ids, index_store.config
+    )
+    new_product_index = None
+    aggregation = index_store.config.product_aggregation
+    if aggregation != "none" and images:
+        new_product_index = ProductIndex.build_cpu(embeddings, images, aggregation, index_store.config)
+
+    index_store.save(cpu_index, embeddings, images, embedding_backend.name, new_product_index)
+
+    if new_product_index is not None:
+        new_product_index.index = to_device(new_product_index.index)
+    return to_device(cpu_index), embeddings, images, new_product_index
+
+# 검색 상태 교체
+def swap_state(new_index, new_embeddings, new_images, new_product_index):
+    """
+    이벤트 루프 스레드에서 await 없이 한 번에 대입하므로,
+    검색 요청은 항상 이전 상태 전체 또는 새 상태 전체만 보게 됩니다.
+    """
+    global index, db_embeddings, db_images, image_by_id, product_index, images_per_product, loaded_manifest_version
+
+    new_image_by_id = {image["id"]: image for image in new_images}
+    product_count = len({image["product_id"] for image in new_images})
+
+    index = new_index
+    db_embeddings = new_embeddings
+    db_images = new_images
+    image_by_id = new_image_by_id
+    product_index = new_product_index
+    images_per_product = len(new_images) / max(1, product_count)
+    loaded_manifest_version = index_store.manifest_version()
+
+# 상품 이미지 캐시와 인덱스를 비교해 바뀐 이미지만 임베딩 계산 후 반영
+async def sync_index(refresh_cache: bool = False) -> dict:
+    """
+    새 이미지만 임베딩을 계산해 추가하고, 캐시에서 사라진 이미지는 IndexIDMap에서 id로 삭제합니다.
+    새 인덱스는 기존 인덱스의 복사본으로 작업 스레드에서 만든 뒤 교체하므로 검색은 중단되지 않습니다.
+    임베딩 계산에 실패한 이미지는 인덱스에 넣지 않고 다음 동기화에서 다시 시도합니다.
+    """
+    global product_data, product_by_id
+
+    async with sync_lock:
+        if refresh_cache:
+            await asyncio.to_thread(refresh_product_cache)
+
+        product_image_data, products = await asyncio.to_thread(load_product_data)
+        if not product_image_data or not products:
+            logger.error("Scentlens index sync skipped due to missing or invalid data.")
+            return {"added": 0, "removed": 0, "failed": 0, "total": len(db_images)}
+
+        product_data = products
+        product_by_id = {item["id"]: item for item in products}
+
+        removed_ids, added = diff_images(product_image_data, db_images)
+        if not removed_ids and not added and index is not None:
+            logger.info(f"✅ scentlens 인덱스가 최신 상태입니다: {len(db_images)}개")
+            return {"added": 0, "removed": 0, "failed": 0, "total": len(db_images)}
+
+        logger.info(f"scentlens 인덱스 동기화: 추가 {len(added)}개, 삭제 {len(removed_ids)}개")
+        embeddings_data = []
+        if added:
+            embeddings_data, failed_chunks = await embedding_backend.embed_catalog(added)
+            if failed_chunks:
+                logger.warning(f"⚠️ {failed_chunks}개 이미지 청크 처리에 실패했습니다. 다음 동기화에서 다시 시도합니다.")
+
+        added_images, added_vectors = [], []
+        for item in embeddings_data:
+            if item["status"] == "success":
+                added_images.append({"id": item["id"], "url": item["url"], "product_id": item["product_id"]})
+                added_vectors.append(item["embedding"])
+            else:
+                logger.error(f"Failed to process embedding for image ID {item['id']} from URL {item['url']}: {item['error']}")
+        dimension = len(added_vectors[0]) if added_vectors else max(1, db_embeddings.shape[1] if db_embeddings.ndim == 2 else 1)
+        added_embeddings = normalize_embeddings(added_vectors, dimension)
 
-    if db_embeddings:
-        db_embeddings = torch.stack(db_embeddings)
-        db_embeddings = db_embeddings / db_embeddings.norm(dim=1, keepdim=True)
+        new_state = await asyncio.to_thread(
+            build_synced_state, index, db_embeddings, db_images, removed_ids, added_images, added_embeddings
+        )
+        swap_state(*new_state)
 
-        dimension = db_embeddings.shape[1]
-        index = faiss.GpuIndexFlatIP(faiss.StandardGpuResources(), dimension)
-        index.add(db_embeddings.numpy())
-        logger.info("FAISS index created successfully.")
-    else:
-        logger.info("No embeddings available. Initializing an empty FAISS index.")
-        index = faiss.GpuIndexFlatIP(faiss.StandardGpuResources(), 1)
-
-# 임베딩값으로 향수 매칭
-def get_matching_products(embedding, db_images, db_embeddings, product_data, threshold=0.3, k=10, max_results=10):
-    # FAISS 인덱스에서 검색
-    results = []
-    product_ids_set = set()  # 이미 처리된 제품 ID를 추적
-    batch = k * 2
-
-    while len(product_ids_set) < max_results:
-        D, I = index.search(np.array(embedding).reshape(1, -1), k=batch)
-        
-        for idx, i in enumerate(I[0]):
-            similarity = float(D[0][idx])
-            if similarity > threshold:
-                product_id = db_images[i]["product_id"]
-
-                # 이미 해당 제품이 결과에 포함되었는지 확인
-                if product_id not in product_ids_set:
-                    product_ids_set.add(product_id)
-
-                    results.append({
-                        "index": int(i),
-                        "id": db_images[i]["id"],
-                        "product_id": product_id,
-                        "url": db_images[i]["url"],
-                        "similarity": similarity,
-                    })
-
-                    # 결과가 충분히 모였으면 종료
-                    if len(product_ids_set) >= max_results:
-                        break
-
-        batch += k
-
-        # 결과가 부족하면 더 많은 검색을 진행
-        if max_results > len(product_ids_set):
-            continue
-        else:
-            break
-
-    # 해당 제품의 상세 정보를 가져옴
-    matching_products = [
-        {
-            "id": item["id"],
-            "name": item["name_kr"],
-            "brand": item["brand"],
-            "content": item["content"],
-            "similarity": next(
-                (result["similarity"] for result in results if result["product_id"] == item["id"]), None
-            ),
-            "url": next(
-                (result["url"] for result in results if result["product_id"] == item["id"]), None
-            ),
+        result = {
+            "added": len(added_images),
+            "removed": len(removed_ids),
+            "failed": len(added) - len(added_images),
+            "total": len(db_images),
         }
-        for item in product_data if item["id"] in product_ids_set
-    ]
+        logger.info(f"✅ scentlens 인덱스 동기화 완료: {result}")
+        return result
+
+@router.post("/admin/sync")
+async def sync_scentlens_index(refresh_cache: bool = Query(False), x_admin_token: Optional[str] = Header(None)):
+    """
+    상품 이미지 캐시와 FAISS 인덱스, 디퓨저 벡터 인덱스를 증분 동기화합니다.
+    refresh_cache=true이면 DB에서 JSON 캐시를 먼저 갱신합니다.
+    """
+    if ADMIN_TOKEN and not secrets.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    if db_service is None:
+        raise HTTPException(status_code=503, detail="ScentLens is not initialized")
 
-    # 유사도 기준으로 내림차순 정렬
-    return sorted(matching_products, key=lambda x: x["similarity"], reverse=True)[:max_results]
-
-@router.post("/get_image_search_result")
+    try:
+        result = await sync_index(refresh_cache=refresh_cache)
+        refreshed = await asyncio.to_thread(refresh_diffuser_index)
+        return {**result, "diffusers": len(refreshed) if refreshed is not None else None}
+    except Exception as e:
+        logger.error(f"Scentlens index sync failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Scentlens index sync failed: {e}")
+
+# 임베딩값으로 향수 매칭 (검색/중복 제거/상품 정보 조회는 services.scentlens_index.match_products)
+def get_matching_products(embedding, image_by_id, product_by_id, threshold=None, max_results=10, max_candidates=None):
+    """코사인 유사도가 threshold(기본값 SIMILARITY_THRESHOLD)를 넘는 서로 다른 상품을 유사도 내림차순으로 최대 max_results개 반환"""
+    return match_products(
+        index,
+        normalize_query(embedding),
+        image_by_id,
+        product_by_id,
+        threshold=SIMILARITY_THRESHOLD if threshold is None else threshold,
+        max_results=max_results,
+        max_candidates=max_candidates or MAX_SEARCH_CANDIDATES,
+        images_per_product=images_per_product,
+    )
+
+# 상품 단위 인덱스로 향수 매칭 (상위 후보는 이미지 단위 벡터로 재정렬)
+def get_matching_products_by_product(embedding, product_index, db_embeddings, db_images, product_by_id, threshold=None, max_results=10, rerank_candidates=None):
+    return match_products_by_product(
+        product_index,
+        normalize_query(embedding),
+        db_embeddings,
+        db_images,
+        product_by_id,
+        threshold=SIMILARITY_THRESHOLD if threshold is None else threshold,
+        max_results=max_results,
+        rerank_candidates=index_store.config.rerank_candidates if rerank_candidates is None else rerank_candidates,
+    )
+
+def search_products(embedding):
+    if product_index is not None:
+        return get_matching_products_by_product(embedding, product_index, db_embeddings, db_images, product_by_id)
+    return get_matching_products(embedding, image_by_id, product_by_id)
+
+@router.post("/get_image_search_result", dependencies=[Depends(readiness.require("scentlens"))])
 async def search_image(file: UploadFile = File(...)):
     try:
-        # GPU 임베딩 서비스 호출
+        # 임베딩 백엔드(원격 GPU 서버 또는 로컬 모델) 호출
         image_bytes = await file.read()
 
-        compute_url = os.getenv("SCENTLENS_SERVER_URL") + "/compute_embedding_of_uploaded_file/"
-        response = requests.post(
-            compute_url, files={"file": ("uploaded_image.png", image_bytes)}
-        )
-
-        if response.status_code == 200:
-            embedding = response.json().get("embedding")
-            
-            if embedding is not None:
-                matching_products = get_matching_products(embedding, db_images, db_embeddings, product_data)
-
-                return {"products": sorted(matching_products, key=lambda x: x["similarity"], reverse=True)}
-            else:
-                return {"error": "No embedding found in the response"}
+        try:
+            image_hash = await asyncio.to_thread(compute_image_hash, image_bytes)
+        except Exception as e:
+            logger.warning(f"Failed to compute perceptual hash, skipping cache: {e}")
+            image_hash = None
+
+        embedding = embedding_cache.get(image_hash, embedding_backend.name) if image_hash is not None else None
+        if embedding is not None:
+            matching_products = search_products(embedding)
+            return {"products": sorted(matching_products, key=lambda x: x["similarity"], reverse=True)}
+
+        try:
+            embedding = await embedding_backend.embed_query(image_bytes)
+        except ScentlensClientError as e:
+            logger.error(f"Failed to get embedding: {e}")
+            return {"error": f"Failed to get embedding. {e}"}
+
+        if embedding is not None:
+            if image_hash is not None:
+                embedding_cache.put(image_hash, embedding, embedding_backend.name)
+            matching_products = search_products(embedding)
+
+            return {"products": sorted(matching_products, key=lambda x: x["similarity"], reverse=True)}
         else:
-            return {"error": f"Failed to get embedding. Status code: {response.status_code}"}
+            return {"error": "No embedding found in the response"}
     except Exception as e:
         logger.error(f"Error retrieving product details: {e}")
         return {"error": str(e)}
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from services.db_service import get_db, Product, ProductImage
 from services.similar_text import find_similar_texts
 from services.similar_image import find_similar_images
+from services.readiness import readiness
 from concurrent.futures import ThreadPoolExecutor
 import asyncio
 
@@ -15,7 +16,7 @@ async def run_in_threadpool(func, *args):
     loop = asyncio.get_running_loop()
     return await loop.run_in_executor(executor, func, *args)
 
-@router.get("/{product_id}")
+@router.get("/{product_id}", dependencies=[Depends(readiness.require("similar_text", "similar_image"))])
 async def get_similar_products(
     product_id: int, db: Session = Depends(get_db), top_n: int = 5
 ):
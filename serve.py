@@ -0,0 +1,173 @@
+"""
+pre-fork 멀티 워커 실행기
+
+    python serve.py --workers 4 [--host 0.0.0.0] [--port 8000]
+
+마스터 프로세스가 모델(model_registry)과 scentlens 인덱스 등 readiness에 등록된 서브시스템을 모두 로드한 뒤
+워커를 fork합니다. 워커는 부모의 메모리 페이지를 copy-on-write로 공유하므로 모델 가중치는 워커 수와 관계없이
+한 벌만 상주하고(가중치는 추론 중에 쓰지 않으므로 복사되지 않음), 워커는 로드 없이 바로 준비 상태가 됩니다.
+scentlens 임베딩 행렬은 디스크 인덱스 파일을 mmap으로 읽으므로 페이지 캐시로 공유됩니다.
+
+- fork 전에 gc.freeze()로 로드된 객체를 GC 추적 대상에서 빼서, 워커의 GC가 참조 카운트/GC 헤더를 건드려
+  공유 페이지가 복사되는 것을 줄입니다.
+- 워커마다 torch 스레드 수를 CPU 수 / 워커 수(WORKER_TORCH_THREADS로 지정 가능)로 제한합니다.
+- scentlens 주기 동기화는 첫 번째 워커(leader)만 수행하고, 나머지 워커(follower)는 leader가 저장한
+  인덱스가 바뀌면 디스크에서 다시 로드합니다. 모델 유휴 해제와 디퓨저 추천 풀 갱신도 leader만 수행하고,
+  follower는 leader가 저장한 추천 풀 파일을 다시 로드합니다.
+- 백그라운드 이미지 생성 작업은 등록한 워커에서 실행되고, 상태는 IMAGE_JOB_DIR에 저장되어 어느 워커에서나 조회할 수 있습니다.
+- 로드에 쓴 MySQL/Chroma(SQLite) 연결은 fork 전에 닫아, 워커가 각자 처음 사용할 때 다시 연결합니다.
+- 종료된 워커는 마스터가 다시 fork하며, SIGTERM/SIGINT는 모든 워커에 전달됩니다.
+
+단일 프로세스 실행(python main.py, uvicorn main:app)은 기존과 동일하게 동작합니다.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import gc
+import time
+import signal
+import socket
+import asyncio
+import logging
+import argparse
+from dotenv import load_dotenv
+
+logger = logging.getLogger("serve")
+
+load_dotenv()
+
+
+async def preload() -> None:
+    """마스터에서 등록된 모든 서브시스템을 로드 (실패한 서브시스템은 워커에서도 실패 상태로 남음)"""
+    from services.readiness import readiness
+    from services.embedding_backend import embedding_backend
+
+    readiness.start()
+    for name in readiness.status():
+        await readiness.wait(name)
+    await readiness.stop()
+    # 마스터 이벤트 루프에 묶인 HTTP 클라이언트는 워커에서 사용할 수 없으므로 닫음 (워커에서 다시 생성)
+    await embedding_backend.aclose()
+    close_shared_handles()
+
+    for name, state in readiness.status().items():
+        logger.info(f"🔹 {name}: {state['status']} ({state['elapsed_seconds']}s)")
+
+
+def close_shared_handles() -> None:
+    """
+    로더가 연 DB/Chroma 연결 닫기
+
+    fork한 워커들이 같은 MySQL 소켓이나 SQLite 핸들을 함께 쓰면 프로토콜이 섞여 깨지므로,
+    마스터에서 닫아 두고 워커가 처음 사용할 때 각자 다시 연결합니다.
+    """
+    from routers import scentlens
+    from services.db_service import engine
+    from services.diffuser_index import close_vector_db
+
+    if scentlens.db_service is not None:
+        scentlens.db_service.close()  # refresh_product_cache가 connection이 None이면 다시 연결
+    engine.dispose()
+    close_vector_db()
+
+
+def create_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, worker_number: int, workers: int) -> None:
+    import uvicorn
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    try:
+        import torch
+        threads = int(os.getenv("WORKER_TORCH_THREADS", "0")) or max(1, (os.cpu_count() or 1) // workers)
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    if worker_number > 0:
+        from routers import scentlens
+        scentlens.SYNC_ROLE = "follower"
+
+    server = uvicorn.Server(uvicorn.Config(app, log_level=os.getenv("LOG_LEVEL", "info")))
+    server.run(sockets=[sock])
+
+
+def spawn(app, sock: socket.socket, worker_number: int, workers: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(app, sock, worker_number, workers)
+        except Exception as e:
+            logger.error(f"🚨 워커 {worker_number} 오류: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+    logger.info(f"✅ 워커 {worker_number} 시작 (pid {pid})")
+    return pid
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="모델을 한 번 로드한 뒤 워커를 fork하는 멀티 워커 실행기")
+    parser.add_argument("--host", default=os.getenv("APP_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("APP_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", "2")))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from main import app
+
+    started = time.perf_counter()
+    asyncio.run(preload())
+    logger.info(f"✅ 마스터 로드 완료 ({time.perf_counter() - started:.1f}s), 워커 {args.workers}개 시작")
+
+    gc.collect()
+    gc.freeze()
+
+    sock = create_socket(args.host, args.port)
+    workers = {spawn(app, sock, number, args.workers): number for number in range(args.workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        number = workers.pop(pid, None)
+        if number is None:
+            continue
+        if not stopping:
+            logger.warning(f"⚠️ 워커 {number}(pid {pid})가 종료되어 다시 시작합니다. (status {status})")
+            time.sleep(1)
+            workers[spawn(app, sock, number, args.workers)] = number
+
+    sock.close()
+    logger.info("✅ 모든 워커 종료")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,9 @@
 from sqlalchemy.orm import Session
-from sentence_transformers import SentenceTransformer
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 from models.base_model import Product, Note, Bookmark, ProductImage, Spice
-import torch
 from services.mongo_service import MongoService
+from services.model_registry import model_registry, load_sentence_transformer
 import logging
 from concurrent.futures import ThreadPoolExecutor
 import time
@@ -12,35 +11,29 @@ from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+TEXT_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+model_registry.register(TEXT_MODEL_NAME, lambda: load_sentence_transformer(TEXT_MODEL_NAME))
+
 class PerfumeRecommender:
     """향수 추천 시스템 클래스"""
     
     def __init__(self, mongo_service: MongoService):
         """초기화"""
-        # 지연 로딩을 위한 변수들
-        self._model = None         # 텍스트 임베딩 모델
         self.mongo_service = mongo_service  # MongoDB 연결
         self._embedding_dim = None  # 임베딩 벡터 차원
 
-    @property # 메서드를 속성처럼 사용 가능하게 만드는 데코레이터
-                # 호출 시점에 모델을 로드하는 지연 초기화(lazy initialization) 구현
-                # self._model이 None일 때만 실제 모델을 로드하여 메모리 효율적 관리
+    @property
     def model(self):
-        """텍스트 임베딩 모델 로드"""
-        if self._model is None:
-            # 모델 최초 로드
-            self._model = SentenceTransformer('sentence-transformers/all-mpnet-base-v2')
-            # GPU 사용 가능시 GPU로 이동
-            self._model = self._model.to('cuda' if torch.cuda.is_available() else 'cpu')
-            self._model.eval()  # 추론 모드 설정
-            
-            # 임베딩 차원 확인
-            dummy_text = "Test sentence for dimension check"
-            dummy_embedding = self._model.encode(dummy_text)
-            self._embedding_dim = dummy_embedding.shape[0]
-            logger.info(f"모델 임베딩 차원: {self._embedding_dim}")
-            
-        return self._model
+        """텍스트 임베딩 모델 (model_registry에서 처음 사용할 때 로드, similar_text와 공유)"""
+        return model_registry.get(TEXT_MODEL_NAME)
+
+    def encode(self, texts, **kwargs):
+        """추론 중에는 모델이 메모리 예산 초과로 해제되지 않도록 사용 중으로 표시"""
+        with model_registry.use(TEXT_MODEL_NAME) as model:
+            if self._embedding_dim is None:
+                self._embedding_dim = model.get_sentence_embedding_dimension()
+                logger.info(f"모델 임베딩 차원: {self._embedding_dim}")
+            return model.encode(texts, **kwargs)
 
     def _get_threshold_values(self, product_count):
         """북마크 수에 따른 임계값 설정
@@ -105,7 +98,7 @@ class PerfumeRecommender:
                 return cached_embedding
             
         # 새로운 임베딩 생성
-        embedding = self.model.encode(text)
+        embedding = self.encode(text)
         
         # 임베딩 캐시 저장
         try:
@@ -146,7 +139,7 @@ class PerfumeRecommender:
         
         # 배치 처리로 새로운 임베딩 생성
         if texts_to_encode:
-            batch_embeddings = self.model.encode(texts_to_encode, batch_size=32)
+            batch_embeddings = self.encode(texts_to_encode, batch_size=32)
             
             # 결과 업데이트 및 캐시 저장
             for idx, embedding in zip(indices_to_encode, batch_embeddings):
@@ -355,7 +348,7 @@ class PerfumeRecommender:
                     f"Main accords: {', '.join(common_features['main_accords'])} "
                     f"Spices: {', '.join(common_features['spices'])}"
                 )
-                target_embedding = self.model.encode(common_features_text)
+                target_embedding = self.encode(common_features_text)
                 logger.info(f"타겟 임베딩 재계산 완료. 새 차원: {target_embedding.shape[0]}")
             
             # 차원 형태 맞추기
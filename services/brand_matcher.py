@@ -0,0 +1,299 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+BRAND_ALIASES_PATH = os.getenv(
+    "BRAND_ALIASES_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "brand_aliases.json")
+)
+BRAND_CACHE_TTL_SECONDS = float(os.getenv("BRAND_CACHE_TTL_SECONDS", "3600"))
+# 자모 단위 편집 거리 허용 비율 (브랜드 이름 자모 길이 * 비율 이하면 오타로 인정)
+BRAND_FUZZY_RATIO = float(os.getenv("BRAND_FUZZY_RATIO", "0.2"))
+BRAND_FUZZY_MIN_LENGTH = 5
+
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+JUNGSEONG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+JONGSEONG = ["", "ㄱ", "ㄲ", "ㄳ", "ㄴ", "ㄵ", "ㄶ", "ㄷ", "ㄹ", "ㄺ", "ㄻ", "ㄼ", "ㄽ", "ㄾ", "ㄿ", "ㅀ", "ㅁ", "ㅂ", "ㅄ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ"]
+
+# 브랜드 뒤에 붙는 조사 (오타 비교 전에 제거)
+KOREAN_PARTICLES = ("에서", "으로", "이랑", "하고", "처럼", "같은", "제품", "향수", "의", "을", "를", "이", "가", "은", "는", "과", "와", "도", "로", "랑")
+# "프레쉬한 향"처럼 브랜드 이름이 형용사로 쓰인 경우
+ADJECTIVE_SUFFIXES = ("한", "하", "함", "해")
+# 브랜드 뒤에 오면 제외 의사 ("디올 말고", "디올은 별로")
+NEGATION_AFTER = ("말고", "말구", "빼고", "제외", "싫", "별로", "안 좋", "안좋", "아닌", "아니고", "비추")
+# 브랜드 앞에 오면 제외 의사 ("not Dior", "except Chanel")
+NEGATION_BEFORE = re.compile(r"\b(not|no|except|without|besides|excluding|other than|hate|dislike)\b", re.IGNORECASE)
+CLAUSE_BOUNDARY = re.compile(r"[.!?;\n,]|그리고|그런데|하지만|\bbut\b|\band\b", re.IGNORECASE)
+NEGATION_WINDOW = 15
+
+
+def decompose_jamo(text: str) -> str:
+    """한글 음절을 초성/중성/종성 자모로 분해 (그 외 문자는 그대로)"""
+    result = []
+    for char in text:
+        code = ord(char) - 0xAC00
+        if 0 <= code < 11172:
+            result.append(CHOSEONG[code // 588])
+            result.append(JUNGSEONG[(code % 588) // 28])
+            result.append(JONGSEONG[code % 28])
+        else:
+            result.append(char)
+    return "".join(result)
+
+
+def normalize(text: str) -> Tuple[str, List[int]]:
+    """소문자 + 글자/숫자만 남긴 문자열과 각 글자의 원문 위치 ("조 말론" -> "조말론")"""
+    chars, positions = [], []
+    for position, char in enumerate(text):
+        if char.isalnum():
+            chars.append(char.lower())
+            positions.append(position)
+    return "".join(chars), positions
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """레벤슈타인 거리 (limit를 넘는 것이 확실하면 limit + 1)"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class AhoCorasick:
+    """여러 패턴을 한 번의 순회로 찾는 Aho-Corasick 오토마톤"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[str]] = [[]]
+
+        for pattern in patterns:
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append(pattern)
+
+        # 너비 우선으로 실패 링크 계산 (루트 바로 아래 상태의 실패 링크는 루트)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """(시작, 끝, 패턴) 목록 (겹치는 매칭 포함)"""
+        matches = []
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for pattern in self.output[state]:
+                matches.append((position - len(pattern) + 1, position + 1, pattern))
+        return matches
+
+
+class BrandMatch:
+    def __init__(self, brand: str, alias: str, start: int, end: int, distance: int = 0, negated: bool = False):
+        self.brand = brand
+        self.alias = alias
+        self.start = start  # 원문 위치
+        self.end = end
+        self.distance = distance  # 0이면 정확히 일치, 1 이상이면 오타 보정
+        self.negated = negated
+
+    def __repr__(self) -> str:
+        return f"BrandMatch({self.brand!r}, alias={self.alias!r}, distance={self.distance}, negated={self.negated})"
+
+
+class BrandMatcher:
+    """
+    사용자 입력에서 브랜드 이름을 찾는 로컬 사전(gazetteer) 매처
+
+    - 한글/영문 브랜드 이름과 별칭(models/brand_aliases.json)을 공백/기호를 뺀 소문자로 Aho-Corasick에 넣어 한 번에 찾습니다.
+    - 정확히 일치하지 않는 어절은 한글을 자모로 분해한 편집 거리로 오타를 보정합니다 ("아쿠아 파르마" -> "아쿠아 디 파르마").
+    - "디올 말고", "디올은 별로", "not Dior"처럼 제외 의사를 나타내는 표현이 붙은 브랜드는 negated로 표시합니다.
+    """
+
+    def __init__(self, brands: Iterable[str], aliases: Optional[Dict[str, List[str]]] = None, fuzzy_ratio: Optional[float] = None):
+        self.brands = sorted({brand for brand in brands if brand})
+        self.fuzzy_ratio = fuzzy_ratio if fuzzy_ratio is not None else BRAND_FUZZY_RATIO
+        aliases = aliases if aliases is not None else load_brand_aliases()
+
+        # 정규화된 별칭 -> (브랜드, 원래 별칭)
+        self.patterns: Dict[str, Tuple[str, str]] = {}
+        for brand in self.brands:
+            for alias in [brand] + list(aliases.get(brand, [])):
+                key, _ = normalize(alias)
+                if key and key not in self.patterns:
+                    self.patterns[key] = (brand, alias)
+        self.automaton = AhoCorasick(self.patterns)
+        self.fuzzy_patterns = [
+            (decompose_jamo(key), key) for key in self.patterns if len(decompose_jamo(key)) >= BRAND_FUZZY_MIN_LENGTH
+        ]
+
+    def _exact_matches(self, text: str) -> List[BrandMatch]:
+        normalized, positions = normalize(text)
+        candidates = []
+        for start, end, key in self.automaton.find(normalized):
+            original_start, original_end = positions[start], positions[end - 1] + 1
+            if key.isascii():
+                # 영문 별칭은 단어 중간에서 찾지 않음 ("ysl" in "analysis" 방지)
+                if (original_start > 0 and text[original_start - 1].isascii() and text[original_start - 1].isalnum()) or (
+                    original_end < len(text) and text[original_end].isascii() and text[original_end].isalnum()
+                ):
+                    continue
+            elif text[original_end:original_end + 1] in ADJECTIVE_SUFFIXES:
+                continue
+            brand, alias = self.patterns[key]
+            candidates.append(BrandMatch(brand, alias, original_start, original_end))
+
+        # 겹치는 매칭은 긴 것 우선 ("조 말론 런던" > "조 말론")
+        candidates.sort(key=lambda match: (match.start, -(match.end - match.start)))
+        matches, last_end = [], -1
+        for match in candidates:
+            if match.start >= last_end:
+                matches.append(match)
+                last_end = match.end
+        return matches
+
+    def _fuzzy_matches(self, text: str, exact: List[BrandMatch]) -> List[BrandMatch]:
+        if not self.fuzzy_patterns:
+            return []
+
+        words = [(word.start(), word.end()) for word in re.finditer(r"\w+", text)]
+        covered = lambda start, end: any(start < match.end and match.start < end for match in exact)
+        candidates = []
+        for i in range(len(words)):
+            for size in range(1, 4):
+                if i + size > len(words):
+                    break
+                start, end = words[i][0], words[i + size - 1][1]
+                if covered(start, end):
+                    break
+                key, _ = normalize(text[start:end])
+                for particle in KOREAN_PARTICLES:
+                    if key.endswith(particle) and len(key) > len(particle) + 1:
+                        key = key[:-len(particle)]
+                        break
+                jamo = decompose_jamo(key)
+                for pattern_jamo, pattern in self.fuzzy_patterns:
+                    limit = int(len(pattern_jamo) * self.fuzzy_ratio)
+                    if limit < 1:
+                        continue
+                    distance = edit_distance(jamo, pattern_jamo, limit)
+                    if distance <= limit:
+                        brand, alias = self.patterns[pattern]
+                        candidates.append(BrandMatch(brand, alias, start, end, distance))
+
+        # 거리가 작고 긴 후보부터 겹치지 않게 선택
+        candidates.sort(key=lambda match: (match.distance, -(match.end - match.start), match.start))
+        matches = []
+        for match in candidates:
+            if not any(match.start < other.end and other.start < match.end for other in matches):
+                matches.append(match)
+        return matches
+
+    def _mark_negations(self, text: str, matches: List[BrandMatch]) -> None:
+        for i, match in enumerate(matches):
+            after_end = min(len(text), match.end + NEGATION_WINDOW)
+            if i + 1 < len(matches):
+                after_end = min(after_end, matches[i + 1].start)
+            after = text[match.end:after_end]
+            boundary = CLAUSE_BOUNDARY.search(after)
+            if boundary:
+                after = after[:boundary.start()]
+
+            before_start = max(0, match.start - NEGATION_WINDOW)
+            if i > 0:
+                before_start = max(before_start, matches[i - 1].end)
+            before = text[before_start:match.start]
+            boundaries = list(CLAUSE_BOUNDARY.finditer(before))
+            if boundaries:
+                before = before[boundaries[-1].end():]
+
+            match.negated = any(cue in after for cue in NEGATION_AFTER) or bool(NEGATION_BEFORE.search(before))
+
+    def match(self, text: Optional[str]) -> List[BrandMatch]:
+        """텍스트에 나온 브랜드 (등장 순서)"""
+        if not text:
+            return []
+        exact = self._exact_matches(text)
+        matches = sorted(exact + self._fuzzy_matches(text, exact), key=lambda match: match.start)
+        self._mark_negations(text, matches)
+        return matches
+
+    def extract(self, text: Optional[str]) -> Tuple[List[str], List[str]]:
+        """
+        원하는 브랜드와 제외할 브랜드
+
+        Returns:
+            Tuple[List[str], List[str]]: (원하는 브랜드, 제외할 브랜드) - 한 번이라도 제외 표현과 함께 나오면 제외
+        """
+        matches = self.match(text)
+        excluded = list(dict.fromkeys(match.brand for match in matches if match.negated))
+        wanted = list(dict.fromkeys(match.brand for match in matches if match.brand not in excluded))
+        return wanted, excluded
+
+
+def load_brand_aliases(path: Optional[str] = None) -> Dict[str, List[str]]:
+    try:
+        with open(path or BRAND_ALIASES_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"⚠️ 브랜드 별칭 파일을 읽지 못했습니다: {e}")
+        return {}
+
+
+@lru_cache(maxsize=8)
+def _build_matcher(brands: Tuple[str, ...]) -> BrandMatcher:
+    return BrandMatcher(brands)
+
+
+def get_brand_matcher(brands: Iterable[str]) -> BrandMatcher:
+    """브랜드 목록별 매처 (같은 목록이면 오토마톤을 다시 만들지 않음)"""
+    return _build_matcher(tuple(sorted({brand for brand in brands if brand})))
+
+
+_brand_cache: Dict[str, object] = {"brands": None, "loaded_at": 0.0}
+_brand_cache_lock = threading.Lock()
+
+
+def cached_brands(db_service) -> List[str]:
+    """DB 브랜드 목록 (BRAND_CACHE_TTL_SECONDS 동안 재사용, 요청마다 SELECT DISTINCT 하지 않음)"""
+    with _brand_cache_lock:
+        if _brand_cache["brands"] is None or time.monotonic() - _brand_cache["loaded_at"] >= BRAND_CACHE_TTL_SECONDS:
+            brands = db_service.fetch_brands()
+            if brands or _brand_cache["brands"] is None:
+                _brand_cache["brands"] = brands
+            _brand_cache["loaded_at"] = time.monotonic()
+        return list(_brand_cache["brands"])
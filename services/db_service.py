@@ -45,6 +45,16 @@ class DBService:
         if hasattr(self, 'session'):
             self.session.close()
 
+    def close(self):
+        """pymysql 연결과 ORM 세션 닫기 (connection이 None이면 다음 사용 시 다시 연결)"""
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except pymysql.MySQLError:
+                pass
+            self.connection = None
+        self.session.close()
+
     def connect_to_db(self):
         try:
             connection = pymysql.connect(
@@ -446,10 +456,14 @@ class DBService:
             logger.error(f"🚨 향료 데이터 로드 실패: {e}")
             raise
 
-    def get_diffusers_by_spice_ids(self, spice_ids: List[int]) -> List[Dict]:
-        """해당 향료가 하나라도 포함된 디퓨저들 중에서 랜덤하게 2개를 선택합니다."""
+    def get_diffusers_by_spice_ids(self, spice_ids: List[int], limit: Optional[int] = 2) -> List[Dict]:
+        """
+        해당 향료가 하나라도 포함된 디퓨저들 중에서 랜덤하게 limit개를 선택합니다.
+        limit이 None이면 매칭되는 디퓨저 전체를 매칭 향료 수가 많은 순으로 반환합니다 (추천 풀 후보 목록용).
+        """
         try:
             spice_ids_str = ",".join(map(str, spice_ids))
+            order_clause = f"ORDER BY RAND() LIMIT {int(limit)}" if limit is not None else "ORDER BY matching_count DESC, p.id"
             
             # 먼저 전체 매칭되는 디퓨저 수를 확인
             count_query = f"""
@@ -461,7 +475,7 @@ class DBService:
                 AND p.name_kr NOT LIKE '%카 디퓨저%'
             """
             
-            # 그 다음 랜덤하게 2개 선택
+            # 그 다음 limit개 선택 (limit이 없으면 전체)
             main_query = f"""
                 SELECT DISTINCT
                     p.id, 
@@ -478,8 +492,7 @@ class DBService:
                 AND n.spice_id IN ({spice_ids_str})
                 AND p.name_kr NOT LIKE '%카 디퓨저%'
                 GROUP BY p.id, p.brand, p.name_kr, p.size_option, p.content
-                ORDER BY RAND()
-                LIMIT 2
+                {order_clause}
             """
             
             with self.connection.cursor() as cursor:
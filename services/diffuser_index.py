@@ -0,0 +1,313 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from services.readiness import readiness
+from services.model_registry import model_registry, load_sentence_transformer
+
+try:
+    import chromadb
+except ImportError:  # chromadb가 없으면 디퓨저 임베딩을 저장하지 않고 시작할 때마다 계산
+    chromadb = None
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# 디퓨저 설명/쿼리 임베딩 모델 (model_registry에서 관리)
+KLUE_MODEL_NAME = "snunlp/KLUE-SRoBERTa-Large-SNUExtended-klueNLI-klueSTS"
+model_registry.register(KLUE_MODEL_NAME, lambda: load_sentence_transformer(KLUE_MODEL_NAME))
+
+DIFFUSER_COLLECTION_NAME = "embeddings"
+CHROMA_PATH = os.getenv("CHROMA_PATH", "chroma_db")
+CHROMA_SYNC_BATCH_SIZE = int(os.getenv("CHROMA_SYNC_BATCH_SIZE", "128"))
+# chroma: 임베딩을 Chroma에 저장하고 바뀐 디퓨저만 다시 계산, memory: 시작할 때마다 전체 계산 (chromadb 불필요)
+DIFFUSER_VECTOR_STORE = os.getenv("DIFFUSER_VECTOR_STORE", "chroma" if chromadb is not None else "memory").lower()
+
+chroma_client = None
+_vector_db_lock = threading.Lock()
+_index_lock = threading.Lock()
+
+
+def embed_texts(texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+    """KLUE-SRoBERTa로 문장 목록을 한 번에 임베딩 (L2 정규화된 (N, D) float32)"""
+    with model_registry.use(KLUE_MODEL_NAME) as model:
+        embeddings = model.encode(
+            list(texts),
+            batch_size=batch_size or CHROMA_SYNC_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def load_vector_db():
+    """Chroma PersistentClient (처음 필요할 때 생성)"""
+    global chroma_client
+
+    if chromadb is None:
+        raise RuntimeError("chromadb가 설치되어 있지 않습니다. DIFFUSER_VECTOR_STORE=memory로 실행하세요.")
+    with _vector_db_lock:
+        if chroma_client is None:
+            chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
+    return chroma_client
+
+
+def close_vector_db() -> None:
+    """Chroma 클라이언트 닫기 (SQLite 핸들을 fork한 워커와 공유하지 않도록 pre-fork 마스터에서 호출, 다음 사용 시 다시 생성)"""
+    global chroma_client
+
+    with _vector_db_lock:
+        if chroma_client is not None:
+            chroma_client.close()
+            chroma_client = None
+
+
+def diffuser_document(diffuser: dict, scent_description: str) -> Tuple[str, dict]:
+    """디퓨저 한 개의 문서와 메타데이터 (content_hash: 문서/메타데이터가 바뀌었는지 비교용)"""
+    document = f"{diffuser['brand']}\n{diffuser['name_kr']} ({diffuser['name_en']})\n{scent_description}"
+    metadata = {
+        "id": diffuser["id"],
+        "name_kr": diffuser["name_kr"],
+        "brand": diffuser["brand"],
+        "category_id": diffuser["category_id"],
+        "scent_description": scent_description,
+    }
+    content = json.dumps([document, metadata], ensure_ascii=False, sort_keys=True, default=str)
+    metadata["content_hash"] = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return document, metadata
+
+
+def sync_diffuser_collection(collection, diffuser_data: List[dict], diffuser_scent_descriptions: Dict[int, str], batch_size: Optional[int] = None) -> dict:
+    """
+    디퓨저 캐시와 Chroma 컬렉션 동기화
+
+    컬렉션에서는 id와 메타데이터(content_hash)만 가져와 비교하고,
+    새로 생겼거나 내용이 바뀐 디퓨저는 batch_size개씩 한 번에 임베딩하여 upsert, 사라진 디퓨저는 delete합니다.
+    """
+    batch_size = max(1, batch_size or CHROMA_SYNC_BATCH_SIZE)
+
+    existing = collection.get(include=["metadatas"])
+    existing_hashes = {
+        id_: (metadata or {}).get("content_hash")
+        for id_, metadata in zip(existing["ids"], existing["metadatas"] or [None] * len(existing["ids"]))
+    }
+
+    documents = {}
+    for diffuser in diffuser_data:
+        documents[str(diffuser["id"])] = diffuser_document(diffuser, diffuser_scent_descriptions.get(diffuser["id"], ""))
+
+    changed_ids = [id_ for id_, (_, metadata) in documents.items() if existing_hashes.get(id_) != metadata["content_hash"]]
+    removed_ids = [id_ for id_ in existing_hashes if id_ not in documents]
+
+    for start in range(0, len(changed_ids), batch_size):
+        ids = changed_ids[start:start + batch_size]
+        batch_documents = [documents[id_][0] for id_ in ids]
+        collection.upsert(
+            ids=ids,
+            documents=batch_documents,
+            metadatas=[documents[id_][1] for id_ in ids],
+            embeddings=embed_texts(batch_documents, batch_size).tolist(),
+        )
+        logger.info(f"Chroma 디퓨저 임베딩 저장 {min(start + batch_size, len(changed_ids))}/{len(changed_ids)}")
+
+    for start in range(0, len(removed_ids), batch_size):
+        collection.delete(ids=removed_ids[start:start + batch_size])
+
+    result = {"upserted": len(changed_ids), "removed": len(removed_ids), "total": len(documents)}
+    logger.info(f"✅ Chroma 디퓨저 컬렉션 동기화 완료: {result}")
+    return result
+
+
+def get_diffuser_collection():
+    """
+    디퓨저 Chroma 컬렉션
+
+    컬렉션에는 임베딩 함수를 연결하지 않고 embed_texts()로 계산한 임베딩을 직접 넘기므로,
+    model_registry가 KLUE 모델을 내려도 컬렉션이 모델을 붙잡고 있지 않습니다.
+    """
+    return load_vector_db().get_or_create_collection(name=DIFFUSER_COLLECTION_NAME, embedding_function=None)
+
+
+class DiffuserIndex:
+    """
+    디퓨저 임베딩 메모리 인덱스
+
+    디퓨저는 수백 개 수준이므로 정규화된 (N, D) 행렬 하나에 대해 NumPy 내적으로 정확한 top-k를 계산합니다.
+    브랜드/카테고리 조건은 검색 전에 후보 행을 걸러내는 방식(pre-filter)으로 적용하므로,
+    조건에 맞는 디퓨저가 k개 이상이면 항상 k개를 반환합니다.
+    같은 쿼리 문장의 임베딩은 LRU 캐시(DIFFUSER_QUERY_CACHE_SIZE)에 보관하여 모델을 다시 실행하지 않습니다.
+    """
+
+    def __init__(self, query_cache_size: Optional[int] = None):
+        self.query_cache_size = query_cache_size if query_cache_size is not None else int(os.getenv("DIFFUSER_QUERY_CACHE_SIZE", "256"))
+        # (메타데이터 목록, 임베딩 행렬, 브랜드 배열, 카테고리 배열): 갱신 시 통째로 교체하여 검색 중인 요청과 섞이지 않음
+        self._state: Tuple[List[dict], np.ndarray, np.ndarray, np.ndarray] = ([], np.zeros((0, 0), dtype=np.float32), np.array([]), np.array([]))
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._state[0])
+
+    @property
+    def brands(self) -> List[str]:
+        return sorted(set(self._state[2].tolist()))
+
+    def set_items(self, metadatas: List[dict], embeddings) -> None:
+        """디퓨저 메타데이터와 임베딩으로 인덱스 교체 (임베딩은 L2 정규화)"""
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32).reshape(len(metadatas), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.maximum(norms, 1e-12)
+        brands = np.array([metadata.get("brand") for metadata in metadatas], dtype=object)
+        category_ids = np.array([metadata.get("category_id") for metadata in metadatas], dtype=object)
+        self._state = (list(metadatas), matrix, brands, category_ids)
+
+    def embeddings_by_hash(self) -> Dict[str, np.ndarray]:
+        """content_hash별 현재 임베딩 (다시 구성할 때 내용이 같은 디퓨저의 임베딩 재사용)"""
+        metadatas, matrix, _, _ = self._state
+        return {metadata["content_hash"]: matrix[i] for i, metadata in enumerate(metadatas) if metadata.get("content_hash")}
+
+    def embed_query(self, text: str) -> np.ndarray:
+        with self._cache_lock:
+            embedding = self._query_cache.get(text)
+            if embedding is not None:
+                self._query_cache.move_to_end(text)
+                return embedding
+
+        embedding = embed_texts([text])[0]
+        if self.query_cache_size > 0:
+            with self._cache_lock:
+                self._query_cache[text] = embedding
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return embedding
+
+    def search_embedding(
+        self,
+        query_embedding,
+        k: int = 10,
+        brands: Optional[Iterable[str]] = None,
+        category_ids: Optional[Iterable[int]] = None,
+    ) -> List[dict]:
+        """
+        쿼리 임베딩과 코사인 유사도가 높은 디퓨저 k개
+
+        Returns:
+            List[dict]: 유사도 내림차순 메타데이터 목록 (similarity 포함)
+        """
+        metadatas, matrix, brand_array, category_array = self._state
+        if not metadatas or k <= 0:
+            return []
+
+        mask = np.ones(len(metadatas), dtype=bool)
+        if brands:
+            mask &= np.isin(brand_array, list(brands))
+        if category_ids:
+            mask &= np.isin(category_array, list(category_ids))
+        candidates = np.flatnonzero(mask)
+        if len(candidates) == 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        scores = matrix[candidates] @ query
+
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(candidates) else np.arange(len(candidates))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [{**metadatas[candidates[i]], "similarity": float(scores[i])} for i in top]
+
+    def search(
+        self,
+        query_text: str,
+        k: int = 10,
+        brands: Optional[Iterable[str]] = None,
+        category_ids: Optional[Iterable[int]] = None,
+    ) -> List[dict]:
+        return self.search_embedding(self.embed_query(query_text), k=k, brands=brands, category_ids=category_ids)
+
+
+diffuser_index = DiffuserIndex()
+
+
+def load_diffuser_index(
+    diffuser_data: Optional[List[dict]] = None,
+    diffuser_scent_descriptions: Optional[Dict[int, str]] = None,
+    sync_store: bool = True,
+) -> DiffuserIndex:
+    """
+    디퓨저 캐시로 메모리 인덱스 구성 (다시 호출하면 바뀐 디퓨저만 임베딩해 인덱스 교체)
+
+    content_hash가 같은 디퓨저는 현재 메모리 인덱스나 Chroma에 저장된 임베딩을 재사용하고,
+    새로 생겼거나 내용이 바뀐 디퓨저만 한 번에 임베딩합니다. 데이터를 넘기지 않으면 DB 캐시에서 읽습니다.
+    DIFFUSER_VECTOR_STORE=chroma이고 sync_store이면 Chroma 컬렉션을 먼저 동기화하며,
+    sync_store=False(pre-fork follower 워커)이면 Chroma는 읽기만 합니다.
+    """
+    if diffuser_data is None:
+        from services.db_service import DBService
+
+        db_service = DBService({
+            "host": os.getenv("DB_HOST"),
+            "port": int(os.getenv("DB_PORT")),
+            "user": os.getenv("DB_USER"),
+            "password": os.getenv("DB_PASSWORD"),
+            "database": os.getenv("DB_NAME"),
+        })
+        try:
+            diffuser_data = db_service.load_cached_diffuser_data()
+            diffuser_scent_descriptions = db_service.load_diffuser_scent_cache()
+        finally:
+            db_service.close()
+    diffuser_scent_descriptions = diffuser_scent_descriptions or {}
+    documents = [diffuser_document(diffuser, diffuser_scent_descriptions.get(diffuser["id"], "")) for diffuser in diffuser_data]
+
+    reusable = diffuser_index.embeddings_by_hash()
+    if DIFFUSER_VECTOR_STORE == "chroma":
+        collection = get_diffuser_collection()
+        if sync_store:
+            sync_diffuser_collection(collection, diffuser_data, diffuser_scent_descriptions)
+        stored = collection.get(include=["embeddings", "metadatas"])
+        for metadata, embedding in zip(stored["metadatas"] or [], stored["embeddings"] if stored["embeddings"] is not None else []):
+            if metadata and metadata.get("content_hash"):
+                reusable[metadata["content_hash"]] = np.asarray(embedding, dtype=np.float32)
+
+    missing = {metadata["content_hash"]: document for document, metadata in documents if metadata["content_hash"] not in reusable}
+    if missing:
+        reusable.update(zip(missing.keys(), embed_texts(list(missing.values()))))
+
+    metadatas = [metadata for _, metadata in documents]
+    embeddings = np.stack([reusable[metadata["content_hash"]] for metadata in metadatas]) if metadatas else np.zeros((0, 0), dtype=np.float32)
+    diffuser_index.set_items(metadatas, embeddings)
+    diffuser_index.loaded = True
+    logger.info(f"✅ 디퓨저 벡터 인덱스 준비 완료: {len(diffuser_index)}개, 새로 임베딩 {len(missing)}개 ({DIFFUSER_VECTOR_STORE})")
+    return diffuser_index
+
+
+def get_diffuser_index(diffuser_data: Optional[List[dict]] = None, diffuser_scent_descriptions: Optional[Dict[int, str]] = None) -> DiffuserIndex:
+    """디퓨저 인덱스 반환 (프로세스에서 처음 한 번만 구성, 앱 시작 시에는 readiness 백그라운드 로더가 미리 구성)"""
+    with _index_lock:
+        if not diffuser_index.loaded:
+            load_diffuser_index(diffuser_data, diffuser_scent_descriptions)
+    return diffuser_index
+
+
+def refresh_diffuser_index(sync_store: bool = True) -> Optional[DiffuserIndex]:
+    """
+    DB 캐시 기준으로 이미 구성된 인덱스 다시 동기화 (scentlens 주기 동기화 루프에서 캐시 갱신 후 호출)
+
+    아직 구성되지 않았으면 readiness 로더에 맡기고 None을 반환합니다.
+    """
+    with _index_lock:
+        if not diffuser_index.loaded:
+            return None
+        return load_diffuser_index(sync_store=sync_store)
+
+
+readiness.register("vector_db", get_diffuser_index)
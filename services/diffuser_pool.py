@@ -0,0 +1,211 @@
+import os
+import json
+import uuid
+import time
+import random
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from services.diffuser_service import DiffuserRecommendationService, THERAPY_TITLES, build_recommendation_response
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+DIFFUSER_POOL_ENABLED = os.getenv("DIFFUSER_POOL_ENABLED", "true").lower() == "true"
+# 카테고리별로 보관할 (향료 조합, 사용 루틴, 디퓨저 후보) 항목 수
+DIFFUSER_POOL_SIZE = int(os.getenv("DIFFUSER_POOL_SIZE", "4"))
+# 이 주기마다 카테고리별로 가장 오래된 항목 하나를 새로 생성한 항목으로 교체 (0이면 처음 채운 뒤 교체하지 않음)
+DIFFUSER_POOL_REFRESH_SECONDS = int(os.getenv("DIFFUSER_POOL_REFRESH_SECONDS", "1800"))
+# leader가 풀을 저장하는 파일 (pre-fork 배포에서 follower 워커는 이 파일이 바뀌면 다시 로드)
+DIFFUSER_POOL_PATH = os.getenv("DIFFUSER_POOL_PATH", "cache/diffuser_pool.json")
+DIFFUSER_POOL_FOLLOW_SECONDS = int(os.getenv("DIFFUSER_POOL_FOLLOW_SECONDS", "30"))
+
+
+class PoolEntry:
+    def __init__(self, notes: List[str], usage_routine: str, diffusers: List[Dict], created_at: Optional[float] = None):
+        self.notes = notes
+        self.usage_routine = usage_routine
+        self.diffusers = diffusers
+        self.created_at = created_at if created_at is not None else time.time()
+
+    def to_dict(self) -> Dict:
+        return {"notes": self.notes, "usage_routine": self.usage_routine, "diffusers": self.diffusers, "created_at": self.created_at}
+
+
+class DiffuserRecommendationPool:
+    """
+    테라피 카테고리(6개 고정)별 디퓨저 추천 풀
+
+    /diffuser/recommend는 카테고리 이름만 입력으로 받으므로, GPT 향료 조합/사용 루틴 생성과 디퓨저 후보 조회를
+    요청마다 하지 않고 백그라운드에서 미리 만들어 둡니다.
+    요청은 풀에서 항목 하나와 그 후보 중 디퓨저 2개를 무작위로 골라 DB/GPT 호출 없이 응답합니다.
+    refresh_seconds마다 카테고리별로 가장 오래된 항목을 새 항목으로 교체해 추천 결과가 다양하게 유지되도록 합니다.
+
+    풀 생성(GPT 호출)은 leader 프로세스만 하고 결과를 path에 저장합니다.
+    pre-fork 배포의 follower 워커는 follow()로 저장된 풀을 읽기만 하므로 GPT 호출 수가 워커 수와 관계없이 일정합니다.
+    """
+
+    def __init__(self, size: Optional[int] = None, refresh_seconds: Optional[int] = None, path: Optional[str] = None):
+        self.size = size if size is not None else DIFFUSER_POOL_SIZE
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else DIFFUSER_POOL_REFRESH_SECONDS
+        self.path = path or DIFFUSER_POOL_PATH
+        self._entries: Dict[str, List[PoolEntry]] = {category: [] for category in THERAPY_TITLES}
+        self.loaded_version: Optional[int] = None
+        self.stats = {"hits": 0, "misses": 0, "built": 0, "build_failures": 0}
+
+    def sample(self, category: str) -> Optional[Dict]:
+        """풀에서 추천 응답 생성 (해당 카테고리 풀이 비어 있으면 None)"""
+        entries = self._entries.get(category)
+        if not DIFFUSER_POOL_ENABLED or not entries:
+            self.stats["misses"] += 1
+            return None
+        entry = random.choice(entries)
+        self.stats["hits"] += 1
+        diffusers = random.sample(entry.diffusers, min(2, len(entry.diffusers)))
+        return build_recommendation_response(category, diffusers, entry.usage_routine)
+
+    async def build_entry(self, service: DiffuserRecommendationService, category: str) -> PoolEntry:
+        notes, usage_routine = await asyncio.gather(
+            service.get_recommended_notes(category),
+            service.get_usage_routine(category),
+        )
+        spices = await service.get_spices(notes)
+        if not spices:
+            raise ValueError(f"추천할 수 있는 향료가 없습니다: {notes}")
+        diffusers = await asyncio.to_thread(
+            service.db_service.get_diffusers_by_spice_ids, [spice["id"] for spice in spices], None
+        )
+        if not diffusers:
+            raise ValueError(f"추천할 수 있는 디퓨저가 없습니다: {notes}")
+        return PoolEntry(notes, usage_routine, diffusers)
+
+    async def add_entry(self, service: DiffuserRecommendationService, category: str) -> bool:
+        """새 항목을 만들어 추가 (풀이 가득 차 있으면 가장 오래된 항목과 교체)"""
+        try:
+            entry = await self.build_entry(service, category)
+        except Exception as e:
+            self.stats["build_failures"] += 1
+            logger.warning(f"⚠️ 디퓨저 추천 풀 항목 생성 실패 ({category}): {e}")
+            return False
+
+        # 리스트를 새로 만들어 교체하므로 sample()은 항상 완성된 목록만 봄
+        entries = sorted(self._entries[category], key=lambda existing: existing.created_at)
+        if len(entries) >= self.size:
+            entries = entries[1:]
+        self._entries[category] = entries + [entry]
+        self.stats["built"] += 1
+        logger.info(f"✅ 디퓨저 추천 풀 갱신 ({category}): 향료 {entry.notes}, 후보 {len(entry.diffusers)}개")
+        return True
+
+    async def fill(self, service: DiffuserRecommendationService) -> None:
+        """모든 카테고리를 size개까지 채움 (한 바퀴에 카테고리별 하나씩 추가해 모든 카테고리가 빨리 풀을 갖도록 함)"""
+        for _ in range(self.size):
+            for category in THERAPY_TITLES:
+                if len(self._entries[category]) < self.size:
+                    await self.add_entry(service, category)
+
+    async def rotate(self, service: DiffuserRecommendationService) -> None:
+        for category in THERAPY_TITLES:
+            await self.add_entry(service, category)
+
+    def version(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def save(self) -> None:
+        """풀을 임시 파일에 쓴 뒤 교체 (follower가 쓰다 만 파일을 읽지 않도록 함)"""
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {category: [entry.to_dict() for entry in entries] for category, entries in self._entries.items()},
+                    f, ensure_ascii=False, default=str,
+                )
+            os.replace(tmp_path, self.path)
+            self.loaded_version = self.version()
+        except OSError as e:
+            logger.warning(f"⚠️ 디퓨저 추천 풀 저장 실패: {e}")
+
+    def load_if_changed(self) -> bool:
+        """저장된 풀 파일이 바뀌었으면 다시 로드"""
+        version = self.version()
+        if version is None or version == self.loaded_version:
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"⚠️ 디퓨저 추천 풀 로드 실패: {e}")
+            return False
+        for category in THERAPY_TITLES:
+            entries = [PoolEntry(**entry) for entry in stored.get(category, [])]
+            self._entries[category] = sorted(entries, key=lambda entry: entry.created_at)[-self.size:] if self.size > 0 else []
+        self.loaded_version = version
+        logger.info(f"✅ 디퓨저 추천 풀 로드: {sum(len(entries) for entries in self._entries.values())}개 ({self.path})")
+        return True
+
+    async def follow(self) -> None:
+        """follower 워커: leader가 저장한 풀 파일이 바뀌면 다시 로드 (GPT/DB 호출 없음)"""
+        if not DIFFUSER_POOL_ENABLED:
+            return
+        while True:
+            self.load_if_changed()
+            await asyncio.sleep(DIFFUSER_POOL_FOLLOW_SECONDS)
+
+    async def refresh(self, service_factory: Callable[[], DiffuserRecommendationService], rotate: bool = False) -> None:
+        """
+        한 라운드: 부족한 항목을 채우고 rotate면 카테고리별로 항목 하나씩 교체한 뒤 풀 파일 저장
+
+        서비스는 라운드마다 service_factory로 새로 생성하고, 라운드가 끝나면 DB 연결/세션을 닫습니다.
+        """
+        service = await asyncio.to_thread(service_factory)
+        try:
+            await self.fill(service)
+            if rotate:
+                await self.rotate(service)
+            self.save()
+        finally:
+            await asyncio.to_thread(service.db_service.close)
+
+    async def run(self, service_factory: Callable[[], DiffuserRecommendationService]) -> None:
+        """leader 워커: 저장된 풀을 먼저 로드하고 부족한 항목을 채운 뒤 refresh_seconds마다 항목 교체"""
+        if not DIFFUSER_POOL_ENABLED or self.size <= 0:
+            return
+        self.load_if_changed()
+        try:
+            await self.refresh(service_factory)
+        except Exception as e:
+            logger.error(f"🚨 디퓨저 추천 풀 초기화 실패: {e}")
+
+        if self.refresh_seconds <= 0:
+            return
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.refresh(service_factory, rotate=True)
+            except Exception as e:
+                logger.error(f"🚨 디퓨저 추천 풀 갱신 실패: {e}")
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        return {
+            "enabled": DIFFUSER_POOL_ENABLED,
+            "size": self.size,
+            "refresh_seconds": self.refresh_seconds,
+            "categories": {
+                category: {
+                    "entries": len(entries),
+                    "oldest_age_seconds": round(now - min(entry.created_at for entry in entries), 1) if entries else None,
+                }
+                for category, entries in self._entries.items()
+            },
+            **self.stats,
+        }
+
+
+diffuser_pool = DiffuserRecommendationPool()
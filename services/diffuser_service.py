@@ -1,6 +1,9 @@
 import json
+import time
+import asyncio
 import logging
-from typing import Dict, List, Tuple
+import threading
+from typing import Awaitable, Dict, List, Optional, Tuple
 from models.client import GPTClient
 from services.db_service import DBService
 from fastapi import HTTPException
@@ -17,6 +20,56 @@ THERAPY_TITLES = {
     "리프레시 & 클린 에어": "#공기 청정 #깨끗한 환경"
 }
 
+# 향료 (id, name_kr) 목록 (spice_cache.json에서 한 번만 읽어 요청마다 DB를 조회하지 않음)
+_spice_names: Optional[List[Tuple[int, str]]] = None
+_spice_lock = threading.Lock()
+
+
+def load_spice_names(db_service: DBService) -> List[Tuple[int, str]]:
+    global _spice_names
+    if _spice_names is None:
+        with _spice_lock:
+            if _spice_names is None:
+                _spice_names = [(spice["id"], spice["name_kr"]) for spice in db_service.load_cached_spice_data() if spice.get("name_kr")]
+    return _spice_names
+
+
+def find_spices_by_names(spice_names: List[Tuple[int, str]], note_names: List[str]) -> List[Dict]:
+    """DBService.get_spices_by_names와 같은 결과를 메모리에서 계산 (이름 부분 일치, 정확히 일치하는 향료 먼저, 이름순)"""
+    notes = [note.strip() for note in note_names if note.strip()]
+    exact = set(notes)
+    matched = [
+        {"id": spice_id, "name_kr": name}
+        for spice_id, name in spice_names
+        if any(note in name for note in notes)
+    ]
+    return sorted(matched, key=lambda spice: (spice["name_kr"] not in exact, spice["name_kr"]))
+
+
+def build_recommendation_response(user_input: str, diffusers: List[Dict], usage_routine: str) -> Dict:
+    """/diffuser/recommend 응답 구성 (실시간 추천과 추천 풀이 같은 형식 사용)"""
+    recommendations = [
+        {
+            'product_id': diffuser['id'],
+            'name': f"{diffuser['name_kr']} {diffuser.get('volume', '200ml')}",
+            'brand': diffuser['brand'],
+            'content': diffuser['content']
+        }
+        for diffuser in diffusers[:2]
+    ]
+
+    return {
+        'recommendations': recommendations,
+        'usage_routine': usage_routine,
+        'therapy_title': THERAPY_TITLES[user_input]
+    }
+
+
+def format_server_timing(timings: Dict[str, float]) -> str:
+    """Server-Timing 헤더 값 (초 단위 측정값을 ms로)"""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
 class DiffuserRecommendationService:
     def __init__(self, gpt_client: GPTClient, db_service: DBService) -> None:
         self.gpt_client = gpt_client
@@ -89,48 +142,59 @@ class DiffuserRecommendationService:
         result = json.loads(response.strip())
         return result["usage_routine"]
 
-    async def recommend_diffusers(self, user_input: str) -> Dict:
-        """카테고리에 맞는 디퓨저 추천"""
+    async def _timed(self, timings: Dict[str, float], name: str, awaitable: Awaitable):
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            timings[name] = time.perf_counter() - started
+
+    async def get_spices(self, note_names: List[str]) -> List[Dict]:
+        """향료 이름으로 향료 검색 (spice_cache가 없으면 작업 스레드에서 DB 조회)"""
+        spice_names = await asyncio.to_thread(load_spice_names, self.db_service)
+        if spice_names:
+            return find_spices_by_names(spice_names, note_names)
+        return await asyncio.to_thread(self.db_service.get_spices_by_names, note_names)
+
+    async def recommend_diffusers(self, user_input: str, timings: Optional[Dict[str, float]] = None) -> Dict:
+        """
+        카테고리에 맞는 디퓨저 추천
+
+        timings를 넘기면 단계별 소요 시간(초)을 기록합니다 (라우터의 Server-Timing 헤더용).
+        """
+        timings = timings if timings is not None else {}
+        started = time.perf_counter()
         try:
             logger.info(f"Generating recommendation for: {user_input}")
             
             if user_input not in self.user_input_info:
                 raise ValueError("유효하지 않은 카테고리입니다")
             
-            # 1. GPT를 통해 향료 조합 추천 받기
-            recommended_notes = await self.get_recommended_notes(user_input)
+            # 1. GPT 향료 조합 추천과 사용 루틴 생성 (둘 다 user_input에만 의존하므로 동시에 호출)
+            recommended_notes, usage_routine = await self._timed(timings, "llm", asyncio.gather(
+                self._timed(timings, "llm_notes", self.get_recommended_notes(user_input)),
+                self._timed(timings, "llm_routine", self.get_usage_routine(user_input)),
+            ))
             
-            # 2. 추천받은 향료들로 디퓨저 검색
-            spices = self.db_service.get_spices_by_names(recommended_notes)
+            # 2. 추천받은 향료들로 디퓨저 검색 (메모리의 향료 목록 사용)
+            spices = await self._timed(timings, "spices", self.get_spices(recommended_notes))
             if not spices:
                 raise ValueError("추천할 수 있는 향료가 없습니다")
 
-            # 3. 해당 향료들이 포함된 디퓨저 찾기
+            # 3. 해당 향료들이 포함된 디퓨저 찾기 (DB 조회는 이벤트 루프를 막지 않도록 작업 스레드에서 실행)
             spice_ids = [spice['id'] for spice in spices]
-            diffusers = self.db_service.get_diffusers_by_spice_ids(spice_ids)
+            diffusers = await self._timed(
+                timings, "diffusers", asyncio.to_thread(self.db_service.get_diffusers_by_spice_ids, spice_ids)
+            )
             
             if not diffusers:
                 raise ValueError("추천할 수 있는 디퓨저가 없습니다")
-            
-            # 4. 사용 루틴 생성
-            usage_routine = await self.get_usage_routine(user_input)
-
-            # 5. 최종 응답 구성
-            recommendations = [
-                {
-                    'product_id': diffuser['id'],
-                    'name': f"{diffuser['name_kr']} {diffuser.get('volume', '200ml')}",
-                    'brand': diffuser['brand'],
-                    'content': diffuser['content']
-                }
-                for diffuser in diffusers[:2]
-            ]
-
-            return {
-                'recommendations': recommendations,
-                'usage_routine': usage_routine,
-                'therapy_title': THERAPY_TITLES[user_input]
-            }
+
+            # 4. 최종 응답 구성
+            timings["total"] = time.perf_counter() - started
+            logger.info(f"⏱️ 디퓨저 추천 단계별 시간: {format_server_timing(timings)}")
+
+            return build_recommendation_response(user_input, diffusers, usage_routine)
 
         except Exception as e:
             logger.error(f"추천 생성 실패: {str(e)}")
@@ -0,0 +1,299 @@
+import io
+import os
+import asyncio
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import httpx
+import numpy as np
+from PIL import Image
+from dotenv import load_dotenv
+from services.image_cache import DiskImageCache, content_key
+from services.scentlens_client import ScentlensClient, scentlens_client
+from services.model_registry import model_registry, load_convnext
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+LOCAL_MODEL_PATH = "facebook/convnext-base-224"
+
+
+class EmbeddingBackend(ABC):
+    """
+    scentlens 이미지 임베딩 백엔드 인터페이스
+
+    카탈로그(상품 이미지 URL 목록)와 업로드 이미지의 임베딩을 계산합니다.
+    카탈로그 임베딩은 디스크 임베딩 캐시(SCENTLENS_EMBEDDING_CACHE_DIR)에 저장되어 재시작이나 다른 워커 프로세스에서도 다시 계산하지 않습니다.
+    디스크 캐시는 SCENTLENS_EMBEDDING_CACHE_MAX_MB/SCENTLENS_EMBEDDING_CACHE_MAX_FILES를 넘으면 오래 쓰지 않은 파일부터 삭제합니다.
+
+    - 카탈로그 이미지는 `백엔드 이름 + URL + 검증값` 키로 저장합니다. 검증값은 HEAD 요청의 ETag
+      (없으면 Last-Modified + Content-Length)이므로, 같은 URL의 이미지가 바뀌면 캐시를 쓰지 않고 다시 계산합니다.
+      검증값을 얻지 못한 URL은 URL만으로는 내용이 같다고 볼 수 없으므로 URL 키 캐시를 사용하지 않습니다.
+    - 로컬 백엔드가 내려받은 카탈로그 이미지는 이미지 바이트의 sha256 키로도 저장합니다.
+    - 업로드 이미지는 사용자 요청마다 달라지므로 디스크에 쓰지 않고 메모리 LRU(SCENTLENS_QUERY_EMBEDDING_CACHE_SIZE개)에만 보관합니다.
+      (같은 바이트의 카탈로그 이미지 임베딩이 디스크에 있으면 읽어서 사용)
+    """
+
+    name = "base"
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.embedding_cache = DiskImageCache(
+            cache_dir or os.getenv("SCENTLENS_EMBEDDING_CACHE_DIR", "cache/embeddings"),
+            prefix="embedding_",
+            max_bytes=int(float(os.getenv("SCENTLENS_EMBEDDING_CACHE_MAX_MB", "1024")) * 1024 * 1024),
+            max_files=int(os.getenv("SCENTLENS_EMBEDDING_CACHE_MAX_FILES", "200000")),
+        )
+        self.query_cache_size = int(os.getenv("SCENTLENS_QUERY_EMBEDDING_CACHE_SIZE", "256"))
+        self._query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.download_concurrency = int(os.getenv("SCENTLENS_DOWNLOAD_CONCURRENCY", "8"))
+        self.download_timeout = float(os.getenv("SCENTLENS_DOWNLOAD_TIMEOUT", "20"))
+
+    def cache_key(self, source: str) -> str:
+        return content_key(self.name, source)
+
+    def load_cached(self, source: str) -> Optional[np.ndarray]:
+        path = self.embedding_cache.get(self.cache_key(source), "npy")
+        if path is None:
+            return None
+        try:
+            return np.load(path)
+        except (OSError, ValueError):
+            return None
+
+    def store_cached(self, source: str, embedding, evict: bool = True) -> None:
+        buffer = io.BytesIO()
+        np.save(buffer, np.asarray(embedding, dtype=np.float32))
+        self.embedding_cache.put(self.cache_key(source), "npy", buffer.getvalue(), evict=evict)
+
+    @staticmethod
+    def content_source(data: bytes) -> str:
+        """이미지 바이트 기준 캐시 소스 (URL과 관계없이 내용이 같으면 같은 키)"""
+        return "content:" + hashlib.sha256(data).hexdigest()
+
+    async def fetch_validators(self, urls: List[str]) -> Dict[str, Optional[str]]:
+        """URL별 HEAD 응답 검증값 (ETag, 없으면 Last-Modified + Content-Length). 얻지 못하면 None"""
+        semaphore = asyncio.Semaphore(max(1, self.download_concurrency))
+
+        async def head(client: httpx.AsyncClient, url: str) -> Optional[str]:
+            async with semaphore:
+                try:
+                    response = await client.head(url)
+                except httpx.HTTPError:
+                    return None
+            if response.status_code != 200:
+                return None
+            if response.headers.get("etag"):
+                return "etag:" + response.headers["etag"]
+            if response.headers.get("last-modified"):
+                return f"last-modified:{response.headers['last-modified']}:{response.headers.get('content-length', '')}"
+            return None
+
+        async with httpx.AsyncClient(timeout=self.download_timeout, follow_redirects=True) as client:
+            validators = await asyncio.gather(*(head(client, url) for url in urls))
+        return dict(zip(urls, validators))
+
+    async def embed_catalog(self, product_image_data: List[dict]) -> Tuple[List[dict], int]:
+        """
+        상품 이미지 목록의 임베딩 계산 (URL과 검증값이 같은 캐시가 없는 이미지만 백엔드로 계산)
+
+        Returns:
+            Tuple[List[dict], int]: ({id, url, product_id, status, embedding | error} 목록, 실패한 청크 수)
+        """
+        validators = await self.fetch_validators(list(dict.fromkeys(item["url"] for item in product_image_data)))
+        sources = {url: f"{url}\n{validator}" for url, validator in validators.items() if validator is not None}
+
+        cached = await asyncio.to_thread(
+            lambda: [self.load_cached(sources[item["url"]]) if item["url"] in sources else None for item in product_image_data]
+        )
+        results, missing = [], []
+        for item, embedding in zip(product_image_data, cached):
+            if embedding is None:
+                missing.append(item)
+            else:
+                results.append({**item, "status": "success", "embedding": embedding})
+        logger.info(
+            f"임베딩 캐시 적중 {len(results)}개, 계산 필요 {len(missing)}개, 검증값 없음 {len(validators) - len(sources)}개 ({self.name})"
+        )
+
+        failed_chunks = 0
+        if missing:
+            computed, failed_chunks = await self._embed_catalog(missing)
+            succeeded = [item for item in computed if item.get("status") == "success" and item["url"] in sources]
+            await asyncio.to_thread(
+                lambda: [self.store_cached(sources[item["url"]], item["embedding"], evict=False) for item in succeeded]
+            )
+            results.extend(computed)
+            # 저장할 때마다 디렉터리를 훑지 않도록 카탈로그 저장이 끝난 뒤 한 번만 정리
+            await asyncio.to_thread(self.embedding_cache.evict)
+        return results, failed_chunks
+
+    async def embed_query(self, image_bytes: bytes) -> Optional[List[float]]:
+        """업로드된 이미지 한 장의 임베딩 계산 (같은 바이트는 메모리 캐시 또는 카탈로그 디스크 캐시 재사용)"""
+        source = self.content_source(image_bytes)
+        embedding = self._query_cache.get(source)
+        if embedding is not None:
+            self._query_cache.move_to_end(source)
+            return embedding
+
+        cached = await asyncio.to_thread(self.load_cached, source)
+        embedding = cached.tolist() if cached is not None else await self._embed_query(image_bytes)
+        if embedding is not None and self.query_cache_size > 0:
+            self._query_cache[source] = embedding
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+        return embedding
+
+    @abstractmethod
+    async def _embed_catalog(self, product_image_data: List[dict]) -> Tuple[List[dict], int]:
+        """캐시에 없는 상품 이미지들의 임베딩 계산"""
+
+    @abstractmethod
+    async def _embed_query(self, image_bytes: bytes) -> Optional[List[float]]:
+        """업로드 이미지 한 장의 임베딩 계산"""
+
+    async def aclose(self) -> None:
+        pass
+
+
+class HttpEmbeddingBackend(EmbeddingBackend):
+    """기존 원격 GPU 서버(SCENTLENS_SERVER_URL)로 임베딩 계산"""
+
+    name = "http"
+
+    def __init__(self, client: Optional[ScentlensClient] = None, cache_dir: Optional[str] = None):
+        super().__init__(cache_dir)
+        self.client = client or scentlens_client
+
+    async def _embed_catalog(self, product_image_data: List[dict]) -> Tuple[List[dict], int]:
+        return await self.client.download_and_compute_embeddings(product_image_data)
+
+    async def _embed_query(self, image_bytes: bytes) -> Optional[List[float]]:
+        return await self.client.compute_embedding(image_bytes)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    로컬 ConvNeXt(facebook/convnext-base-224)로 CPU/GPU에서 직접 임베딩 계산
+
+    모델은 model_registry에서 모델 id로 가져오므로 services.similar_image가 같은 모델을 사용하면 인스턴스를 공유합니다.
+    이미지는 비동기로 병렬 다운로드하고, 추론은 전용 스레드에서 batch_size 단위로 묶어 실행합니다.
+    내려받은 이미지 바이트가 캐시에 있으면(검증값이 없거나 바뀐 URL이라도 내용이 같으면) 추론하지 않습니다.
+    """
+
+    def __init__(self, model_path: Optional[str] = None, cache_dir: Optional[str] = None):
+        self.model_path = model_path or os.getenv("SCENTLENS_LOCAL_MODEL", LOCAL_MODEL_PATH)
+        self.name = f"local:{self.model_path}"
+        super().__init__(cache_dir)
+
+        self.batch_size = int(os.getenv("SCENTLENS_LOCAL_BATCH_SIZE", "16"))
+
+        # 추론은 한 스레드에서만 실행 (torch 연산 자체가 내부적으로 멀티스레드)
+        self._create_executor()
+        # pre-fork 배포(serve.py)에서 마스터가 사용한 실행기 스레드는 자식에 없으므로 새로 생성
+        os.register_at_fork(after_in_child=self._create_executor)
+        model_registry.register(self.model_path, lambda: load_convnext(self.model_path))
+
+    def _create_executor(self) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scentlens-embedding")
+
+    def embed_images(self, images: List[Image.Image]) -> np.ndarray:
+        """PIL 이미지 목록을 batch_size 단위로 추론하여 (N, D) 임베딩 반환"""
+        import torch
+
+        embeddings = []
+        with model_registry.use(self.model_path) as (model, processor):
+            device = next(model.parameters()).device
+            for start in range(0, len(images), max(1, self.batch_size)):
+                batch = images[start:start + self.batch_size]
+                with torch.inference_mode():
+                    inputs = processor(images=batch, return_tensors="pt").to(device)
+                    # pooler_output: 전역 평균 풀링 + LayerNorm 적용된 이미지 벡터
+                    embeddings.append(model(**inputs).pooler_output.float().cpu().numpy())
+        return np.concatenate(embeddings) if embeddings else np.zeros((0, 0), dtype=np.float32)
+
+    async def _run_inference(self, images: List[Image.Image]) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.embed_images, images)
+
+    async def _embed_catalog(self, product_image_data: List[dict]) -> Tuple[List[dict], int]:
+        semaphore = asyncio.Semaphore(max(1, self.download_concurrency))
+        results: List[dict] = []
+        pending_items: List[dict] = []
+        pending_images: List[Image.Image] = []
+        pending_sources: List[str] = []
+
+        async def download(client: httpx.AsyncClient, item: dict):
+            async with semaphore:
+                try:
+                    response = await client.get(item["url"])
+                    response.raise_for_status()
+                    source = self.content_source(response.content)
+                    embedding = await asyncio.to_thread(self.load_cached, source)
+                    if embedding is not None:
+                        return item, None, source, embedding, None
+                    image = await asyncio.to_thread(lambda: Image.open(io.BytesIO(response.content)).convert("RGB"))
+                    return item, image, source, None, None
+                except Exception as e:
+                    return item, None, None, None, str(e)
+
+        async def flush():
+            if not pending_images:
+                return
+            embeddings = await self._run_inference(pending_images)
+            for item, embedding in zip(pending_items, embeddings):
+                results.append({**item, "status": "success", "embedding": embedding})
+            await asyncio.to_thread(
+                lambda: [self.store_cached(source, embedding, evict=False) for source, embedding in zip(pending_sources, embeddings)]
+            )
+            logger.info(f"로컬 임베딩 계산 {len(results)}/{len(product_image_data)}")
+            pending_items.clear()
+            pending_images.clear()
+            pending_sources.clear()
+
+        # 다운로드가 끝나는 대로 batch_size씩 모아 추론 (다운로드와 추론이 겹쳐서 진행)
+        async with httpx.AsyncClient(timeout=self.download_timeout, follow_redirects=True) as client:
+            for task in asyncio.as_completed([download(client, item) for item in product_image_data]):
+                item, image, source, embedding, error = await task
+                if embedding is not None:
+                    results.append({**item, "status": "success", "embedding": embedding})
+                    continue
+                if image is None:
+                    results.append({**item, "status": "error", "error": error})
+                    continue
+                pending_items.append(item)
+                pending_images.append(image)
+                pending_sources.append(source)
+                if len(pending_images) >= self.batch_size:
+                    await flush()
+            await flush()
+
+        return results, 0
+
+    async def _embed_query(self, image_bytes: bytes) -> Optional[List[float]]:
+        image = await asyncio.to_thread(lambda: Image.open(io.BytesIO(image_bytes)).convert("RGB"))
+        embeddings = await self._run_inference([image])
+        return embeddings[0].tolist()
+
+    async def aclose(self) -> None:
+        self.executor.shutdown(wait=False)
+
+
+def create_embedding_backend() -> EmbeddingBackend:
+    """SCENTLENS_EMBEDDING_BACKEND(http/local) 설정. 없으면 SCENTLENS_SERVER_URL 유무로 결정"""
+    backend = os.getenv("SCENTLENS_EMBEDDING_BACKEND") or ("http" if os.getenv("SCENTLENS_SERVER_URL") else "local")
+    backend = backend.lower()
+    if backend == "http":
+        return HttpEmbeddingBackend()
+    if backend == "local":
+        return LocalEmbeddingBackend()
+    raise ValueError(f"지원하지 않는 임베딩 백엔드입니다: {backend} (http, local)")
+
+
+embedding_backend = create_embedding_backend()
@@ -0,0 +1,164 @@
+import os
+import re
+import uuid
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(*parts: str) -> str:
+    """여러 문자열을 이어 붙여 충돌 없는 sha256 키를 생성"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class _InflightCall:
+    """single-flight: 같은 키에 대한 동시 요청이 하나의 생성 결과를 공유하도록 대기"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Optional[Path] = None
+        self.error: Optional[BaseException] = None
+
+
+class DiskImageCache:
+    """
+    키(해시) 기반 디스크 이미지 캐시
+
+    - 파일명은 `<prefix><key>.<ext>` 형식으로 키가 같으면 같은 파일을 가리킵니다. 키는 content_key()의 sha256 값입니다.
+    - 쓰기는 임시 파일에 기록한 뒤 os.replace로 교체하므로 읽는 쪽에서 반쯤 쓰인 파일을 보지 않습니다.
+    - 캐시 적중 시 mtime을 갱신하고, 총 용량/파일 수를 넘으면 mtime이 오래된 파일부터 삭제합니다(LRU).
+
+    보존 정책: 정리 대상은 캐시가 만든 파일(`<prefix><sha256 64자리>.<ext>`)뿐입니다.
+    같은 디렉터리의 다른 파일(예: 채팅 기록이 참조하는 `generated_image_<타임스탬프>.jpeg` 레거시 이미지)은
+    prefix가 같아도 용량/개수 집계와 삭제 대상에서 제외되어 삭제되지 않습니다.
+    캐시 파일은 한도 안에서는 계속 보관되며, 한도를 넘으면 가장 오래 사용되지 않은 파일부터 삭제됩니다.
+    """
+
+    def __init__(self, directory: str, prefix: str = "", max_bytes: Optional[int] = None, max_files: Optional[int] = None):
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._managed_name = re.compile(rf"{re.escape(prefix)}[0-9a-f]{{64}}\.[A-Za-z0-9]+")
+
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, _InflightCall] = {}
+
+    def is_managed(self, name: str) -> bool:
+        """캐시가 만든 파일인지 여부 (evict는 이 파일들만 집계/삭제)"""
+        return self._managed_name.fullmatch(name) is not None
+
+    def path_for(self, key: str, ext: str) -> Path:
+        return self.directory / f"{self.prefix}{key}.{ext}"
+
+    def get(self, key: str, ext: str) -> Optional[Path]:
+        """캐시된 파일 경로를 반환하고 최근 사용 시각을 갱신. 없으면 None"""
+        path = self.path_for(key, ext)
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, ext: str, data: bytes, evict: bool = True) -> Path:
+        """
+        데이터를 원자적으로 저장한 뒤 용량 초과분을 정리
+
+        evict=False이면 정리를 건너뜁니다. 여러 파일을 연달아 저장할 때 매번 디렉터리를 훑지 않도록
+        저장이 끝난 뒤 evict()를 한 번 호출합니다.
+        """
+        path = self.path_for(key, ext)
+        tmp_path = self.directory / f".{path.name}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+        if evict:
+            self.evict()
+        return path
+
+    def get_or_create(self, key: str, ext: str, producer: Callable[[], bytes]) -> Tuple[Path, bool]:
+        """
+        캐시에 있으면 그대로 반환하고, 없으면 producer()로 생성하여 저장합니다.
+        같은 키를 동시에 요청하면 producer는 한 번만 호출됩니다.
+
+        Returns:
+            Tuple[Path, bool]: (파일 경로, 이번 호출에서 새로 생성했는지 여부)
+        """
+        cached = self.get(key, ext)
+        if cached is not None:
+            return cached, False
+
+        with self._lock:
+            call = self._inflight.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InflightCall()
+                self._inflight[key] = call
+
+        if not is_leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, False
+
+        try:
+            # 대기 중 다른 요청이 이미 저장했을 수 있으므로 다시 확인
+            cached = self.get(key, ext)
+            if cached is not None:
+                call.result = cached
+                return cached, False
+
+            call.result = self.put(key, ext, producer())
+            return call.result, True
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.event.set()
+
+    def evict(self) -> None:
+        """최근 사용 시각(mtime) 기준으로 오래된 파일부터 삭제하여 용량/개수 한도를 맞춤"""
+        if self.max_bytes is None and self.max_files is None:
+            return
+
+        entries = []
+        total_bytes = 0
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or not self.is_managed(entry.name):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_bytes += stat.st_size
+
+        over_bytes = self.max_bytes is not None and total_bytes > self.max_bytes
+        over_files = self.max_files is not None and len(entries) > self.max_files
+        if not (over_bytes or over_files):
+            return
+
+        entries.sort()
+        file_count = len(entries)
+        for _, size, path in entries:
+            if (self.max_bytes is None or total_bytes <= self.max_bytes) and (self.max_files is None or file_count <= self.max_files):
+                break
+            try:
+                os.remove(path)
+                total_bytes -= size
+                file_count -= 1
+                logger.info(f"🗑️ 이미지 캐시 정리: {path}")
+            except FileNotFoundError:
+                continue
@@ -1,30 +1,171 @@
 import os
+import re
 import logging
-from fastapi import FastAPI, HTTPException
+import mimetypes
+from pathlib import Path
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Iterator, Mapping, Optional, Tuple
+from fastapi import HTTPException
 from dotenv import load_dotenv
-from fastapi.responses import Response
-from PIL import Image
+from fastapi.responses import Response, FileResponse, StreamingResponse
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 load_dotenv()
 
+# 파일 시그니처(매직 넘버) 기반 이미지 형식 판별
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
 class ImageFetchService:
     def __init__(self):
-        pass
+        self.image_root = Path(os.getenv("IMAGE_FOLDER", "generated_images")).resolve()
+        # 파일을 제공할 수 있는 디렉터리 목록 (파생 이미지 캐시 등이 추가로 등록됨)
+        self.allowed_roots = [self.image_root]
+        self.chunk_size = 64 * 1024
+        self.max_age = int(os.getenv("IMAGE_CACHE_MAX_AGE", "86400"))
 
-    def get_image(self, image_path: str):
-        # Ensure the image exists
-        if not os.path.exists(image_path) or not os.path.isfile(image_path):
+    def resolve_path(self, image_path: str) -> Path:
+        """요청 경로를 이미지 루트 내부의 실제 파일 경로로 변환 (루트 밖 경로는 거부)"""
+        if image_path.startswith("/static/"):
+            candidate = self.image_root / image_path[len("/static/"):]
+        else:
+            candidate = Path(image_path)
+            if not candidate.is_absolute():
+                # `generated_images/<파일명>`(작업 디렉터리 기준) 또는 `<파일명>`(루트 기준) 모두 허용
+                cwd_candidate = Path.cwd() / candidate
+                candidate = cwd_candidate if cwd_candidate.exists() else self.image_root / candidate
+
+        resolved = candidate.resolve()
+        if not any(resolved.is_relative_to(root) for root in self.allowed_roots):
+            raise HTTPException(status_code=403, detail="Image path is not allowed")
+        if not resolved.is_file():
             raise HTTPException(status_code=404, detail="Image not found")
+        return resolved
+
+    def detect_media_type(self, path: Path) -> str:
+        with open(path, "rb") as image_file:
+            header = image_file.read(16)
+
+        for signature, media_type in IMAGE_SIGNATURES:
+            if header.startswith(signature):
+                return media_type
+        if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            return "image/webp"
+        if header[4:8] == b"ftyp" and header[8:12] in (b"avif", b"avis"):
+            return "image/avif"
+
+        return mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+    def get_image(self, image_path: str, request_headers: Optional[Mapping[str, str]] = None) -> Response:
+        """
+        이미지를 파일 스트리밍으로 반환합니다.
+
+        파일 전체를 메모리에 올리지 않고 FileResponse/StreamingResponse로 전송하며,
+        ETag/Last-Modified 기반 304 응답과 단일 Range 요청(206)을 지원합니다.
+        """
+        request_headers = request_headers or {}
+        path = self.resolve_path(image_path)
+        stat = path.stat()
+
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+            "Cache-Control": f"public, max-age={self.max_age}",
+            "Accept-Ranges": "bytes",
+        }
+
+        if self.is_not_modified(request_headers, etag, stat.st_mtime):
+            return Response(status_code=304, headers=headers)
+
+        media_type = self.detect_media_type(path)
+
+        # 다중 범위 요청은 지원하지 않으므로 전체 파일로 응답
+        range_header = request_headers.get("range")
+        if range_header and "," not in range_header and self.if_range_matches(request_headers, etag, stat.st_mtime):
+            byte_range = self.parse_range(range_header, stat.st_size)
+            if byte_range is None:
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{stat.st_size}"})
+
+            start, end = byte_range
+            headers.update({
+                "Content-Range": f"bytes {start}-{end}/{stat.st_size}",
+                "Content-Length": str(end - start + 1),
+            })
+            return StreamingResponse(
+                self.iter_file(path, start, end),
+                status_code=206,
+                media_type=media_type,
+                headers=headers,
+            )
+
+        return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
+
+    def is_not_modified(self, request_headers: Mapping[str, str], etag: str, mtime: float) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def if_range_matches(self, request_headers: Mapping[str, str], etag: str, mtime: float) -> bool:
+        """If-Range 조건이 없거나 현재 파일과 일치할 때만 부분 응답"""
+        if_range = request_headers.get("if-range")
+        if not if_range:
+            return True
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            return if_range == etag
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_range).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    def parse_range(self, range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+        """`bytes=start-end` 형식의 단일 범위를 (start, end)로 변환. 만족할 수 없으면 None"""
+        match = RANGE_PATTERN.match(range_header.strip())
+        if not match or file_size == 0:
+            return None
 
-        # Read the image as raw bytes
-        with open(image_path, "rb") as image_file:
-            image_bytes = image_file.read()
+        start, end = match.groups()
+        if start == "":
+            if end == "":
+                return None
+            # 마지막 N바이트 요청
+            length = min(int(end), file_size)
+            if length == 0:
+                return None
+            return file_size - length, file_size - 1
 
-        # image = Image.open(io.BytesIO(image_bytes))
-        # image.show()
+        start = int(start)
+        end = int(end) if end else file_size - 1
+        if start >= file_size or end < start:
+            return None
+        return start, min(end, file_size - 1)
 
-        # Return the raw bytes as a response with correct media type
-        return Response(content=image_bytes, media_type="image/jpeg")
\ No newline at end of file
+    def iter_file(self, path: Path, start: int, end: int) -> Iterator[bytes]:
+        with open(path, "rb") as image_file:
+            image_file.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = image_file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
@@ -1,9 +1,9 @@
 import os
+import re
 import requests
 import logging
-from datetime import datetime
 from dotenv import load_dotenv
-from pathlib import Path
+from services.image_cache import DiskImageCache, content_key
 
 # 로거 설정
 logger = logging.getLogger(__name__)
@@ -12,6 +12,9 @@ logging.basicConfig(level=logging.INFO)
 # 환경 변수 로드
 load_dotenv()
 
+STABILITY_GENERATE_URL = "https://api.stability.ai/v2beta/stable-image/generate/sd3"
+OUTPUT_FORMAT = "jpeg"
+
 
 class ImageGenerationService:
     def __init__(self):
@@ -23,50 +26,70 @@ class ImageGenerationService:
         if not self.stability_api_key:
             raise ValueError("STABILITY_API_KEY 환경 변수가 설정되지 않았습니다.")
 
-    def generate_image(self, imageGeneratePrompt: str) -> dict:
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.stability_api_key}",
-                "Accept": "image/*",
-            }
-            files = {
-                "prompt": (None, imageGeneratePrompt),
-                "output_format": (None, "jpeg"),
-            }
+        # 프롬프트 해시 기반 이미지 저장소 (동일 프롬프트 재사용 + LRU/용량 기반 정리)
+        # 정리 대상은 해시 파일명(generated_image_<sha256>.jpeg)뿐이며, 채팅 기록이 참조하는
+        # 레거시 타임스탬프 파일(generated_image_<YYYYmmdd_HHMMSS>.jpeg)은 삭제하지 않음
+        self.image_store = DiskImageCache(
+            self.image_folder,
+            prefix="generated_image_",
+            max_bytes=int(float(os.getenv("IMAGE_CACHE_MAX_MB", "1024")) * 1024 * 1024),
+            max_files=int(os.getenv("IMAGE_CACHE_MAX_FILES", "5000")),
+        )
 
-            response = requests.post(
-                "https://api.stability.ai/v2beta/stable-image/generate/sd3",
-                headers=headers,
-                files=files,
-            )
+    @staticmethod
+    def prompt_key(imageGeneratePrompt: str) -> str:
+        """공백을 정규화한 프롬프트와 생성 옵션으로 캐시 키 생성"""
+        normalized_prompt = re.sub(r"\s+", " ", imageGeneratePrompt).strip()
+        return content_key(STABILITY_GENERATE_URL, OUTPUT_FORMAT, normalized_prompt)
 
-            if response.status_code == 200:
-                output_filename = (
-                    f"generated_image_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpeg"
-                )
+    def request_image(self, imageGeneratePrompt: str) -> bytes:
+        """Stability API를 호출하여 이미지 바이트를 반환"""
+        headers = {
+            "Authorization": f"Bearer {self.stability_api_key}",
+            "Accept": "image/*",
+        }
+        files = {
+            "prompt": (None, imageGeneratePrompt),
+            "output_format": (None, OUTPUT_FORMAT),
+        }
 
-                # 파일 저장 경로
-                output_path = Path(self.image_folder) / output_filename
+        response = requests.post(
+            STABILITY_GENERATE_URL,
+            headers=headers,
+            files=files,
+        )
 
-                # 이미지 저장
-                with open(output_path, "wb") as file:
-                    file.write(response.content)
+        if response.status_code == 200:
+            return response.content
 
-                # URL 경로 생성 - /static/ 다음에 바로 파일명이 오도록 수정
-                relative_url = f"/static/{output_filename}"
+        try:
+            error_details = response.json()
+        except ValueError:
+            error_details = response.text
+        logger.error(f"이미지 생성 실패: {error_details}")
+        raise ValueError(f"이미지 생성 오류: {error_details}")
 
+    def generate_image(self, imageGeneratePrompt: str) -> dict:
+        try:
+            # 동일 프롬프트는 저장된 이미지를 재사용하고, 동시에 들어온 중복 요청은 한 번만 생성
+            output_path, created = self.image_store.get_or_create(
+                self.prompt_key(imageGeneratePrompt),
+                OUTPUT_FORMAT,
+                lambda: self.request_image(imageGeneratePrompt),
+            )
+
+            # URL 경로 생성 - /static/ 다음에 바로 파일명이 오도록 수정
+            relative_url = f"/static/{output_path.name}"
+
+            if created:
                 logger.info(f"이미지가 성공적으로 생성되었습니다: {output_path}")
-                return {
-                    "output_path": relative_url,
-                    "absolute_path": str(output_path.resolve()),
-                }
             else:
-                try:
-                    error_details = response.json()
-                except ValueError:
-                    error_details = response.text
-                logger.error(f"이미지 생성 실패: {error_details}")
-                raise ValueError(f"이미지 생성 오류: {error_details}")
+                logger.info(f"캐시된 이미지를 재사용합니다: {output_path}")
+            return {
+                "output_path": relative_url,
+                "absolute_path": str(output_path.resolve()),
+                "cached": not created,
+            }
 
         except Exception as e:
             logger.error(f"이미지 생성 중 오류 발생: {str(e)}")
@@ -0,0 +1,240 @@
+import os
+import re
+import json
+import time
+import uuid
+import random
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from dotenv import load_dotenv
+from services.image_generation_service import ImageGenerationService
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+# 환경 변수 로드
+load_dotenv()
+
+# 작업 상태
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+# 작업 상태를 저장하는 디렉터리 (pre-fork 배포에서 작업을 등록한 워커가 아니어도 상태를 조회할 수 있도록 공유)
+IMAGE_JOB_DIR = os.getenv("IMAGE_JOB_DIR", "cache/image_jobs")
+# 이 시간보다 오래된 작업 파일은 작업 등록 시 정리 (다른 워커가 등록한 작업 포함)
+IMAGE_JOB_RETENTION_SECONDS = int(os.getenv("IMAGE_JOB_RETENTION_SECONDS", "86400"))
+
+_job_id_pattern = re.compile(r"[0-9a-f]{32}")
+
+
+class ImageJobService:
+    """
+    이미지 생성을 추천 응답과 분리하기 위한 백그라운드 작업 큐
+
+    추천 응답은 작업 ID만 받아 즉시 반환되고, 실제 이미지 생성(프롬프트 번역 + Stability 호출)은
+    스레드 풀에서 처리됩니다. 실패한 생성 요청은 지수 백오프로 재시도하며,
+    결과는 get_job()으로 조회합니다.
+
+    작업 상태는 바뀔 때마다 job_dir/<작업 ID>.json에도 저장합니다. 작업은 등록한 프로세스에서만 실행되지만,
+    pre-fork 배포에서 조회 요청이 다른 워커로 가더라도 get_job()이 저장된 파일에서 상태를 읽어 반환합니다.
+    """
+
+    def __init__(
+        self,
+        image_service_factory: Callable[[], ImageGenerationService] = ImageGenerationService,
+        max_workers: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_seconds: Optional[float] = None,
+        max_jobs: int = 1000,
+        job_dir: Optional[str] = None,
+    ):
+        self.image_service_factory = image_service_factory
+        self.max_workers = max_workers or int(os.getenv("IMAGE_JOB_WORKERS", "2"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("IMAGE_JOB_MAX_RETRIES", "3"))
+        self.backoff_seconds = backoff_seconds if backoff_seconds is not None else float(os.getenv("IMAGE_JOB_BACKOFF_SECONDS", "2.0"))
+        self.max_jobs = max_jobs
+        self.job_dir = job_dir or IMAGE_JOB_DIR
+        self._last_prune = 0.0
+
+        self._image_service = None
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image-job")
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def image_service(self) -> ImageGenerationService:
+        """이미지 생성 서비스 지연 초기화 (API 키가 없을 때 서버 기동이 실패하지 않도록)"""
+        if self._image_service is None:
+            self._image_service = self.image_service_factory()
+        return self._image_service
+
+    def submit(self, build_prompt: Callable[[], str]) -> str:
+        """
+        이미지 생성 작업을 등록하고 작업 ID를 반환합니다.
+
+        Args:
+            build_prompt (Callable[[], str]): 워커에서 호출되어 이미지 프롬프트를 만드는 함수
+                (번역 등 느린 전처리도 응답 경로 밖에서 실행되도록 함수로 전달)
+
+        Returns:
+            str: 작업 ID
+        """
+        job_id = uuid.uuid4().hex
+        now = datetime.now().isoformat()
+        job = {
+            "job_id": job_id,
+            "status": JOB_PENDING,
+            "attempts": 0,
+            "image_path": None,
+            "output_path": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+        with self._lock:
+            self._jobs[job_id] = job
+            self._save(job)
+            self._evict_finished_jobs()
+        self._prune_stale_files()
+
+        self._executor.submit(self._run, job_id, build_prompt)
+        logger.info(f"🖼️ 이미지 생성 작업 등록: {job_id}")
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """작업 상태를 조회합니다. 이 프로세스의 작업이 아니면 저장된 파일에서 읽고, 존재하지 않으면 None 반환"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return dict(job)
+        return self._load(job_id)
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir, f"{job_id}.json")
+
+    def _save(self, job: Dict) -> None:
+        """작업 상태를 임시 파일에 쓴 뒤 교체 (다른 워커가 쓰다 만 파일을 읽지 않도록 함)"""
+        path = self._job_path(job["job_id"])
+        try:
+            os.makedirs(self.job_dir, exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(job, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"⚠️ 이미지 생성 작업 상태 저장 실패 ({job['job_id']}): {e}")
+
+    def _load(self, job_id: str) -> Optional[Dict]:
+        # 작업 ID는 uuid4 hex이므로 그 외의 값으로 임의 경로를 읽지 않도록 함
+        if not _job_id_pattern.fullmatch(job_id):
+            return None
+        try:
+            with open(self._job_path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"⚠️ 이미지 생성 작업 상태 로드 실패 ({job_id}): {e}")
+            return None
+
+    def _delete(self, job_id: str) -> None:
+        try:
+            os.remove(self._job_path(job_id))
+        except OSError:
+            pass
+
+    def _update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            job["updated_at"] = datetime.now().isoformat()
+            self._save(job)
+
+    def _evict_finished_jobs(self) -> None:
+        """보관 중인 작업 수가 상한을 넘으면 오래된 완료/실패 작업부터 제거"""
+        if len(self._jobs) <= self.max_jobs:
+            return
+        for job_id in list(self._jobs.keys()):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id]["status"] in (JOB_COMPLETED, JOB_FAILED):
+                del self._jobs[job_id]
+                self._delete(job_id)
+
+    def _prune_stale_files(self) -> None:
+        """보관 기간이 지난 작업 파일 정리 (디렉터리 전체를 훑으므로 보관 기간의 1/24 간격으로만 실행)"""
+        now = time.time()
+        if now - self._last_prune < IMAGE_JOB_RETENTION_SECONDS / 24:
+            return
+        self._last_prune = now
+        try:
+            entries = list(os.scandir(self.job_dir))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if now - entry.stat().st_mtime > IMAGE_JOB_RETENTION_SECONDS:
+                    os.remove(entry.path)
+            except OSError:
+                continue
+
+    def _run(self, job_id: str, build_prompt: Callable[[], str]) -> None:
+        self._update(job_id, status=JOB_RUNNING)
+
+        try:
+            image_prompt = build_prompt()
+        except Exception as e:
+            logger.error(f"🚨 이미지 프롬프트 생성 실패 ({job_id}): {e}")
+            self._update(job_id, status=JOB_FAILED, error=str(e))
+            return
+
+        last_error = None
+        for attempt in range(1, self.max_retries + 2):
+            self._update(job_id, attempts=attempt)
+            try:
+                image_result = self.image_service.generate_image(image_prompt)
+
+                raw_output_path = image_result.get("output_path") if isinstance(image_result, dict) else None
+                if not raw_output_path:
+                    raise ValueError("❌ 이미지 경로가 없습니다")
+
+                # 기존 응답 형식과 동일하게 `generated_images/<파일명>` 경로로 반환
+                filename = os.path.basename(raw_output_path)
+                image_path = os.path.join(self.image_service.image_folder, filename)
+
+                self._update(
+                    job_id,
+                    status=JOB_COMPLETED,
+                    image_path=image_path,
+                    output_path=raw_output_path,
+                    error=None,
+                )
+                logger.info(f"✅ 이미지 생성 작업 완료 ({job_id}): {image_path}")
+                return
+
+            except Exception as e:
+                last_error = e
+                if attempt > self.max_retries:
+                    break
+
+                # 지수 백오프 + 지터
+                delay = self.backoff_seconds * (2 ** (attempt - 1)) * (1 + random.random() * 0.1)
+                logger.warning(f"⚠️ 이미지 생성 실패 ({job_id}, {attempt}회차): {e} - {delay:.1f}초 후 재시도")
+                time.sleep(delay)
+
+        logger.error(f"🚨 이미지 생성 작업 실패 ({job_id}): {last_error}")
+        self._update(job_id, status=JOB_FAILED, error=str(last_error))
+
+
+# 프로세스 전역 작업 큐 (요청마다 생성되는 ProductService 간에 공유)
+image_job_service = ImageJobService()
@@ -1,84 +1,241 @@
 import os
+import time
+import queue
+import asyncio
+import threading
+import contextlib
 import torch
 from PIL import Image
 from transformers import AutoProcessor, AutoModelForCausalLM
 from io import BytesIO
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+from services.perceptual_cache import PerceptualCache, compute_image_hash
+from services.model_registry import model_registry
 
 # OpenMP 충돌 방지 설정
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 os.environ["OMP_NUM_THREADS"] = "1"
 
+CAPTION_PROMPT = "<MORE_DETAILED_CAPTION>"
+FLORENCE_LARGE = "microsoft/Florence-2-large"
+
+# 추론 프로필: quality(기존 동작), balanced(3 beams, 256 tokens), fast(greedy + int8 동적 양자화)
+# fast 프로필은 CAPTION_FAST_MODEL=microsoft/Florence-2-base 로 더 작은 모델을 사용할 수 있음
+CAPTION_PROFILES = {
+    "quality": {
+        "model": FLORENCE_LARGE,
+        "quantize": False,
+        "generate": {"max_new_tokens": 512, "num_beams": 5, "do_sample": True, "top_k": 50, "temperature": 0.7},
+    },
+    "balanced": {
+        "model": FLORENCE_LARGE,
+        "quantize": False,
+        "generate": {"max_new_tokens": 256, "num_beams": 3, "do_sample": False},
+    },
+    "fast": {
+        "model": os.getenv("CAPTION_FAST_MODEL", FLORENCE_LARGE),
+        "quantize": True,
+        "generate": {"max_new_tokens": 256, "num_beams": 1, "do_sample": False},
+    },
+}
+
+
+class CaptionBatcher:
+    """
+    캡션 생성 요청을 큐에 모아 하나의 추론 스레드에서 마이크로 배치로 처리
+
+    첫 요청이 들어오면 max_wait_ms 동안(또는 max_batch_size개가 찰 때까지) 추가 요청을 모은 뒤
+    한 번의 model.generate 호출로 처리합니다. 이벤트 루프는 결과 Future만 기다립니다.
+    """
+
+    def __init__(self, service: "ImageProcessingService", max_batch_size: int, max_wait_ms: float):
+        self.service = service
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._start_worker()
+        # pre-fork 배포(serve.py)에서는 스레드가 fork 후 자식에 복제되지 않으므로 자식에서 워커를 다시 시작
+        os.register_at_fork(after_in_child=self._start_worker)
+
+    def _start_worker(self) -> None:
+        self.requests: "queue.Queue[tuple]" = queue.Queue()
+        self.worker = threading.Thread(target=self._run, name="caption-batcher", daemon=True)
+        self.worker.start()
+
+    def submit(self, image_data: bytes, profile: str) -> Future:
+        future = Future()
+        self.requests.put((image_data, profile, future))
+        return future
+
+    def _collect_batch(self) -> list:
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+
+            # 디코딩 실패한 요청은 개별적으로 오류 처리하고 나머지는 프로필별로 묶어 배치 추론
+            groups: Dict[str, Tuple[list, list]] = {}
+            for image_data, profile, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    image = self.service.load_image(image_data)
+                except Exception as e:
+                    future.set_exception(e)
+                    continue
+                images, futures = groups.setdefault(profile, ([], []))
+                images.append(image)
+                futures.append(future)
+
+            for profile, (images, futures) in groups.items():
+                try:
+                    descriptions = self.service.caption_images(images, profile)
+                    for future, description in zip(futures, descriptions):
+                        future.set_result(description)
+                except Exception as e:
+                    for future in futures:
+                        future.set_exception(e)
+
+
 class ImageProcessingService:
-    def __init__(self):
-        """Florence-2 모델 및 프로세서를 초기화"""
+    def __init__(self, default_profile: Optional[str] = None, preload: bool = True):
+        """Florence-2 모델 및 프로세서를 초기화 (preload=False이면 기본 프로필 모델도 처음 요청될 때 로드)"""
+        self.device = "cuda:0" if torch.cuda.is_available() else "cpu"
+        self.torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
+        self.default_profile = self.resolve_profile(default_profile or os.getenv("CAPTION_PROFILE", "quality"))
+
+        # 기본 프로필 모델은 미리 로드, 나머지 프로필은 처음 요청될 때 로드
+        if preload:
+            self.get_model(self.default_profile)
+
+        # 같은/근사 중복 이미지(재압축, 리사이즈 등)는 추론 없이 캡션 재사용 (프로필별로 구분)
+        self.caption_cache = PerceptualCache("caption")
+
+        # 추론 전용 워커 (요청 큐 + 동적 마이크로 배칭)
+        self.batcher = CaptionBatcher(
+            self,
+            max_batch_size=int(os.getenv("CAPTION_MAX_BATCH_SIZE", "4")),
+            max_wait_ms=float(os.getenv("CAPTION_MAX_WAIT_MS", "20")),
+        )
+
+    def resolve_profile(self, profile: Optional[str]) -> str:
+        """프로필 이름 검증 (None이면 기본 프로필)"""
+        if profile is None:
+            return self.default_profile
+        if profile not in CAPTION_PROFILES:
+            raise ValueError(f"지원하지 않는 캡션 프로필입니다: {profile} ({', '.join(CAPTION_PROFILES)})")
+        return profile
+
+    def model_key(self, profile: str) -> str:
+        """프로필에 해당하는 model_registry 키 (같은 모델을 쓰는 프로필끼리는 공유)"""
+        config = CAPTION_PROFILES[profile]
+        model_name = config["model"]
+        # GPU에서는 float16으로 충분하므로 동적 양자화는 CPU에서만 적용
+        quantize = config["quantize"] and self.device == "cpu"
+
+        key = f"{model_name}:int8" if quantize else model_name
+        model_registry.register(key, lambda: self.load_model(model_name, quantize))
+        return key
+
+    def load_model(self, model_name: str, quantize: bool) -> Tuple[torch.nn.Module, AutoProcessor]:
+        """Florence-2 모델/프로세서 로드 (model_registry 로더)"""
         try:
-            print("🔹 Florence-2 모델 로드 중...")
-            self.device = "cuda:0" if torch.cuda.is_available() else "cpu"
-            self.torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
+            print(f"🔹 Florence-2 모델 로드 중... ({model_name}, 양자화: {quantize})")
 
             # 모델 및 프로세서 로드
-            self.model = AutoModelForCausalLM.from_pretrained(
-                "microsoft/Florence-2-large",
+            model = AutoModelForCausalLM.from_pretrained(
+                model_name,
                 torch_dtype=self.torch_dtype,
                 trust_remote_code=True
             ).to(self.device)
+            model.eval()
 
-            self.processor = AutoProcessor.from_pretrained(
-                "microsoft/Florence-2-large",
+            if quantize:
+                # Linear 레이어 가중치를 int8로 동적 양자화 (CPU 추론 가속 + 메모리 절감)
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+            processor = AutoProcessor.from_pretrained(
+                model_name,
                 trust_remote_code=True
             )
 
             print("✅ Florence-2 모델 로드 완료!")
-        
+            return model, processor
+
         except Exception as e:
             print(f"🚨 모델 초기화 중 오류 발생: {e}")
             raise RuntimeError("🚨 모델을 불러오는 중 오류 발생!")
 
-    def process_image(self, image_data: bytes) -> dict:
-        """이미지에서 텍스트 설명을 생성"""
-        try:
-            print("🔹 이미지 처리 중...")
-            image = Image.open(BytesIO(image_data)).convert("RGB")
-            image = image.resize((512, 512))
+    def get_model(self, profile: str) -> Tuple[torch.nn.Module, AutoProcessor]:
+        """프로필에 해당하는 모델/프로세서 반환 (필요하면 로드)"""
+        return model_registry.get(self.model_key(profile))
 
-            # 프롬프트 설정
-            prompt = "<MORE_DETAILED_CAPTION>"
-            inputs = self.processor(text=prompt, images=image, return_tensors="pt")
+    def load_image(self, image_data: bytes) -> Image.Image:
+        image = Image.open(BytesIO(image_data)).convert("RGB")
+        return image.resize((512, 512))
 
-            # 장치 및 데이터 타입 변환
-            # inputs["input_ids"] = inputs["input_ids"].to(self.device, dtype=torch.long)
-            # inputs["pixel_values"] = inputs["pixel_values"].to(self.device, dtype=torch.float16)
-
-            # # 모델 예측
-            # generated_ids = self.model.generate(
-            #     input_ids=inputs["input_ids"],
-            #     pixel_values=inputs["pixel_values"],
-            #     max_new_tokens=512,
-            #     num_beams=5,
-            #     do_sample=True,
-            #     top_k=50,
-            #     temperature=0.7
-            # )
+    def caption_images(self, images: List[Image.Image], profile: Optional[str] = None) -> List[str]:
+        """여러 이미지를 한 번의 generate 호출로 캡션 생성"""
+        profile = self.resolve_profile(profile)
 
+        # 추론 중에는 메모리 예산을 넘어도 모델을 내리지 않음
+        with model_registry.use(self.model_key(profile)) as (model, processor):
+            print(f"🔹 이미지 처리 중... (배치 크기: {len(images)}, 프로필: {profile})")
+            inputs = processor(text=[CAPTION_PROMPT] * len(images), images=images, return_tensors="pt")
+
+            # 장치 및 데이터 타입 변환
             inputs["input_ids"] = inputs["input_ids"].to(self.device, dtype=torch.long)
-            inputs["pixel_values"] = inputs["pixel_values"].to(self.device)
+            inputs["pixel_values"] = inputs["pixel_values"].to(self.device, dtype=self.torch_dtype)
 
-            # Automatic Mixed Precision 적용
-            with torch.cuda.amp.autocast():
-                generated_ids = self.model.generate(
+            # Automatic Mixed Precision은 GPU에서만 적용 (CPU에서는 의미 없는 오버헤드)
+            autocast = torch.autocast("cuda") if self.device.startswith("cuda") else contextlib.nullcontext()
+            with torch.no_grad(), autocast:
+                generated_ids = model.generate(
                     input_ids=inputs["input_ids"],
                     pixel_values=inputs["pixel_values"],
-                    max_new_tokens=512,
-                    num_beams=5,
-                    do_sample=True,
-                    top_k=50,
-                    temperature=0.7
+                    **CAPTION_PROFILES[profile]["generate"],
                 )
 
             # 텍스트 디코딩
-            description = self.processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
-            print("✅ 생성된 설명:", description)
+            descriptions = processor.batch_decode(generated_ids, skip_special_tokens=True)
+        print("✅ 생성된 설명:", descriptions)
+        return descriptions
 
+    def process_image(self, image_data: bytes, profile: Optional[str] = None) -> dict:
+        """이미지에서 텍스트 설명을 생성 (동기 호출용, 배치 워커를 거쳐 결과를 기다림)"""
+        try:
+            profile = self.resolve_profile(profile)
+            image_hash = compute_image_hash(image_data)
+            description = self.caption_cache.get(image_hash, profile)
+            if description is None:
+                description = self.batcher.submit(image_data, profile).result()
+                self.caption_cache.put(image_hash, description, profile)
+            return {"description": description}
+
+        except Exception as e:
+            print(f"🚨 이미지 처리 중 오류 발생: {e}")
+            return {"error": f"🚨 이미지 처리 실패: {str(e)}"}
+
+    async def process_image_async(self, image_data: bytes, profile: Optional[str] = None) -> dict:
+        """이미지에서 텍스트 설명을 생성 (이벤트 루프를 막지 않고 배치 워커 결과를 대기)"""
+        try:
+            profile = self.resolve_profile(profile)
+            image_hash = await asyncio.to_thread(compute_image_hash, image_data)
+            description = self.caption_cache.get(image_hash, profile)
+            if description is None:
+                description = await asyncio.wrap_future(self.batcher.submit(image_data, profile))
+                self.caption_cache.put(image_hash, description, profile)
             return {"description": description}
 
         except Exception as e:
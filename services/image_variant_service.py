@@ -0,0 +1,173 @@
+import os
+import io
+import asyncio
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Mapping, Optional, Tuple
+from fastapi import HTTPException
+from dotenv import load_dotenv
+from PIL import Image, ImageOps, features
+from services.image_cache import DiskImageCache, content_key
+from services.image_fetch_service import ImageFetchService
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+load_dotenv()
+
+SUPPORTED_FORMATS = ("jpeg", "webp", "avif", "png")
+FIT_MODES = ("contain", "cover")
+
+# Pillow 리사이즈/인코딩은 GIL을 해제하므로 스레드 풀로 병렬 처리
+executor = ThreadPoolExecutor(max_workers=int(os.getenv("IMAGE_VARIANT_WORKERS", "2")), thread_name_prefix="image-variant")
+
+
+class ImageVariantService:
+    """
+    원본 이미지로부터 크기/포맷/품질이 다른 파생 이미지(썸네일 등)를 생성하고 디스크에 캐싱합니다.
+
+    캐시 키는 원본 파일 내용 해시와 변환 파라미터의 조합이며,
+    파생 이미지 폴더 전체 용량은 IMAGE_VARIANT_CACHE_MAX_MB로 제한됩니다.
+    """
+
+    def __init__(self, image_fetch_service: Optional[ImageFetchService] = None):
+        self.image_fetch_service = image_fetch_service or ImageFetchService()
+        self.max_dimension = int(os.getenv("IMAGE_VARIANT_MAX_DIMENSION", "2048"))
+        self.default_quality = int(os.getenv("IMAGE_VARIANT_DEFAULT_QUALITY", "80"))
+        self.avif_supported = features.check("avif") is True
+
+        variant_folder = os.getenv("IMAGE_VARIANT_FOLDER", str(self.image_fetch_service.image_root / "variants"))
+        self.variant_cache = DiskImageCache(
+            variant_folder,
+            prefix="variant_",
+            max_bytes=int(float(os.getenv("IMAGE_VARIANT_CACHE_MAX_MB", "512")) * 1024 * 1024),
+        )
+        self.image_fetch_service.allowed_roots.append(self.variant_cache.directory.resolve())
+
+        # (경로, mtime, 크기) -> 원본 내용 해시
+        self._source_hashes: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._source_hash_lock = threading.Lock()
+
+    def negotiate_format(self, image_format: Optional[str], accept: str) -> str:
+        """요청 포맷 검증. `auto`이면 Accept 헤더에 따라 AVIF > WebP > JPEG 순으로 선택"""
+        image_format = (image_format or "auto").lower()
+        if image_format == "jpg":
+            image_format = "jpeg"
+
+        if image_format == "auto":
+            if self.avif_supported and "image/avif" in accept:
+                return "avif"
+            if "image/webp" in accept:
+                return "webp"
+            return "jpeg"
+
+        if image_format not in SUPPORTED_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported image format: {image_format}")
+        if image_format == "avif" and not self.avif_supported:
+            logger.warning("⚠️ AVIF 인코더가 없어 WebP로 대체합니다.")
+            return "webp"
+        return image_format
+
+    def source_hash(self, path: Path) -> str:
+        stat = path.stat()
+        cache_key = (str(path), stat.st_mtime_ns, stat.st_size)
+
+        with self._source_hash_lock:
+            if cache_key in self._source_hashes:
+                self._source_hashes.move_to_end(cache_key)
+                return self._source_hashes[cache_key]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as source_file:
+            for chunk in iter(lambda: source_file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        source_hash = digest.hexdigest()
+
+        with self._source_hash_lock:
+            self._source_hashes[cache_key] = source_hash
+            if len(self._source_hashes) > 4096:
+                self._source_hashes.popitem(last=False)
+        return source_hash
+
+    def render(self, path: Path, width: Optional[int], height: Optional[int], image_format: str, quality: int, fit: str) -> bytes:
+        """원본을 리사이즈/인코딩하여 바이트로 반환 (원본보다 크게 확대하지 않음)"""
+        with Image.open(path) as image:
+            image = ImageOps.exif_transpose(image)
+
+            if width or height:
+                target_width = min(width or image.width, image.width)
+                target_height = min(height or image.height, image.height)
+                if width and height and fit == "cover":
+                    image = ImageOps.fit(image, (target_width, target_height), Image.LANCZOS)
+                else:
+                    image = image.copy()
+                    image.thumbnail((target_width, target_height), Image.LANCZOS)
+
+            if image_format == "jpeg" and image.mode != "RGB":
+                image = image.convert("RGB")
+            elif image_format in ("webp", "avif") and image.mode not in ("RGB", "RGBA"):
+                has_alpha = "A" in image.getbands() or "transparency" in image.info
+                image = image.convert("RGBA" if has_alpha else "RGB")
+
+            buffer = io.BytesIO()
+            if image_format == "jpeg":
+                image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+            elif image_format == "webp":
+                image.save(buffer, "WEBP", quality=quality, method=4)
+            elif image_format == "avif":
+                image.save(buffer, "AVIF", quality=quality)
+            else:
+                image.save(buffer, "PNG", optimize=True)
+            return buffer.getvalue()
+
+    def get_or_create_variant(self, path: Path, width: Optional[int], height: Optional[int], image_format: str, quality: int, fit: str) -> Path:
+        key = content_key(self.source_hash(path), str(width or ""), str(height or ""), image_format, str(quality), fit)
+        variant_path, created = self.variant_cache.get_or_create(
+            key,
+            image_format,
+            lambda: self.render(path, width, height, image_format, quality, fit),
+        )
+        if created:
+            logger.info(f"✅ 파생 이미지 생성: {path.name} -> {variant_path.name}")
+        return variant_path
+
+    async def get_variant(
+        self,
+        image_path: str,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        image_format: Optional[str] = None,
+        quality: Optional[int] = None,
+        fit: str = "contain",
+        request_headers: Optional[Mapping[str, str]] = None,
+    ):
+        """요청 파라미터에 맞는 파생 이미지를 생성(또는 캐시 재사용)하여 스트리밍 응답으로 반환"""
+        request_headers = request_headers or {}
+
+        for name, value in (("width", width), ("height", height)):
+            if value is not None and not 0 < value <= self.max_dimension:
+                raise HTTPException(status_code=400, detail=f"{name} must be between 1 and {self.max_dimension}")
+        if quality is None:
+            quality = self.default_quality
+        if not 1 <= quality <= 100:
+            raise HTTPException(status_code=400, detail="quality must be between 1 and 100")
+        if fit not in FIT_MODES:
+            raise HTTPException(status_code=400, detail=f"fit must be one of {', '.join(FIT_MODES)}")
+
+        auto_format = (image_format or "auto").lower() == "auto"
+        image_format = self.negotiate_format(image_format, request_headers.get("accept", ""))
+        source_path = self.image_fetch_service.resolve_path(image_path)
+
+        loop = asyncio.get_running_loop()
+        variant_path = await loop.run_in_executor(
+            executor, self.get_or_create_variant, source_path, width, height, image_format, quality, fit
+        )
+
+        response = self.image_fetch_service.get_image(str(variant_path), request_headers)
+        if auto_format:
+            response.headers["Vary"] = "Accept"
+        return response
@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from services.diffuser_index import KLUE_MODEL_NAME, embed_texts
+
+try:
+    import joblib
+    from sklearn.linear_model import LogisticRegression
+except ImportError:  # scikit-learn이 없으면 로컬 분류기 없이 항상 GPT로 의도 분류
+    joblib = None
+    LogisticRegression = None
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+LOCAL_INTENT_ENABLED = os.getenv("LOCAL_INTENT_ENABLED", "true").lower() == "true"
+# 로컬 분류기의 최고 확률이 이 값 이상일 때만 GPT 호출을 건너뜀
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.9"))
+INTENT_MODEL_DIR = os.getenv("INTENT_MODEL_DIR", "models/intent_classifier")
+# GPT가 분류한 (입력, 의도) 쌍을 학습 데이터로 기록
+INTENT_LOG_DIR = os.getenv("INTENT_LOG_DIR", "cache/intent_logs")
+INTENT_LOG_ENABLED = os.getenv("INTENT_LOG_ENABLED", "true").lower() == "true"
+
+
+def intent_text(user_input: Optional[str], image_caption: Optional[str]) -> str:
+    """분류기 입력 문장 (GPT 프롬프트와 같은 user_input/image_caption 구성)"""
+    return f"user_input: {user_input or ''}\nimage_caption: {image_caption or ''}"
+
+
+def parse_intent(response: str, labels: Sequence[str], default_label: str) -> Optional[str]:
+    """
+    GPT 응답에서 의도 번호 추출 (기존 분기와 같이 labels 순서대로 포함 여부 확인, 그다음 default_label)
+
+    응답에 의도 번호가 없으면 None (호출한 쪽은 default_label을 쓰되 학습 로그에는 남기지 않음)
+    """
+    return next((label for label in (*labels, default_label) if label in response), None)
+
+
+def load_samples(log_path: str) -> Tuple[List[str], List[str]]:
+    """의도 로그(JSONL)에서 학습 데이터 읽기 (같은 입력은 마지막 라벨 사용)"""
+    samples: Dict[str, str] = {}
+    with open(log_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            samples[intent_text(record.get("user_input"), record.get("image_caption"))] = str(record["intent"])
+    return list(samples.keys()), list(samples.values())
+
+
+def train_classifier(texts: List[str], labels: List[str], c: float = 1.0):
+    """KLUE-SRoBERTa 문장 임베딩 위에 로지스틱 회귀 학습"""
+    if LogisticRegression is None:
+        raise RuntimeError("scikit-learn이 설치되어 있지 않아 의도 분류기를 학습할 수 없습니다.")
+    classifier = LogisticRegression(C=c, max_iter=1000, class_weight="balanced")
+    classifier.fit(embed_texts(texts), labels)
+    return classifier
+
+
+class IntentClassifier:
+    """
+    GPT 의도 분류 앞단의 로컬 분류기
+
+    - 이미 로드된 KLUE-SRoBERTa 문장 임베딩 + 로지스틱 회귀로 의도를 예측하고,
+      최고 확률이 threshold 이상이면 GPT를 호출하지 않습니다.
+    - 확신이 없거나 학습된 모델이 없으면 GPT로 분류하고, 그 결과를 (입력, 의도) 로그에 남겨 다음 학습 데이터로 사용합니다.
+    - 모델은 train_intent_classifier.py로 학습하며 {model_dir}/{task}.joblib에 저장됩니다.
+    """
+
+    def __init__(
+        self,
+        task: str,
+        labels: Sequence[str],
+        default_label: str,
+        threshold: Optional[float] = None,
+        model_dir: Optional[str] = None,
+        log_dir: Optional[str] = None,
+    ):
+        self.task = task
+        self.labels = list(labels)
+        self.default_label = default_label
+        self.threshold = threshold if threshold is not None else INTENT_CONFIDENCE_THRESHOLD
+        self.model_path = os.path.join(model_dir or INTENT_MODEL_DIR, f"{task}.joblib")
+        self.log_path = os.path.join(log_dir or INTENT_LOG_DIR, f"{task}.jsonl")
+        self.classifier = None
+        self.metadata: dict = {}
+        self.stats = {"local": 0, "gpt": 0, "gpt_unparsed": 0, "local_seconds": 0.0, "gpt_seconds": 0.0}
+        self._log_lock = threading.Lock()
+        self.load()
+
+    @property
+    def loaded(self) -> bool:
+        return self.classifier is not None
+
+    def load(self) -> None:
+        if joblib is None or not os.path.exists(self.model_path):
+            return
+        try:
+            bundle = joblib.load(self.model_path)
+        except Exception as e:
+            logger.warning(f"⚠️ 의도 분류기 로드 실패 ({self.model_path}): {e}")
+            return
+        if bundle.get("embedding_model") != KLUE_MODEL_NAME:
+            logger.warning(f"⚠️ 의도 분류기 임베딩 모델 불일치 ({bundle.get('embedding_model')}), GPT 분류 사용")
+            return
+        self.classifier = bundle["classifier"]
+        self.metadata = {key: value for key, value in bundle.items() if key != "classifier"}
+        logger.info(f"✅ 의도 분류기 로드 완료 [{self.task}] (학습 샘플 {self.metadata.get('samples')}개)")
+
+    def save(self, classifier, samples: int, metrics: Optional[dict] = None) -> None:
+        os.makedirs(os.path.dirname(self.model_path) or ".", exist_ok=True)
+        bundle = {
+            "classifier": classifier,
+            "embedding_model": KLUE_MODEL_NAME,
+            "task": self.task,
+            "samples": samples,
+            "metrics": metrics or {},
+            "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        joblib.dump(bundle, self.model_path)
+        self.classifier = classifier
+        self.metadata = {key: value for key, value in bundle.items() if key != "classifier"}
+
+    def predict(self, user_input: Optional[str], image_caption: Optional[str]) -> Optional[Tuple[str, float]]:
+        """로컬 예측 (라벨, 확률). 모델이 없거나 확률이 threshold 미만이면 None"""
+        if not LOCAL_INTENT_ENABLED or self.classifier is None:
+            return None
+        probabilities = self.classifier.predict_proba(embed_texts([intent_text(user_input, image_caption)]))[0]
+        best = int(np.argmax(probabilities))
+        label, confidence = str(self.classifier.classes_[best]), float(probabilities[best])
+        if confidence < self.threshold:
+            logger.info(f"🤔 로컬 의도 분류 확신 부족 [{self.task}] ({label}, {confidence:.2f} < {self.threshold})")
+            return None
+        return label, confidence
+
+    def log(self, user_input: Optional[str], image_caption: Optional[str], intent: str) -> None:
+        if not INTENT_LOG_ENABLED:
+            return
+        record = {"user_input": user_input, "image_caption": image_caption, "intent": intent, "logged_at": time.time()}
+        try:
+            with self._log_lock:
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning(f"⚠️ 의도 로그 저장 실패: {e}")
+
+    def classify(self, user_input: Optional[str], image_caption: Optional[str], gpt_classify: Callable[[], str]) -> str:
+        """
+        의도 라벨 반환
+
+        로컬 분류기가 확신하면 그 결과를, 아니면 gpt_classify()의 응답을 parse_intent로 해석해 사용합니다.
+        응답에서 의도 번호를 찾지 못하면 default_label을 반환하며 학습 로그에는 남기지 않습니다.
+        로컬 분류기 오류는 GPT 분류로 넘어가며, GPT 오류는 호출한 쪽으로 전달됩니다.
+        """
+        started = time.perf_counter()
+        try:
+            prediction = self.predict(user_input, image_caption)
+        except Exception as e:
+            logger.warning(f"⚠️ 로컬 의도 분류 실패 [{self.task}], GPT 사용: {e}")
+            prediction = None
+        if prediction is not None:
+            self.stats["local"] += 1
+            self.stats["local_seconds"] += time.perf_counter() - started
+            logger.info(f"⚡ 로컬 의도 분류 [{self.task}]: {prediction[0]} ({prediction[1]:.2f})")
+            return prediction[0]
+
+        started = time.perf_counter()
+        response = gpt_classify().strip()
+        self.stats["gpt"] += 1
+        self.stats["gpt_seconds"] += time.perf_counter() - started
+        intent = parse_intent(response, self.labels, self.default_label)
+        if intent is None:
+            self.stats["gpt_unparsed"] += 1
+            logger.warning(f"⚠️ GPT 의도 응답 해석 실패 [{self.task}], {self.default_label} 사용: {response!r}")
+            return self.default_label
+        self.log(user_input, image_caption, intent)
+        return intent
+
+    def snapshot(self) -> dict:
+        stats = dict(self.stats)
+        total = stats["local"] + stats["gpt"]
+        return {
+            "loaded": self.loaded,
+            "threshold": self.threshold,
+            "local_ratio": round(stats["local"] / total, 3) if total else 0.0,
+            "avg_local_ms": round(stats["local_seconds"] / stats["local"] * 1000, 1) if stats["local"] else None,
+            "avg_gpt_ms": round(stats["gpt_seconds"] / stats["gpt"] * 1000, 1) if stats["gpt"] else None,
+            "calls": {"local": stats["local"], "gpt": stats["gpt"], "gpt_unparsed": stats["gpt_unparsed"]},
+            **{key: value for key, value in self.metadata.items() if key in ("samples", "trained_at", "metrics")},
+        }
+
+
+# /llm/process-input 의도: (1) 향수 추천, (2) 일반 대화, (3) 패션, (4) 인테리어, (5) 테라피
+# 기존 분기 순서(1 → 3 → 4 → 5, 나머지는 일반 대화)와 같은 순서로 GPT 응답을 정규화
+chat_intent_classifier = IntentClassifier("chat_intent", labels=("1", "3", "4", "5"), default_label="2")
+# 상품 그래프 process_input 의도: (1) 향수 추천, (2) 일반 대화
+product_intent_classifier = IntentClassifier("product_intent", labels=("1",), default_label="2")
+
+INTENT_CLASSIFIERS = {
+    classifier.task: classifier for classifier in (chat_intent_classifier, product_intent_classifier)
+}
@@ -1,16 +1,97 @@
 import json, random
-import logging, chromadb, json
+import logging, json
 from typing import Optional, Tuple
 from models.img_llm_client import GPTClient
 from services.db_service import DBService
 from services.prompt_loader import PromptLoader
 from fastapi import HTTPException
-from chromadb.utils import embedding_functions
+from services.diffuser_index import diffuser_index
+from services.brand_matcher import cached_brands, get_brand_matcher
+from services.prompt_budget import PROMPT_COMPACT, PromptBuilder
+from services.intent_classifier import chat_intent_classifier
+from services.therapy_classifier import parse_category, parse_effects, therapy_classifier
 
 logger = logging.getLogger(__name__)
 
-chroma_client = chromadb.PersistentClient(path="chroma_db")
-embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="snunlp/KLUE-SRoBERTa-Large-SNUExtended-klueNLI-klueSTS")
+# 패션 스타일 -> 향 계열 매핑 (extract_keywords_from_input 프롬프트의 고정 앞부분)
+FASHION_LINE_MAPPING = (
+    "### Fashion style to output fragrance family(line) mapping example:\n"
+    "1. Fashion style: Casual style -> line: **Fruity**\n"
+    "2. Fashion style: Dandy Casual -> line: **Woody**\n"
+    "3. Fashion style: American Casual -> line: **Green**\n"
+    "4. Fashion style: Classic -> line: **Woody**\n"
+    "5. Fashion style: Business Formal -> line: **Musk**\n"
+    "6. Fashion style: Business Casual -> line: **Citrus**\n"
+    "7. Fashion style: Gentle Style -> line: **Powdery**\n"
+    "8. Fashion style: Street -> line: **Spicy**\n"
+    "9. Fashion style: Techwear -> line: **Aromatic**\n"
+    "10. Fashion style: Gorp Core -> line: **Green**\n"
+    "11. Fashion style: Punk Style -> line: **Tobacco Leather**\n"
+    "12. Fashion style: Sporty -> line: **Citrus**\n"
+    "13. Fashion style: Runner Style -> line: **Aquatic**\n"
+    "14. Fashion style: Tennis Look -> line: **Fougere**\n"
+    "15. Fashion style: Vintage -> line: **Oriental**\n"
+    "16. Fashion style: Romantic Style -> line: **Floral**\n"
+    "17. Fashion style: Bohemian -> line: **Musk**\n"
+    "18. Fashion style: Retro Fashion -> line: **Aldehyde**\n"
+    "19. Fashion style: Modern -> line: **Woody**\n"
+    "20. Fashion style: Minimal -> line: **Powdery**\n"
+    "21. Fashion style: All Black Look -> line: **Tobacco Leather**\n"
+    "22. Fashion style: White Tone Style -> line: **Musk**\n"
+    "23. Fashion style: Avant-garde -> line: **Tobacco Leather**\n"
+    "24. Fashion style: Gothic Style -> line: **Oriental**\n"
+    "25. Fashion style: Cosplay -> line: **Gourmand**\n\n"
+)
+COMPACT_FASHION_LINE_MAPPING = (
+    "### Fashion style -> line: Casual->Fruity, Dandy Casual->Woody, American Casual->Green, Classic->Woody, "
+    "Business Formal->Musk, Business Casual->Citrus, Gentle->Powdery, Street->Spicy, Techwear->Aromatic, Gorp Core->Green, "
+    "Punk->Tobacco Leather, Sporty->Citrus, Runner->Aquatic, Tennis->Fougere, Vintage->Oriental, Romantic->Floral, "
+    "Bohemian->Musk, Retro->Aldehyde, Modern->Woody, Minimal->Powdery, All Black->Tobacco Leather, White Tone->Musk, "
+    "Avant-garde->Tobacco Leather, Gothic->Oriental, Cosplay->Gourmand\n\n"
+)
+
+# 공간 기반 디퓨저 추천의 향 설명 생성 프롬프트 (고정 앞부분, 브랜드/입력은 뒤에 붙임)
+FRAGRANCE_DESCRIPTION_INSTRUCTIONS = """You are a fragrance expert with in-depth knowledge of various scents. Based on the User Input and Image Caption, **imagine** and provide a fragrance scent description that matches the room's description and the user's request. Focus more on the User Input. Your task is to creatively describe a fragrance that would fit well with the mood and characteristics of the room as described in the caption, as well as the user's scent preference. Do not mention specific diffuser or perfume products.
+
+### Instructions:
+- Existing Brands: see '### Existing Brands' below (brands mentioned in the user input that exist in our catalog)
+1. **If a specific brand is mentioned**, check if it exists in the list of existing brands below. If it does, acknowledge the brand name without referring to any specific product and describe a fitting scent that aligns with the user's request.  
+**IF THE BRAND IS MENTIONED IN THE USER INPUT BUT IS NOT FOUND IN THE EXISTING BRANDS LIST, START BY 'Not Found' TO SAY THE BRAND DOES NOT EXIST.**
+2. **If the brand is misspelled or doesn't exist**, please:
+    - Correct the spelling if the brand is close to an existing brand (e.g., "아쿠아 파르마" -> "아쿠아 디 파르마").
+    - **IF THE BRAND IS MENTIONED IN THE USER INPUT BUT IS NOT FOUND IN THE EXISTING BRANDS LIST, START BY 'Not Found' TO SAY THE BRAND DOES NOT EXIST.** Then, recommend a suitable fragrance based on the context and preferences described in the user input.
+3. Provide the fragrance description in **Korean**, focusing on key scent notes and creative details that align with the mood and characteristics described in the user input and image caption. Do **not mention specific diffuser or perfume products.**
+
+"""
+FRAGRANCE_DESCRIPTION_EXAMPLES = """### Example Responses:
+
+#### Example 1 (when a brand is mentioned, but with a minor spelling error):
+- User Input: 아쿠아 파르마의 우디한 베이스를 가진 디퓨저를 추천해줘.
+- Image Caption: The image shows a modern living room with a large window on the right side. The room has white walls and wooden flooring. On the left side of the room, there is a gray sofa and a white coffee table with a black and white patterned rug in front of it. In the center of the image, there are six black chairs arranged around a wooden dining table. The table is set with a vase and other decorative objects on it. Above the table, two large windows let in natural light and provide a view of the city outside. A white floor lamp is placed on the floor next to the sofa.
+- Response:
+Brand: 아쿠아 디 파르마
+Scent Description: 우디한 베이스에 따뜻하고 자연스러운 분위기를 더하는 향이 어울립니다. 은은한 샌들우드와 부드러운 시더우드가 조화를 이루며, 가벼운 머스크와 드라이한 베티버가 깊이를 더합니다. 가벼운 허브와 상쾌한 시트러스 노트가 은은하게 균형을 이루며 여유롭고 세련된 분위기를 연출합니다.
+
+#### Example 2 (when no brand is mentioned):
+- User Input: 우디한 베이스를 가진 디퓨저를 추천해줘.
+- Image Caption: The image shows a modern living room with a large window on the right side. The room has white walls and wooden flooring. On the left side of the room, there is a gray sofa and a white coffee table with a black and white patterned rug in front of it. In the center of the image, there are six black chairs arranged around a wooden dining table. The table is set with a vase and other decorative objects on it. Above the table, two large windows let in natural light and provide a view of the city outside. A white floor lamp is placed on the floor next to the sofa.
+- Response:
+Brand: None
+Scent Description: 우디한 베이스에 따뜻하고 자연스러운 분위기를 더하는 향이 어울립니다. 은은한 샌들우드와 부드러운 시더우드가 조화를 이루며, 가벼운 머스크와 드라이한 베티버가 깊이를 더합니다. 가벼운 허브와 상쾌한 시트러스 노트가 은은하게 균형을 이루며 여유롭고 세련된 분위기를 연출합니다.
+
+#### Example 3 (when a brand is mentioned but not in the list of existing brands):
+- User Input: 샤넬 브랜드 제품의 우디한 베이스를 가진 디퓨저를 추천해줘.
+- Image Caption: The image shows a modern living room with a large window on the right side. The room has white walls and wooden flooring. On the left side of the room, there is a gray sofa and a white coffee table with a black and white patterned rug in front of it. In the center of the image, there are six black chairs arranged around a wooden dining table. The table is set with a vase and other decorative objects on it. Above the table, two large windows let in natural light and provide a view of the city outside. A white floor lamp is placed on the floor next to the sofa.
+- Response:
+Brand: Not Found
+Scent Description: 우디한 베이스에 따뜻하고 자연스러운 분위기를 더하는 향이 어울립니다. 은은한 샌들우드와 부드러운 시더우드가 조화를 이루며, 가벼운 머스크와 드라이한 베티버가 깊이를 더합니다. 가벼운 허브와 상쾌한 시트러스 노트가 은은하게 균형을 이루며 여유롭고 세련된 분위기를 연출합니다.
+"""
+FRAGRANCE_DESCRIPTION_PROMPT = FRAGRANCE_DESCRIPTION_INSTRUCTIONS + FRAGRANCE_DESCRIPTION_EXAMPLES
+# 짧은 버전: 같은 지시문에 few-shot 예시 대신 응답 형식만 붙임
+COMPACT_FRAGRANCE_DESCRIPTION_PROMPT = FRAGRANCE_DESCRIPTION_INSTRUCTIONS + """### Response Format:
+Brand: <brand name from the existing brands | None | Not Found>
+Scent Description: <scent description in Korean>
+"""
 
 class LLMService:
     def __init__(self, gpt_client: GPTClient, db_service: DBService, prompt_loader: PromptLoader):
@@ -24,8 +105,11 @@ class LLMService:
         if not self.all_diffusers:
             raise RuntimeError("No diffuser data available for initialization.")
 
-        # Initialize vector database
-        self.collection = self.initialize_vector_db(self.all_diffusers, self.diffuser_scent_descriptions)
+        # 디퓨저 벡터 인덱스 (readiness 로더가 구성하고 scentlens 동기화 루프가 갱신하는 메모리 인덱스 재사용)
+        # 요청 경로에서 인덱스를 구성하지 않도록, 준비되지 않았으면 실패 (라우트는 require("vector_db")로 준비될 때까지 대기)
+        if not diffuser_index.loaded:
+            raise RuntimeError("Diffuser vector index is not ready.")
+        self.diffuser_index = diffuser_index
 
     def process_input(self, user_input: Optional[str] = None, image_caption: Optional[str] = None) -> Tuple[str, Optional[int]]:
         """
@@ -46,7 +130,10 @@ class LLMService:
                 f"의도: (1) 향수 추천, (2) 일반 대화, (3) 패션 향수 추천, (4) 인테리어 기반 디퓨저 추천, (5) 테라피 목적 향수/디퓨저 추천"
             )
 
-            intent = self.gpt_client.generate_response(intent_prompt).strip()
+            # 로컬 분류기가 확신하면 GPT 호출 생략
+            intent = chat_intent_classifier.classify(
+                user_input, image_caption, lambda: self.gpt_client.generate_response(intent_prompt)
+            )
             logger.info(f"Detected intent: {intent}")  # 의도 감지 결과
 
             if "1" in intent:
@@ -72,117 +159,90 @@ class LLMService:
             raise HTTPException(status_code=500, detail="Failed to classify user intent.")
 
     def extract_keywords_from_input(self, user_input: Optional[str] = None, image_caption: Optional[str] = None) -> dict:
-        """사용자 입력에서 계열과 브랜드를 분석하고 계열 ID와 브랜드 리스트를 반환하는 함수"""
+        """
+        사용자 입력에서 계열과 브랜드를 분석하는 함수
+
+        계열은 GPT로, 브랜드는 로컬 사전(brand_matcher)으로 추출합니다.
+
+        Returns:
+            dict: line_id, brands(선호 브랜드), excluded_brands(제외 표현이 붙은 브랜드)
+        """
         try:
             if user_input is not None:
                 logger.info(f"🔍 입력된 user_input에서 향 계열과 브랜드 분석 시작: {user_input}")
             elif image_caption is not None:
                 logger.info(f"🔍 입력된 image_caption에서 향 계열과 브랜드 분석 시작: {image_caption}")
 
-            # 1. DB에서 계열 및 브랜드 데이터 가져오기
+            # 1. DB에서 계열 데이터 가져오기, 브랜드는 로컬 사전으로 입력에서 직접 추출 (제외 표현이 붙은 브랜드는 빠짐)
             line_data = self.db_service.fetch_line_data()
             line_mapping = {line["name"]: line["id"] for line in line_data}
-            brand_list = self.db_service.fetch_brands()
-
-            # 2. GPT를 이용해 입력에서 향 계열과 브랜드 추출
-            keywords_prompt = (
-                "The following is a perfume recommendation request. Extract the fragrance family and brand names from the user_input and image_caption.\n"
+            brand_matcher = get_brand_matcher(cached_brands(self.db_service))
+            matched_brands, excluded_brands = brand_matcher.extract(" ".join(text for text in (user_input, image_caption) if text))
+            logger.info(f"🔍 브랜드 매칭 결과 - 선호: {matched_brands}, 제외: {excluded_brands}")
+
+            # 2. GPT를 이용해 입력에서 향 계열만 추출 (브랜드는 위에서 로컬로 추출하므로 GPT에 묻지 않음)
+            # 호출마다 같은 지시문/예시/출력 형식을 앞에 두고, 입력은 뒤에 붙임 (프롬프트 캐싱)
+            prompt = PromptBuilder("extract_keywords")
+            prompt.static(
+                "The following is a perfume recommendation request. Extract the fragrance family from the user_input and image_caption.\n"
                 f"### Fragrance families(line): {', '.join(line_mapping.keys())}\n\n"
-                f"### Brand list: {', '.join(brand_list)}\n\n"
 
                 "### Additional rules:\n"
                 "- If the user_input and the image_caption is a description of a fashion style, use the corresponding fragrance family from the following fashion styles.\n"
                 "- If the user_input is a description of a date or a specific situation, use the corresponding fragrance family for the situation.\n"
-                "- Infer the user's style or vibe from the user_input or image_caption (e.g., sporty, romantic, vintage, etc.) and recommend a fragrance family(line) based on that.\n"
-                "- If the user specifies a brand, include it only if it exists in the Brand list. If the mentioned brand is not in the Brand list, do not include it in the output.\n"
-                "- Exclude any brands that the user explicitly does not want.\n\n"
-
-                "### Fashion style to output fragrance family(line) mapping example:\n"
-                "1. Fashion style: Casual style -> line: **Fruity**\n"
-                "2. Fashion style: Dandy Casual -> line: **Woody**\n"
-                "3. Fashion style: American Casual -> line: **Green**\n"
-                "4. Fashion style: Classic -> line: **Woody**\n"
-                "5. Fashion style: Business Formal -> line: **Musk**\n"
-                "6. Fashion style: Business Casual -> line: **Citrus**\n"
-                "7. Fashion style: Gentle Style -> line: **Powdery**\n"
-                "8. Fashion style: Street -> line: **Spicy**\n"
-                "9. Fashion style: Techwear -> line: **Aromatic**\n"
-                "10. Fashion style: Gorp Core -> line: **Green**\n"
-                "11. Fashion style: Punk Style -> line: **Tobacco Leather**\n"
-                "12. Fashion style: Sporty -> line: **Citrus**\n"
-                "13. Fashion style: Runner Style -> line: **Aquatic**\n"
-                "14. Fashion style: Tennis Look -> line: **Fougere**\n"
-                "15. Fashion style: Vintage -> line: **Oriental**\n"
-                "16. Fashion style: Romantic Style -> line: **Floral**\n"
-                "17. Fashion style: Bohemian -> line: **Musk**\n"
-                "18. Fashion style: Retro Fashion -> line: **Aldehyde**\n"
-                "19. Fashion style: Modern -> line: **Woody**\n"
-                "20. Fashion style: Minimal -> line: **Powdery**\n"
-                "21. Fashion style: All Black Look -> line: **Tobacco Leather**\n"
-                "22. Fashion style: White Tone Style -> line: **Musk**\n"
-                "23. Fashion style: Avant-garde -> line: **Tobacco Leather**\n"
-                "24. Fashion style: Gothic Style -> line: **Oriental**\n"
-                "25. Fashion style: Cosplay -> line: **Gourmand**\n\n"
-
+                "- Infer the user's style or vibe from the user_input or image_caption (e.g., sporty, romantic, vintage, etc.) and recommend a fragrance family(line) based on that.\n\n"
+            )
+            prompt.static(COMPACT_FASHION_LINE_MAPPING if PROMPT_COMPACT else FASHION_LINE_MAPPING)
+            prompt.static(
                 "### Few-shot examples:\n"
                 "#### Example 1:\n"
                 "user_input: '비즈니스 미팅에 어울리는 향수가 뭐가 있나요? 주로 샤넬 제품을 선호합니다.'\n"
                 "Expected Output:\n"
                 "{\n"
-                '  "line": "Musk",\n'
-                '  "brands": ["샤넬"]\n'
+                '  "line": "Musk"\n'
                 "}\n\n"
 
                 "#### Example 2:\n"
                 "user_input: '아침 조깅할 때 사용할 시원하고 깨끗한 향을 찾고 있어요.'\n"
                 "Expected Output:\n"
                 "{\n"
-                '  "line": "Aquatic",\n'
-                '  "brands": []\n'
+                '  "line": "Aquatic"\n'
                 "}\n\n"
 
                 "#### Example 3:\n"
                 "user_input: '빈티지한 패션을 즐겨 입어요. 고풍스럽고 우아한 향수를 추천해 주세요.'\n"
                 "Expected Output:\n"
                 "{\n"
-                '  "line": "Oriental",\n'
-                '  "brands": []\n'
+                '  "line": "Oriental"\n'
                 "}\n\n"
 
                 "#### Example 4:\n"
                 "user_input: '로맨틱한 분위기의 데이트에 어울리는 향수를 추천해 주세요. 조말론과 딥디크 제품을 좋아해요.'\n"
                 "Expected Output:\n"
                 "{\n"
-                '  "line": "Floral",\n'
-                '  "brands": ["조 말론", "딥티크"]\n'
+                '  "line": "Floral"\n'
                 "}\n\n"
 
                 "#### Example 5:\n"
                 "user_input: '나는 디올 향수는 별로 안 좋아해. 포멀한 수트와 어울리는 여성스러운 향을 추천해 줘.'\n"
                 "Expected Output:\n"
                 "{\n"
-                '  "line": "Musk",\n'
-                '  "brands": []\n'
+                '  "line": "Musk"\n'
                 "}\n\n"
 
-                "### Important rule: The 'line' must **never** be null. It should always correspond to **one of Fragrance families(line)**.\n"
-                "### NOTE: The 'brands' list contains the brands the user wants. It can be empty if the user does not specify any brand. Exclude any brands that the user explicitly does not want. If a brand is mentioned but is not in the Brand list, do not include it in the output. If a brand is included, it must exactly match the name as listed in the Brand list.\n\n"
-            )
+                "### Important rule: The 'line' must **never** be null. It should always correspond to **one of Fragrance families(line)**.\n\n"
 
-            if user_input is not None:
-                keywords_prompt += f"### user_input: {user_input}\n\n"
-            
-            if image_caption is not None:
-                keywords_prompt += f"### image_caption: {image_caption}\n\n"
-
-            keywords_prompt += (   
                 "### The output format must be **JSON**:\n"
                 "{\n"
-                '  "line": "Woody",\n'
-                '  "brands": []\n'
-                "}"
+                '  "line": "Woody"\n'
+                "}\n\n"
             )
-            
+            if user_input is not None:
+                prompt.dynamic(f"### user_input: {user_input}\n\n")
+            if image_caption is not None:
+                prompt.dynamic(f"### image_caption: {image_caption}\n\n")
+            keywords_prompt = prompt.build()
+
             response_text = self.gpt_client.generate_response(keywords_prompt).strip()
             logger.info(f"🤖 GPT 응답: {response_text}")
 
@@ -193,18 +253,18 @@ class LLMService:
 
                 parsed_response = json.loads(response_text)
                 extracted_line_name = parsed_response.get("line", "").strip()
-                extracted_brands = parsed_response.get("brands", [])
 
                 # 4. 계열 ID 찾기
                 line_id = line_mapping.get(extracted_line_name)
                 if not line_id:
                     raise ValueError(f"❌ '{extracted_line_name}' 계열이 존재하지 않습니다.")
 
-                logger.info(f"✅ 계열 ID: {line_id}, 브랜드: {extracted_brands}")
+                logger.info(f"✅ 계열 ID: {line_id}, 브랜드: {matched_brands}, 제외 브랜드: {excluded_brands}")
 
                 return {
                     "line_id": line_id,
-                    "brands": extracted_brands
+                    "brands": matched_brands,
+                    "excluded_brands": excluded_brands,
                 }
 
             except json.JSONDecodeError as e:
@@ -264,7 +324,8 @@ class LLMService:
             extracted_data = self.extract_keywords_from_input(user_input=user_input, image_caption=image_caption)
             line_id = extracted_data["line_id"]
             brand_filters = extracted_data["brands"]
-            logger.info(f"✅ 추출된 키워드 - 계열ID: {line_id}, 브랜드: {brand_filters}")
+            excluded_brands = extracted_data["excluded_brands"]
+            logger.info(f"✅ 추출된 키워드 - 계열ID: {line_id}, 브랜드: {brand_filters}, 제외 브랜드: {excluded_brands}")
 
             # 2. 향료 ID 조회
             logger.info(f"🔍 계열 {line_id}의 향료 조회")
@@ -277,24 +338,57 @@ class LLMService:
             
             logger.info(f"✅ 향료 ID 목록: {spice_ids}")
 
-            # 프롬프트 생성
+            # 프롬프트 생성 (호출마다 같은 지시문/출력 형식을 앞에 두고, 입력과 상품 목록은 뒤에 붙임)
             template = self.prompt_loader.get_prompt("recommendation")
-            names_prompt = (
+            prompt = PromptBuilder("recommendation")
+            prompt.static(
                 f"{template['description']}\n"
-                f"{template['rules']}"
+                f"{template['rules']}\n\n"
+                f"Recommend up to 3 fragrance names that do not include brand names.\n\n"
+                f"- content: Please include the reason for the recommendation, the situation it suits, and the common feel of the perfumes in korean.\n\n"
+
+                "### Important Rule: You must respond only **in Korean**\n\n"
+
+                "Respond only in the following JSON format:\n"
+                "```json\n"
+                "{\n"
+                '  "recommendations": [\n'
+                '    {\n'
+                '      "name": "블랑쉬 오 드 퍼퓸",\n'
+                '      "reason": "깨끗한 머스크와 은은한 백합이 어우러져, 갓 세탁한 새하얀 리넨처럼 부드럽고 신선한 느낌을 선사. 피부에 밀착되는 듯한 가벼운 향이 오래 지속되며, 자연스럽고 단정한 분위기를 연출함.",\n'
+                '      "situation": "아침 샤워 후 상쾌한 기분을 유지하고 싶을 때, 오피스에서 단정하면서도 은은한 존재감을 남기고 싶을 때"\n'
+                '    },\n'
+                '    {\n'
+                '      "name": "실버 마운틴 워터 오 드 퍼퓸",\n'
+                '      "reason": "상큼한 시트러스와 신선한 그린 티 노트가 조화를 이루며, 알프스의 깨끗한 샘물을 연상시키는 맑고 청량한 느낌을 줌. 우디한 베이스가 잔잔하게 남아 차분한 매력을 더함.",\n'
+                '      "situation": "운동 후 땀을 씻어내고 개운한 느낌을 유지하고 싶을 때, 더운 여름날 시원하고 깨끗한 인상을 주고 싶을 때"\n'
+                '    },\n'
+                '    {\n'
+                '      "name": "재즈 클럽 오 드 뚜왈렛",\n'
+                '      "reason": "달콤한 럼과 부드러운 바닐라가 타바코의 스모키함과 어우러져, 클래식한 재즈 바에서 오래된 가죽 소파에 앉아 칵테일을 마시는 듯한 분위기를 연출. 깊고 따뜻한 향이 감각적인 무드를 더함.",\n'
+                '      "situation": "여유로운 저녁 시간, 칵테일 바나 조용한 라운지에서 세련된 분위기를 연출하고 싶을 때, 가을과 겨울철 따뜻하고 매혹적인 향을 원할 때"\n'
+                '    }\n'
+                '  ],\n'
+                '  "content": "깨끗한 리넨의 산뜻함, 신선한 자연의 청량감, 그리고 부드러운 따뜻함이 조화롭게 어우러진 세련되고 감각적인 향입니다."'
+                '}\n'
+                "```\n\n"
             )
 
             if user_input is not None:
-                names_prompt += f"\n### user_input: {user_input}\n"
-            
+                prompt.dynamic(f"\n### user_input: {user_input}\n")
             if image_caption is not None:
-                names_prompt += f"\n### image_caption: {image_caption}\n"
+                prompt.dynamic(f"\n### image_caption: {image_caption}\n")
 
             # 3. 향수 필터링
             logger.info("🔍 향수 필터링 시작")
             filtered_perfumes = self.db_service.get_perfumes_by_middle_notes(spice_ids)
             logger.debug(f"📋 미들노트 기준 필터링: {len(filtered_perfumes)}개")
 
+            # 사용자가 원하지 않는다고 한 브랜드는 브랜드 필터링 여부와 관계없이 후보에서 제외
+            if excluded_brands:
+                filtered_perfumes = [p for p in filtered_perfumes if p["brand"] not in excluded_brands]
+                logger.debug(f"📋 제외 브랜드 {excluded_brands} 제거 후: {len(filtered_perfumes)}개")
+
             if brand_filters:
                 brand_filtered_perfumes = [p for p in filtered_perfumes if p["brand"] in brand_filters]
                 logger.debug(f"📋 브랜드 필터링 후: {len(brand_filtered_perfumes)}개")
@@ -304,15 +398,15 @@ class LLMService:
                     random.shuffle(filtered_perfumes)
                     filtered_perfumes = filtered_perfumes[:25]
 
-                    names_prompt += f"\n### Preferred brand: {brand_filters}\n"
-                    names_prompt += (
+                    prompt.dynamic(f"\n### Preferred brand: {brand_filters}\n")
+                    prompt.dynamic(
                         "- If a brand in 'Preferred brand' matches a brand from the database, recommend perfumes from that brand.\n"
                         "- If no matching brand is found, recommend based on user_input and image_caption(if exists) without considering the brand.\n\n"
                     )
 
-                    for perfume in brand_filtered_perfumes:
-                        if perfume not in filtered_perfumes:
-                            filtered_perfumes.append(perfume)   # 브랜드 필터링을 하지 않은 미들노트 기준 결과에 brand_filtered_perfumes의 제품이 포함되지 않은 경우 포함
+                    # 브랜드 필터링을 하지 않은 미들노트 기준 결과에 brand_filtered_perfumes의 제품이 포함되지 않은 경우 포함
+                    # (토큰 예산으로 상품 목록이 잘려도 남도록 앞에 둠)
+                    filtered_perfumes = brand_filtered_perfumes + [p for p in filtered_perfumes if p not in brand_filtered_perfumes]
                 else:
                     random.shuffle(brand_filtered_perfumes)
                     filtered_perfumes = brand_filtered_perfumes[:25]
@@ -321,43 +415,12 @@ class LLMService:
                 logger.error("❌ 필터링 결과 없음")
                 raise HTTPException(status_code=404, detail="조건에 맞는 향수를 찾을 수 없습니다.")
 
-            # 4. GPT 프롬프트 생성
-            products_text = "\n".join([
-                f"{p['id']}. {p['name_kr']} ({p['brand']}): {p.get('main_accord', '향 정보 없음')}"
-                for p in filtered_perfumes
-            ])
-
-            names_prompt += (
-                f"### Products list (id. name (brand): main_accord): \n{products_text}\n\n"
-                f"Recommend up to 3 fragrance names that do not include brand names.\n\n"
-                f"- content: Please include the reason for the recommendation, the situation it suits, and the common feel of the perfumes in korean.\n\n"
-
-                "### Important Rule: You must respond only **in Korean**\n\n"
-
-                "Respond only in the following JSON format:\n"
-                "```json\n"
-                "{\n"
-                '  "recommendations": [\n'
-                '    {\n'
-                '      "name": "블랑쉬 오 드 퍼퓸",\n'
-                '      "reason": "깨끗한 머스크와 은은한 백합이 어우러져, 갓 세탁한 새하얀 리넨처럼 부드럽고 신선한 느낌을 선사. 피부에 밀착되는 듯한 가벼운 향이 오래 지속되며, 자연스럽고 단정한 분위기를 연출함.",\n'
-                '      "situation": "아침 샤워 후 상쾌한 기분을 유지하고 싶을 때, 오피스에서 단정하면서도 은은한 존재감을 남기고 싶을 때"\n'
-                '    },\n'
-                '    {\n'
-                '      "name": "실버 마운틴 워터 오 드 퍼퓸",\n'
-                '      "reason": "상큼한 시트러스와 신선한 그린 티 노트가 조화를 이루며, 알프스의 깨끗한 샘물을 연상시키는 맑고 청량한 느낌을 줌. 우디한 베이스가 잔잔하게 남아 차분한 매력을 더함.",\n'
-                '      "situation": "운동 후 땀을 씻어내고 개운한 느낌을 유지하고 싶을 때, 더운 여름날 시원하고 깨끗한 인상을 주고 싶을 때"\n'
-                '    },\n'
-                '    {\n'
-                '      "name": "재즈 클럽 오 드 뚜왈렛",\n'
-                '      "reason": "달콤한 럼과 부드러운 바닐라가 타바코의 스모키함과 어우러져, 클래식한 재즈 바에서 오래된 가죽 소파에 앉아 칵테일을 마시는 듯한 분위기를 연출. 깊고 따뜻한 향이 감각적인 무드를 더함.",\n'
-                '      "situation": "여유로운 저녁 시간, 칵테일 바나 조용한 라운지에서 세련된 분위기를 연출하고 싶을 때, 가을과 겨울철 따뜻하고 매혹적인 향을 원할 때"\n'
-                '    }\n'
-                '  ],\n'
-                '  "content": "깨끗한 리넨의 산뜻함, 신선한 자연의 청량감, 그리고 부드러운 따뜻함이 조화롭게 어우러진 세련되고 감각적인 향입니다."'
-                '}\n'
-                "```"
+            # 4. GPT 프롬프트 생성 (상품 목록은 토큰 예산 안에서 앞에서부터 포함)
+            prompt.candidates(
+                "### Products list (id. name (brand): main_accord): \n",
+                [f"{p['id']}. {p['name_kr']} ({p['brand']}): {p.get('main_accord', '향 정보 없음')}" for p in filtered_perfumes],
             )
+            names_prompt = prompt.build()
 
             try:
                 logger.info("🔄 향수 추천 처리 시작")
@@ -534,7 +597,8 @@ class LLMService:
             extracted_data = self.extract_keywords_from_input(user_input, image_caption)
             line_id = extracted_data["line_id"]
             brand_filters = extracted_data["brands"]
-            logger.info(f"✅ 추출된 키워드 - 계열ID: {line_id}, 브랜드: {brand_filters}")
+            excluded_brands = extracted_data["excluded_brands"]
+            logger.info(f"✅ 추출된 키워드 - 계열ID: {line_id}, 브랜드: {brand_filters}, 제외 브랜드: {excluded_brands}")
 
             # 2. 향료 ID 조회
             logger.info(f"🔍 계열 {line_id}의 향료 조회")
@@ -547,23 +611,56 @@ class LLMService:
             
             logger.info(f"✅ 향료 ID 목록: {spice_ids}")
 
-            # 프롬프트 생성
+            # 프롬프트 생성 (호출마다 같은 지시문/출력 형식을 앞에 두고, 입력과 상품 목록은 뒤에 붙임)
             template = self.prompt_loader.get_prompt("recommendation")
-            names_prompt = (
+            prompt = PromptBuilder("fashion_recommendation")
+            prompt.static(
                 f"{template['description']}\n"
                 f"{template['rules']}\n\n"
+                f"Recommend up to 3 perfume names without including the brand names.\n\n"
+                f"Note: The recommendations should refer to the user_input, image_caption, and extracted keywords. The image_caption describes the person's outfit, and the recommended perfumes should match the described outfit.\n"
+                f"- content: Please include the reason for the recommendation, the situation it suits, and the common feel of the perfumes in korean.\n\n"
+                "### Important Rule: You must respond only **in Korean**\n\n"
+                "Respond only in the following JSON format:\n"
+                "```json\n"
+                "{\n"
+                '  "recommendations": [\n'
+                '    {\n'
+                '      "name": "블랑쉬 오 드 퍼퓸",\n'
+                '      "reason": "깨끗한 머스크와 은은한 백합이 어우러져, 마치 새하얀 셔츠를 갓 다린 듯한 깔끔하고 세련된 느낌을 선사합니다. 자연스럽고 우아한 스타일을 연출하는 데 어울리는 향입니다.",\n'
+                '      "situation": "미니멀한 화이트 셔츠와 슬랙스 조합으로 세련된 오피스룩을 연출할 때, 심플하면서도 고급스러운 무드를 더하고 싶을 때"\n'
+                '    },\n'
+                '    {\n'
+                '      "name": "실버 마운틴 워터 오 드 퍼퓸",\n'
+                '      "reason": "상큼한 시트러스와 신선한 그린 티 노트가 조화를 이루며, 한여름에 가벼운 리넨 셔츠를 입은 듯한 시원하고 쾌적한 느낌을 줍니다. 모던하면서도 활동적인 스타일을 연출하는 데 적합합니다.",\n'
+                '      "situation": "캐주얼한 리넨 셔츠와 데님을 매치하여 자연스럽고 여유로운 분위기를 연출할 때, 여름철 시원하고 청량한 이미지를 강조하고 싶을 때"\n'
+                '    },\n'
+                '    {\n'
+                '      "name": "재즈 클럽 오 드 뚜왈렛",\n'
+                '      "reason": "달콤한 럼과 부드러운 바닐라가 타바코의 스모키함과 어우러져, 빈티지한 가죽 재킷과 클래식한 로퍼를 매치한 듯한 감각적인 무드를 완성합니다. 우아하면서도 개성 있는 스타일을 연출하기에 적합합니다.",\n'
+                '      "situation": "가죽 재킷과 첼시 부츠를 매치하여 세련된 남성미를 강조할 때, 클래식한 트렌치코트나 니트웨어와 함께 분위기 있는 가을, 겨울 룩을 완성하고 싶을 때"\n'
+                '    }\n'
+                '  ],\n'
+                '  "content": "깨끗한 리넨의 산뜻함, 신선한 자연의 청량감, 그리고 부드러운 따뜻함이 조화롭게 어우러진 세련되고 감각적인 향입니다."'
+                '}\n'
+                "```\n\n"
             )
 
             if user_input is not None:
-                names_prompt += f"### user_input: {user_input}\n"
+                prompt.dynamic(f"### user_input: {user_input}\n")
             if image_caption is not None:
-                names_prompt += f"### image_caption: {image_caption}\n"
+                prompt.dynamic(f"### image_caption: {image_caption}\n")
 
             # 3. 향수 필터링
             logger.info("🔍 향수 필터링 시작")
             filtered_perfumes = self.db_service.get_perfumes_by_middle_notes(spice_ids)
             logger.debug(f"📋 미들노트 기준 필터링: {len(filtered_perfumes)}개")
 
+            # 사용자가 원하지 않는다고 한 브랜드는 브랜드 필터링 여부와 관계없이 후보에서 제외
+            if excluded_brands:
+                filtered_perfumes = [p for p in filtered_perfumes if p["brand"] not in excluded_brands]
+                logger.debug(f"📋 제외 브랜드 {excluded_brands} 제거 후: {len(filtered_perfumes)}개")
+
             if brand_filters:
                 brand_filtered_perfumes = [p for p in filtered_perfumes if p["brand"] in brand_filters]
                 logger.debug(f"📋 브랜드 필터링 후: {len(brand_filtered_perfumes)}개")
@@ -573,15 +670,15 @@ class LLMService:
                     random.shuffle(filtered_perfumes)
                     filtered_perfumes = filtered_perfumes[:25]
 
-                    names_prompt += f"\n### Preferred brand: {brand_filters}\n"
-                    names_prompt += (
+                    prompt.dynamic(f"\n### Preferred brand: {brand_filters}\n")
+                    prompt.dynamic(
                         "- If a brand in 'Preferred brand' matches a brand from the database, recommend perfumes from that brand.\n"
                         "- If no matching brand is found, recommend based on user_input and image_caption(if exists) without considering the brand.\n\n"
                     )
 
-                    for perfume in brand_filtered_perfumes:
-                        if perfume not in filtered_perfumes:
-                            filtered_perfumes.append(perfume)   # 브랜드 필터링을 하지 않은 미들노트 기준 결과에 brand_filtered_perfumes의 제품이 포함되지 않은 경우 포함
+                    # 브랜드 필터링을 하지 않은 미들노트 기준 결과에 brand_filtered_perfumes의 제품이 포함되지 않은 경우 포함
+                    # (토큰 예산으로 상품 목록이 잘려도 남도록 앞에 둠)
+                    filtered_perfumes = brand_filtered_perfumes + [p for p in filtered_perfumes if p not in brand_filtered_perfumes]
                 else:
                     random.shuffle(brand_filtered_perfumes)
                     filtered_perfumes = brand_filtered_perfumes[:25]
@@ -590,44 +687,12 @@ class LLMService:
                 logger.error("❌ 필터링 결과 없음")
                 raise HTTPException(status_code=404, detail="조건에 맞는 향수를 찾을 수 없습니다.")
 
-            # 4. GPT 프롬프트 생성
-            products_text = "\n".join([
-                f"{p['id']}. {p['name_kr']} ({p['brand']}): {p.get('main_accord', '향 정보 없음')}"
-                for p in filtered_perfumes
-            ])
-
-            
-
-            names_prompt += (
-                f"### Products list (id. name (brand): main_accord): \n{products_text}\n\n"
-                f"Recommend up to 3 perfume names without including the brand names.\n\n"
-                f"Note: The recommendations should refer to the user_input, image_caption, and extracted keywords. The image_caption describes the person's outfit, and the recommended perfumes should match the described outfit.\n"
-                f"- content: Please include the reason for the recommendation, the situation it suits, and the common feel of the perfumes in korean.\n\n"
-                "### Important Rule: You must respond only **in Korean**\n\n"
-                "Respond only in the following JSON format:\n"
-                "```json\n"
-                "{\n"
-                '  "recommendations": [\n'
-                '    {\n'
-                '      "name": "블랑쉬 오 드 퍼퓸",\n'
-                '      "reason": "깨끗한 머스크와 은은한 백합이 어우러져, 마치 새하얀 셔츠를 갓 다린 듯한 깔끔하고 세련된 느낌을 선사합니다. 자연스럽고 우아한 스타일을 연출하는 데 어울리는 향입니다.",\n'
-                '      "situation": "미니멀한 화이트 셔츠와 슬랙스 조합으로 세련된 오피스룩을 연출할 때, 심플하면서도 고급스러운 무드를 더하고 싶을 때"\n'
-                '    },\n'
-                '    {\n'
-                '      "name": "실버 마운틴 워터 오 드 퍼퓸",\n'
-                '      "reason": "상큼한 시트러스와 신선한 그린 티 노트가 조화를 이루며, 한여름에 가벼운 리넨 셔츠를 입은 듯한 시원하고 쾌적한 느낌을 줍니다. 모던하면서도 활동적인 스타일을 연출하는 데 적합합니다.",\n'
-                '      "situation": "캐주얼한 리넨 셔츠와 데님을 매치하여 자연스럽고 여유로운 분위기를 연출할 때, 여름철 시원하고 청량한 이미지를 강조하고 싶을 때"\n'
-                '    },\n'
-                '    {\n'
-                '      "name": "재즈 클럽 오 드 뚜왈렛",\n'
-                '      "reason": "달콤한 럼과 부드러운 바닐라가 타바코의 스모키함과 어우러져, 빈티지한 가죽 재킷과 클래식한 로퍼를 매치한 듯한 감각적인 무드를 완성합니다. 우아하면서도 개성 있는 스타일을 연출하기에 적합합니다.",\n'
-                '      "situation": "가죽 재킷과 첼시 부츠를 매치하여 세련된 남성미를 강조할 때, 클래식한 트렌치코트나 니트웨어와 함께 분위기 있는 가을, 겨울 룩을 완성하고 싶을 때"\n'
-                '    }\n'
-                '  ],\n'
-                '  "content": "깨끗한 리넨의 산뜻함, 신선한 자연의 청량감, 그리고 부드러운 따뜻함이 조화롭게 어우러진 세련되고 감각적인 향입니다."'
-                '}\n'
-                "```"
+            # 4. GPT 프롬프트 생성 (상품 목록은 토큰 예산 안에서 앞에서부터 포함)
+            prompt.candidates(
+                "\n### Products list (id. name (brand): main_accord): \n",
+                [f"{p['id']}. {p['name_kr']} ({p['brand']}): {p.get('main_accord', '향 정보 없음')}" for p in filtered_perfumes],
             )
+            names_prompt = prompt.build()
 
             try:
                 logger.info("🔄 향수 추천 처리 시작")
@@ -711,40 +776,6 @@ class LLMService:
             logger.error(f"추천 생성 오류: {str(e)}")
             raise HTTPException(status_code=500, detail="추천 생성 실패")    
 
-    def initialize_vector_db(self, diffuser_data, diffuser_scent_descriptions):
-        """Initialize Chroma DB and store embeddings."""
-        logger.info(f"Initializing Chroma DB.")
-        collection = chroma_client.get_or_create_collection(name="embeddings", embedding_function=embedding_function)
-
-        # Fetch existing IDs from the collection
-        existing_ids = set()
-        try:
-            results = collection.get()
-            existing_ids.update(results["ids"])
-        except Exception as e:
-            logger.error(f"Error fetching existing IDs: {e}")
-
-        # Insert vectors for each diffuser if not already in collection
-        for diffuser in diffuser_data:
-            if str(diffuser["id"]) in existing_ids:
-                # logger.info(f"Skipping diffuser ID {diffuser['id']} (already in collection).")
-                continue
-            
-            logger.info(f"Inserting vectors for ID {diffuser['id']}.")
-            scent_description = diffuser_scent_descriptions.get(diffuser["id"], "")
-
-            combined_text = f"{diffuser['brand']}\n{diffuser['name_kr']} ({diffuser['name_en']})\n{scent_description}"
-
-            # Store in Chroma
-            collection.add(
-                documents=[combined_text],
-                metadatas=[{"id": diffuser["id"], "name_kr": diffuser["name_kr"], "brand": diffuser["brand"], "category_id": diffuser["category_id"], "scent_description": scent_description}],
-                ids=[str(diffuser["id"])]
-            )
-        logger.info(f"Diffuser data have been embedded and stored in Chroma.")
-
-        return collection
-    
     def get_distinct_brands(self, product_data):
         """Return all distinct diffuser brands from the product data."""
         # 디퓨저는 개수가 적으므로 디퓨저 데이터만 가지고 브랜드 추출할 수 있는 함수 따로 생성
@@ -753,53 +784,31 @@ class LLMService:
             brands.add(product.get("brand", "Unknown"))
         return brands
     
+    def extract_brand_from_description(self, fragrance_description: str) -> Optional[str]:
+        """get_fragrance_recommendation 응답의 "Brand: ..." 줄에서 디퓨저 인덱스에 있는 브랜드 추출"""
+        for line in fragrance_description.splitlines():
+            if line.strip().lower().startswith("brand:"):
+                brand = line.split(":", 1)[1].strip()
+                return brand if brand in self.diffuser_index.brands else None
+        return None
+
     def get_fragrance_recommendation(self, user_input: Optional[str] = None, image_caption: Optional[str] = None):
         # GPT에게 user input과 image caption 전달 후 어울리는 향에 대한 설명 한국어로 반환(특정 브랜드 있으면 맨 앞에 적게끔 요청.)
-        existing_brands = self.get_distinct_brands(self.all_diffusers)
-        brands_str = ", ".join(existing_brands)
-
-        fragrance_description_prompt = f"""You are a fragrance expert with in-depth knowledge of various scents. Based on the User Input and Image Caption, **imagine** and provide a fragrance scent description that matches the room's description and the user's request. Focus more on the User Input. Your task is to creatively describe a fragrance that would fit well with the mood and characteristics of the room as described in the caption, as well as the user's scent preference. Do not mention specific diffuser or perfume products.
-
-### Instructions:
-- Existing Brands: {brands_str}
-1. **If a specific brand is mentioned**, check if it exists in the list of existing brands above. If it does, acknowledge the brand name without referring to any specific product and describe a fitting scent that aligns with the user's request.  
-**IF THE BRAND IS MENTIONED IN THE USER INPUT BUT IS NOT FOUND IN THE EXISTING BRANDS LIST, START BY 'Not Found' TO SAY THE BRAND DOES NOT EXIST.**
-2. **If the brand is misspelled or doesn't exist**, please:
-    - Correct the spelling if the brand is close to an existing brand (e.g., "아쿠아 파르마" -> "아쿠아 디 파르마").
-    - **IF THE BRAND IS MENTIONED IN THE USER INPUT BUT IS NOT FOUND IN THE EXISTING BRANDS LIST, START BY 'Not Found' TO SAY THE BRAND DOES NOT EXIST.** Then, recommend a suitable fragrance based on the context and preferences described in the user input.
-3. Provide the fragrance description in **Korean**, focusing on key scent notes and creative details that align with the mood and characteristics described in the user input and image caption. Do **not mention specific diffuser or perfume products.**
-
-### Example Responses:
-
-#### Example 1 (when a brand is mentioned, but with a minor spelling error):
-- User Input: 아쿠아 파르마의 우디한 베이스를 가진 디퓨저를 추천해줘.
-- Image Caption: The image shows a modern living room with a large window on the right side. The room has white walls and wooden flooring. On the left side of the room, there is a gray sofa and a white coffee table with a black and white patterned rug in front of it. In the center of the image, there are six black chairs arranged around a wooden dining table. The table is set with a vase and other decorative objects on it. Above the table, two large windows let in natural light and provide a view of the city outside. A white floor lamp is placed on the floor next to the sofa.
-- Response:
-Brand: 아쿠아 디 파르마
-Scent Description: 우디한 베이스에 따뜻하고 자연스러운 분위기를 더하는 향이 어울립니다. 은은한 샌들우드와 부드러운 시더우드가 조화를 이루며, 가벼운 머스크와 드라이한 베티버가 깊이를 더합니다. 가벼운 허브와 상쾌한 시트러스 노트가 은은하게 균형을 이루며 여유롭고 세련된 분위기를 연출합니다.
-
-#### Example 2 (when no brand is mentioned):
-- User Input: 우디한 베이스를 가진 디퓨저를 추천해줘.
-- Image Caption: The image shows a modern living room with a large window on the right side. The room has white walls and wooden flooring. On the left side of the room, there is a gray sofa and a white coffee table with a black and white patterned rug in front of it. In the center of the image, there are six black chairs arranged around a wooden dining table. The table is set with a vase and other decorative objects on it. Above the table, two large windows let in natural light and provide a view of the city outside. A white floor lamp is placed on the floor next to the sofa.
-- Response:
-Brand: None
-Scent Description: 우디한 베이스에 따뜻하고 자연스러운 분위기를 더하는 향이 어울립니다. 은은한 샌들우드와 부드러운 시더우드가 조화를 이루며, 가벼운 머스크와 드라이한 베티버가 깊이를 더합니다. 가벼운 허브와 상쾌한 시트러스 노트가 은은하게 균형을 이루며 여유롭고 세련된 분위기를 연출합니다.
-
-#### Example 3 (when a brand is mentioned but not in the list of existing brands):
-- User Input: 샤넬 브랜드 제품의 우디한 베이스를 가진 디퓨저를 추천해줘.
-- Image Caption: The image shows a modern living room with a large window on the right side. The room has white walls and wooden flooring. On the left side of the room, there is a gray sofa and a white coffee table with a black and white patterned rug in front of it. In the center of the image, there are six black chairs arranged around a wooden dining table. The table is set with a vase and other decorative objects on it. Above the table, two large windows let in natural light and provide a view of the city outside. A white floor lamp is placed on the floor next to the sofa.
-- Response:
-Brand: Not Found
-Scent Description: 우디한 베이스에 따뜻하고 자연스러운 분위기를 더하는 향이 어울립니다. 은은한 샌들우드와 부드러운 시더우드가 조화를 이루며, 가벼운 머스크와 드라이한 베티버가 깊이를 더합니다. 가벼운 허브와 상쾌한 시트러스 노트가 은은하게 균형을 이루며 여유롭고 세련된 분위기를 연출합니다.
-"""
-        
+        # 전체 디퓨저 브랜드 대신 입력에서 찾은 브랜드만 전달 (오타는 매처가 이미 보정)
+        brand_matcher = get_brand_matcher(self.get_distinct_brands(self.all_diffusers))
+        matched_brands, _ = brand_matcher.extract(" ".join(text for text in (user_input, image_caption) if text))
+        brands_str = ", ".join(matched_brands) or "None"
+
+        fragrance_description_prompt = PromptBuilder("fragrance_description")
+        fragrance_description_prompt.static(COMPACT_FRAGRANCE_DESCRIPTION_PROMPT if PROMPT_COMPACT else FRAGRANCE_DESCRIPTION_PROMPT)
+        fragrance_description_prompt.dynamic(f"\n### Existing Brands: {brands_str}")
         if user_input is not None:
-            fragrance_description_prompt += f"\n### User Input: {user_input}"
+            fragrance_description_prompt.dynamic(f"\n### User Input: {user_input}")
         if image_caption is not None:
-            fragrance_description_prompt += f"\n### Image Caption: {image_caption}"
-        fragrance_description_prompt += f"\n### Response: "
-        
-        fragrance_description = self.gpt_client.generate_response(fragrance_description_prompt).strip()
+            fragrance_description_prompt.dynamic(f"\n### Image Caption: {image_caption}")
+        fragrance_description_prompt.dynamic(f"\n### Response: ")
+
+        fragrance_description = self.gpt_client.generate_response(fragrance_description_prompt.build()).strip()
         return fragrance_description
     
     def generate_interior_design_based_recommendation_response(self, user_input: Optional[str] = None, image_caption: Optional[str] = None) -> dict:
@@ -809,32 +818,22 @@ Scent Description: 우디한 베이스에 따뜻하고 자연스러운 분위기
             fragrance_description = self.get_fragrance_recommendation(user_input=user_input, image_caption=image_caption)
 
             try:
-                diffusers_result = self.collection.query(
-                    query_texts=[fragrance_description],
-                    n_results=10,
-                    # where={"brand": "딥티크"},
-                    # where_document={"$contains":"프루티"}
-                )
+                # GPT 응답의 "Brand: ..."가 실제 브랜드이면 해당 브랜드 디퓨저 안에서만 검색 (없으면 전체에서 검색)
+                brand = self.extract_brand_from_description(fragrance_description)
+                diffusers = self.diffuser_index.search(fragrance_description, k=10, brands=[brand] if brand else None)
+                if not diffusers:
+                    diffusers = self.diffuser_index.search(fragrance_description, k=10)
 
-                # Extracting data from the query result
-                ids = diffusers_result["ids"][0]
-                documents = diffusers_result["documents"][0]
-                metadata = diffusers_result["metadatas"][0]
-
-                for i in range(len(ids)):
-                    product_id = ids[i]
-                    name_kr = metadata[i]["name_kr"]
-                    brand = metadata[i]["brand"]
-                    scent_description = metadata[i]["scent_description"]
-                    logger.info(f"Query Result - id: {product_id}. {name_kr} ({brand})\n{scent_description}\n")
+                for diffuser in diffusers:
+                    logger.info(f"Query Result - id: {diffuser['id']}. {diffuser['name_kr']} ({diffuser['brand']}) [{diffuser['similarity']:.3f}]\n{diffuser['scent_description']}\n")
 
                 diffusers_text = "\n".join([
-                    f"{metadata[i]['id']}. {metadata[i]['name_kr']} ({metadata[i]['brand']}): {metadata[i]['scent_description']}"
-                    for i in range(len(metadata))
+                    f"{diffuser['id']}. {diffuser['name_kr']} ({diffuser['brand']}): {diffuser['scent_description']}"
+                    for diffuser in diffusers
                 ])
             except Exception as e:
-                logger.error(f"Error during Chroma query: {e}")
-                diffusers_result = None
+                logger.error(f"Error during diffuser vector search: {e}")
+                diffusers_text = ""
 
             template = self.prompt_loader.get_prompt("diffuser_recommendation")
             diffuser_prompt = (
@@ -960,10 +959,10 @@ Scent Description: 우디한 베이스에 따뜻하고 자연스러운 분위기
             logger.error(f"추천 생성 오류: {str(e)}")
             raise HTTPException(status_code=500, detail="추천 생성 실패")
 
-    def decide_product_category(self, user_input: str) -> int:
+    def decide_product_category(self, user_input: str) -> Optional[int]:
         """
         This function uses GPT to determine whether the user is asking for a diffuser (2) or a perfume (1).
-        It returns 2 (default) if the user asks for neither or if there is an error.
+        It returns None if the response cannot be parsed (the caller falls back to 2 without logging it as training data).
         """
         product_category_prompt = f"""
         Given the user input, determine whether the user is asking for a diffuser or a perfume recommendation. 
@@ -996,22 +995,16 @@ Scent Description: 우디한 베이스에 따뜻하고 자연스러운 분위기
         Response: 
         """
 
-        category_id = 2  # Default category_id is set to 2 (for diffuser)
         product_category_response = self.gpt_client.generate_response(product_category_prompt).strip()
-
-        if product_category_response:
-            try:
-                category_id = int(product_category_response)
-            except ValueError:
-                category_id = 2
-        logger.info(f"🎀 카테고리 id: {category_id}")
+        category_id = parse_category(product_category_response)
+        logger.info(f"🎀 카테고리 id: {category_id} (GPT 응답: {product_category_response!r})")
 
         return category_id
 
-    def analyze_user_input_effect(self, user_input: str) -> list:
+    def analyze_user_input_effect(self, user_input: str) -> Optional[list]:
         """
         This function uses GPT to analyze the user's input and return a list of primary effects (as integers).
-        It returns [3] (Refreshing) by default in case of an error or invalid response.
+        It returns None if the response cannot be parsed (the caller falls back to [3] without logging it as training data).
         """
         user_input_effect_prompt = f"""
         Given the user input "{user_input}", identify the primary effect or effects the user is seeking among the following categories:
@@ -1036,11 +1029,8 @@ Scent Description: 우디한 베이스에 따뜻하고 자연스러운 분위기
         Output: 1"""
 
         user_input_effect_response = self.gpt_client.generate_response(user_input_effect_prompt).strip()
-        try:
-            user_input_effect_list = [int(x) for x in user_input_effect_response.split(',')]
-        except ValueError:
-            user_input_effect_list = [3]  # Default to [3] (Refreshing) if there's an error
-        logger.info(f"🎀 사용자 요구 효능 리스트: {user_input_effect_list}")
+        user_input_effect_list = parse_effects(user_input_effect_response)
+        logger.info(f"🎀 사용자 요구 효능 리스트: {user_input_effect_list} (GPT 응답: {user_input_effect_response!r})")
 
         return user_input_effect_list
 
@@ -1057,11 +1047,12 @@ Scent Description: 우디한 베이스에 따뜻하고 자연스러운 분위기
             user_input_effect_list = [3]
 
             if user_input is not None:
-                # Get the product category
-                category_id = self.decide_product_category(user_input)
-
-                # Analyze user input effects
-                user_input_effect_list = self.analyze_user_input_effect(user_input)
+                # 카테고리/효능 분류 (로컬 분류기가 확신하지 못한 쪽만 GPT로, 둘 다 필요하면 동시에 호출)
+                category_id, user_input_effect_list = therapy_classifier.classify(
+                    user_input,
+                    lambda: self.decide_product_category(user_input),
+                    lambda: self.analyze_user_input_effect(user_input),
+                )
 
             if category_id == 2:
                 all_products = self.all_diffusers
@@ -0,0 +1,298 @@
+import gc
+import os
+import asyncio
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+from dotenv import load_dotenv
+
+try:
+    import psutil
+except ImportError:  # psutil이 없으면 /proc/self/statm으로 RSS 측정
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+
+def current_rss_bytes() -> int:
+    """현재 프로세스의 상주 메모리(RSS)"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def model_size_bytes(obj: Any, _depth: int = 0) -> int:
+    """
+    torch 모듈의 파라미터/버퍼 크기 합계 (모델 메모리 예산 계산용)
+
+    (모델, 프로세서) 튜플이나 모델을 속성으로 가진 래퍼(Chroma 임베딩 함수 등)도 한 단계까지 찾아봅니다.
+    """
+    try:
+        import torch
+    except ImportError:
+        return 0
+
+    if isinstance(obj, torch.nn.Module):
+        tensors = list(obj.parameters()) + list(obj.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+    if _depth >= 2:
+        return 0
+    if isinstance(obj, (tuple, list)):
+        return sum(model_size_bytes(item, _depth + 1) for item in obj)
+    if hasattr(obj, "__dict__"):
+        return sum(model_size_bytes(value, _depth + 1) for value in vars(obj).values())
+    return 0
+
+
+class ModelEntry:
+    def __init__(self, name: str, loader: Callable[[], Any], on_evict: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self.loader = loader
+        self.on_evict = on_evict
+        self.model = None
+        self.size_bytes = 0
+        self.rss_delta_bytes = 0
+        self.in_use = 0
+        self.last_used: Optional[float] = None
+        self.load_count = 0
+        self.eviction_count = 0
+        self.last_load_seconds: Optional[float] = None
+        self.total_load_seconds = 0.0
+        self.load_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+
+class ModelRegistry:
+    """
+    모델 지연 로딩 + 메모리 예산 관리
+
+    - 서비스는 모듈 전역 변수 대신 register()로 로더를 등록하고 get()/use()로 모델을 가져옵니다.
+      같은 이름(모델 id)으로 등록한 서비스끼리는 하나의 인스턴스를 공유합니다.
+    - 모델은 처음 사용될 때 로드되며, 파라미터 크기 합계가 memory_budget_mb(MODEL_MEMORY_BUDGET_MB, 0이면 무제한)를
+      넘으면 사용 중이 아닌 모델부터 가장 오래전에 사용된 순서(LRU)로 내립니다.
+    - idle_ttl_seconds(MODEL_IDLE_TTL_SECONDS, 0이면 비활성화) 동안 사용되지 않은 모델은 evict_idle()에서 내립니다.
+    - 내린 모델의 메모리는 그 모델을 참조하는 객체가 모두 사라진 뒤 해제되므로,
+      서비스는 모델을 인스턴스 속성에 오래 보관하지 말고 호출할 때마다 registry에서 가져와야 합니다.
+    """
+
+    def __init__(self, memory_budget_mb: Optional[float] = None, idle_ttl_seconds: Optional[float] = None):
+        self.memory_budget_bytes = int(
+            (memory_budget_mb if memory_budget_mb is not None else float(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))) * 1024 * 1024
+        )
+        self.idle_ttl_seconds = idle_ttl_seconds if idle_ttl_seconds is not None else float(os.getenv("MODEL_IDLE_TTL_SECONDS", "0"))
+        self._entries: "OrderedDict[str, ModelEntry]" = OrderedDict()  # 사용 순서 (앞쪽이 가장 오래전에 사용)
+        self._lock = threading.RLock()
+
+    def register(self, name: str, loader: Callable[[], Any], on_evict: Optional[Callable[[Any], None]] = None) -> None:
+        """
+        로더 등록 (이미 같은 이름이 등록되어 있으면 기존 로더를 유지하여 모델을 공유)
+
+        on_evict: 모델을 내릴 때 호출 (라이브러리 내부 캐시 등 registry 밖의 참조 정리용)
+        """
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = ModelEntry(name, loader, on_evict)
+
+    def is_registered(self, name: str) -> bool:
+        return name in self._entries
+
+    def is_loaded(self, name: str) -> bool:
+        entry = self._entries.get(name)
+        return entry is not None and entry.loaded
+
+    def _load(self, entry: ModelEntry) -> None:
+        logger.info(f"🔹 모델 로드 중... ({entry.name})")
+        rss_before = current_rss_bytes()
+        started = time.perf_counter()
+        model = entry.loader()
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            entry.model = model
+            entry.size_bytes = model_size_bytes(model)
+            entry.rss_delta_bytes = max(0, current_rss_bytes() - rss_before)
+            entry.load_count += 1
+            entry.last_load_seconds = elapsed
+            entry.total_load_seconds += elapsed
+        logger.info(
+            f"✅ 모델 로드 완료: {entry.name} ({elapsed:.1f}s, "
+            f"파라미터 {entry.size_bytes / 1024 / 1024:.0f}MB, RSS +{entry.rss_delta_bytes / 1024 / 1024:.0f}MB)"
+        )
+
+    def _acquire(self, name: str) -> ModelEntry:
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"등록되지 않은 모델입니다: {name}")
+
+        # 같은 모델을 동시에 요청하면 한 번만 로드 (다른 모델의 로드/사용은 막지 않음)
+        with entry.load_lock:
+            with self._lock:
+                entry.in_use += 1
+                entry.last_used = time.monotonic()
+                self._entries.move_to_end(name)
+            if not entry.loaded:
+                try:
+                    self._load(entry)
+                except Exception:
+                    with self._lock:
+                        entry.in_use -= 1
+                    raise
+        self.enforce_budget()
+        return entry
+
+    def _release(self, entry: ModelEntry) -> None:
+        with self._lock:
+            entry.in_use -= 1
+            entry.last_used = time.monotonic()
+
+    def get(self, name: str) -> Any:
+        """
+        모델 반환 (필요하면 로드)
+
+        반환 후에는 사용 중으로 표시되지 않으므로 추론처럼 시간이 걸리는 작업에는 use()를 사용하세요.
+        """
+        entry = self._acquire(name)
+        model = entry.model
+        self._release(entry)
+        return model
+
+    @contextmanager
+    def use(self, name: str):
+        """with 블록 동안 모델을 사용 중으로 표시하여 메모리 예산 초과 시에도 내리지 않음"""
+        entry = self._acquire(name)
+        try:
+            yield entry.model
+        finally:
+            self._release(entry)
+
+    def _unload(self, entry: ModelEntry, reason: str) -> None:
+        if entry.on_evict is not None:
+            try:
+                entry.on_evict(entry.model)
+            except Exception as e:
+                logger.warning(f"⚠️ 모델 해제 콜백 실패 ({entry.name}): {e}")
+        entry.model = None
+        entry.size_bytes = 0
+        entry.eviction_count += 1
+        logger.info(f"♻️ 모델 해제: {entry.name} ({reason})")
+
+    def _free_memory(self) -> None:
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    @property
+    def loaded_bytes(self) -> int:
+        return sum(entry.size_bytes for entry in self._entries.values() if entry.loaded)
+
+    def enforce_budget(self) -> None:
+        """예산을 넘으면 사용 중이 아닌 모델을 LRU 순서로 내림 (방금 사용한 모델 하나만 남아도 넘으면 그대로 둠)"""
+        if self.memory_budget_bytes <= 0:
+            return
+
+        evicted = False
+        with self._lock:
+            for entry in list(self._entries.values()):
+                if self.loaded_bytes <= self.memory_budget_bytes:
+                    break
+                if entry.loaded and entry.in_use == 0:
+                    self._unload(entry, f"메모리 예산 {self.memory_budget_bytes / 1024 / 1024:.0f}MB 초과")
+                    evicted = True
+        if evicted:
+            self._free_memory()
+
+    def evict_idle(self) -> int:
+        """idle_ttl_seconds 이상 사용되지 않은 모델을 내리고 내린 개수 반환"""
+        if self.idle_ttl_seconds <= 0:
+            return 0
+
+        now = time.monotonic()
+        evicted = 0
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.loaded and entry.in_use == 0 and entry.last_used is not None and now - entry.last_used >= self.idle_ttl_seconds:
+                    self._unload(entry, f"{self.idle_ttl_seconds:.0f}초 동안 미사용")
+                    evicted += 1
+        if evicted:
+            self._free_memory()
+        return evicted
+
+    async def run_idle_eviction(self) -> None:
+        """idle_ttl_seconds의 절반 주기로 evict_idle 실행 (비활성화되어 있으면 바로 반환)"""
+        if self.idle_ttl_seconds <= 0:
+            return
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_ttl_seconds / 2))
+            await asyncio.to_thread(self.evict_idle)
+
+    def evict(self, name: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or not entry.loaded or entry.in_use:
+                return False
+            self._unload(entry, "요청에 의한 해제")
+        self._free_memory()
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            models = {
+                entry.name: {
+                    "loaded": entry.loaded,
+                    "in_use": entry.in_use,
+                    "size_mb": round(entry.size_bytes / 1024 / 1024, 1),
+                    "rss_delta_mb": round(entry.rss_delta_bytes / 1024 / 1024, 1),
+                    "idle_seconds": round(now - entry.last_used, 1) if entry.last_used is not None else None,
+                    "load_count": entry.load_count,
+                    "eviction_count": entry.eviction_count,
+                    "last_load_seconds": round(entry.last_load_seconds, 2) if entry.last_load_seconds is not None else None,
+                    "total_load_seconds": round(entry.total_load_seconds, 2),
+                }
+                for entry in self._entries.values()
+            }
+            return {
+                "memory_budget_mb": round(self.memory_budget_bytes / 1024 / 1024, 1),
+                "loaded_mb": round(self.loaded_bytes / 1024 / 1024, 1),
+                "rss_mb": round(current_rss_bytes() / 1024 / 1024, 1),
+                "models": models,
+            }
+
+
+def load_sentence_transformer(name: str):
+    """SentenceTransformer 로더 (GPU가 있으면 GPU, 추론 모드)"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(name).to("cuda" if torch.cuda.is_available() else "cpu")
+    model.eval()
+    return model
+
+
+def load_convnext(name: str):
+    """ConvNeXt 모델과 전처리기 로더 ((모델, 전처리기) 튜플)"""
+    import torch
+    from transformers import ConvNextModel, ConvNextImageProcessor
+
+    model = ConvNextModel.from_pretrained(name).to("cuda" if torch.cuda.is_available() else "cpu")
+    model.eval()
+    return model, ConvNextImageProcessor.from_pretrained(name)
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,238 @@
+import os
+import time
+import logging
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from PIL import Image, ImageOps
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+HASH_SIZE = 8
+PHASH_IMAGE_SIZE = 32
+
+
+def _dct_matrix(size: int) -> np.ndarray:
+    """직교 DCT-II 변환 행렬 (2D DCT = M @ X @ M.T)"""
+    n = np.arange(size)
+    matrix = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * size))
+    matrix[0] *= np.sqrt(1 / size)
+    matrix[1:] *= np.sqrt(2 / size)
+    return matrix
+
+
+DCT_MATRIX = _dct_matrix(PHASH_IMAGE_SIZE)
+
+
+class ImageHash(NamedTuple):
+    """64비트 pHash(DCT 저주파 기반) + dHash(인접 픽셀 밝기 차이 기반)"""
+    phash: int
+    dhash: int
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    value = 0
+    for bit in bits.flatten():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def compute_image_hash(image_data: bytes) -> ImageHash:
+    """이미지 바이트로부터 재압축/리사이즈/약간의 크롭에 강한 지각 해시 계산"""
+    with Image.open(BytesIO(image_data)) as image:
+        gray = ImageOps.exif_transpose(image).convert("L")
+
+    # pHash: 32x32 그레이스케일의 2D DCT에서 좌상단 8x8 저주파 성분을 중앙값과 비교
+    pixels = np.asarray(gray.resize((PHASH_IMAGE_SIZE, PHASH_IMAGE_SIZE), Image.LANCZOS), dtype=np.float64)
+    low_frequency = (DCT_MATRIX @ pixels @ DCT_MATRIX.T)[:HASH_SIZE, :HASH_SIZE]
+    phash = _bits_to_int(low_frequency > np.median(low_frequency))
+
+    # dHash: 9x8로 축소 후 가로 방향 인접 픽셀 밝기 비교
+    pixels = np.asarray(gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS), dtype=np.int16)
+    dhash = _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+    return ImageHash(phash, dhash)
+
+
+class _BKNode:
+    __slots__ = ("key", "entry_ids", "children")
+
+    def __init__(self, key: int):
+        self.key = key
+        self.entry_ids: set = set()
+        self.children: Dict[int, "_BKNode"] = {}
+
+
+class BKTree:
+    """
+    해밍 거리 기반 BK-tree
+
+    삼각 부등식을 이용해 질의 해시와 거리 d 이내인 키만 탐색하므로
+    전체 항목을 비교하지 않고 근사 중복 후보를 찾습니다.
+    삭제는 노드에서 항목 id만 제거하고, 빈 노드가 많아지면 트리를 다시 만듭니다.
+    """
+
+    def __init__(self):
+        self.root: Optional[_BKNode] = None
+        self.size = 0
+        self.empty_nodes = 0
+
+    def add(self, key: int, entry_id: int) -> None:
+        self.size += 1
+        if self.root is None:
+            self.root = _BKNode(key)
+            self.root.entry_ids.add(entry_id)
+            return
+
+        node = self.root
+        while True:
+            distance = hamming(key, node.key)
+            if distance == 0:
+                if not node.entry_ids:
+                    self.empty_nodes -= 1
+                node.entry_ids.add(entry_id)
+                return
+            child = node.children.get(distance)
+            if child is None:
+                child = _BKNode(key)
+                child.entry_ids.add(entry_id)
+                node.children[distance] = child
+                return
+            node = child
+
+    def remove(self, key: int, entry_id: int) -> None:
+        node = self.root
+        while node is not None:
+            distance = hamming(key, node.key)
+            if distance == 0:
+                if entry_id in node.entry_ids:
+                    node.entry_ids.discard(entry_id)
+                    self.size -= 1
+                    if not node.entry_ids:
+                        self.empty_nodes += 1
+                return
+            node = node.children.get(distance)
+
+    def search(self, key: int, max_distance: int) -> List[Tuple[int, int]]:
+        """(거리, 항목 id) 목록 반환"""
+        results = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(key, node.key)
+            if distance <= max_distance:
+                results.extend((distance, entry_id) for entry_id in node.entry_ids)
+            for child_distance, child in node.children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return results
+
+
+class _CacheEntry:
+    __slots__ = ("image_hash", "namespace", "value", "created_at")
+
+    def __init__(self, image_hash: ImageHash, namespace: str, value: Any):
+        self.image_hash = image_hash
+        self.namespace = namespace
+        self.value = value
+        self.created_at = time.monotonic()
+
+
+class PerceptualCache:
+    """
+    지각 해시 기반 근사 중복 이미지 결과 캐시 (캡션, 임베딩 등)
+
+    - pHash 해밍 거리가 threshold 이하이고 dHash도 threshold 이하이면 같은 이미지로 간주합니다.
+    - namespace로 같은 이미지에 대한 서로 다른 결과(예: 캡션 프로필별)를 구분합니다.
+    - 항목은 TTL이 지나면 만료되고, max_entries를 넘으면 가장 오래 사용하지 않은 항목부터 제거됩니다(LRU).
+    - max_entries가 0이면 캐시를 사용하지 않습니다.
+    """
+
+    def __init__(self, name: str, threshold: Optional[int] = None, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        self.name = name
+        self.threshold = threshold if threshold is not None else int(os.getenv("PHASH_CACHE_THRESHOLD", "4"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("PHASH_CACHE_TTL_SECONDS", "86400"))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("PHASH_CACHE_MAX_ENTRIES", "10000"))
+
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict()
+        self._tree = BKTree()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, image_hash: ImageHash, namespace: str = "") -> Optional[Any]:
+        """근사 중복 이미지의 캐시된 결과를 반환. 없으면 None"""
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            best = None
+            for distance, entry_id in self._tree.search(image_hash.phash, self.threshold):
+                entry = self._entries[entry_id]
+                if entry.namespace != namespace:
+                    continue
+                if self._is_expired(entry):
+                    self._remove(entry_id)
+                    continue
+                dhash_distance = hamming(image_hash.dhash, entry.image_hash.dhash)
+                if dhash_distance > self.threshold:
+                    continue
+                score = distance + dhash_distance
+                if best is None or score < best[0]:
+                    best = (score, entry_id)
+
+            if best is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best[1])
+            logger.info(f"♻️ [{self.name}] 근사 중복 이미지 캐시 적중 (해밍 거리 합: {best[0]})")
+            return self._entries[best[1]].value
+
+    def put(self, image_hash: ImageHash, value: Any, namespace: str = "") -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _CacheEntry(image_hash, namespace, value)
+            self._tree.add(image_hash.phash, entry_id)
+
+            if len(self._entries) > self.max_entries:
+                self._purge_expired()
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+            # 삭제로 생긴 빈 노드가 살아 있는 항목보다 많아지면 트리 재구성
+            if self._tree.empty_nodes > max(len(self._entries), 64):
+                self._rebuild_tree()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"name": self.name, "entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _is_expired(self, entry: _CacheEntry) -> bool:
+        return time.monotonic() - entry.created_at > self.ttl_seconds
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        self._tree.remove(entry.image_hash.phash, entry_id)
+
+    def _purge_expired(self) -> None:
+        for entry_id in [entry_id for entry_id, entry in self._entries.items() if self._is_expired(entry)]:
+            self._remove(entry_id)
+
+    def _rebuild_tree(self) -> None:
+        self._tree = BKTree()
+        for entry_id, entry in self._entries.items():
+            self._tree.add(entry.image_hash.phash, entry_id)
@@ -6,11 +6,12 @@ from langgraph.pregel import Channel
 from typing import TypedDict, Annotated, Optional
 from services.llm_service import LLMService
 from services.db_service import DBService
-from services.image_generation_service import ImageGenerationService
+from services.image_job_service import image_job_service
 from services.llm_img_service import LLMImageService
 from services.prompt_loader import PromptLoader
 from services.mongo_service import MongoService
 from models.img_llm_client import GPTClient
+from services.intent_classifier import product_intent_classifier
 import logging
 
 load_dotenv()
@@ -34,6 +35,8 @@ class ProductState(TypedDict):
             - 향 계열에 따른 향료 정보
         image_path (str): 생성된 이미지 경로
             - 이미지 생성 결과물 저장 경로
+        image_job_id (str): 이미지 생성 작업 ID
+            - 백그라운드 이미지 생성 작업 조회용 ID
         image_caption (str): 이미지 설명
             - 생성된 이미지에 대한 설명 텍스트
         response (str): 응답 메시지
@@ -54,6 +57,7 @@ class ProductState(TypedDict):
     recommendation_type: Optional[int]
     spices: Optional[list]
     image_path: Optional[str]
+    image_job_id: Optional[str]
     response: Optional[str]
     line_id: Optional[int]
     translated_input: Optional[str]
@@ -78,7 +82,7 @@ class ProductService:
         self.llm_service = LLMService(
             self.gpt_client, self.db_service, self.prompt_loader
         )
-        self.image_service = ImageGenerationService()
+        self.image_job_service = image_job_service
         self.llm_img_service = LLMImageService(self.gpt_client)
         self.mongo_service = MongoService()
 
@@ -220,7 +224,10 @@ class ProductService:
                 intent_prompt += f"\n### image_caption: {image_caption}"
             intent_prompt += f"\n### response: "
 
-            intent = self.gpt_client.generate_response(intent_prompt).strip()
+            # 로컬 분류기가 확신하면 GPT 호출 생략
+            intent = product_intent_classifier.classify(
+                user_input, image_caption, lambda: self.gpt_client.generate_response(intent_prompt)
+            )
             logger.info(f"Detected intent: {intent}")
 
             if "1" in intent:
@@ -426,18 +433,17 @@ class ProductService:
                         "recommendation_type": state["recommendation_type"],
                     }
 
-                    # 이미지 생성 시도
+                    # 이미지 생성 작업 등록 (생성은 백그라운드에서 진행)
                     try:
                         image_state = self.image_generator(state)
-                        state["image_path"] = image_state.get("image_path")
-                        if state["image_path"] and state["image_path"] != "failed":
-                            logger.info(f"✅ 이미지 생성 성공: {state['image_path']}")
-                            state["response"]["image_path"] = state["image_path"]
+                        job_id = image_state.get("image_job_id")
+                        if job_id:
+                            logger.info(f"✅ 이미지 생성 작업 등록: {job_id}")
                         else:
-                            logger.warning("⚠️ 이미지 생성 실패")
+                            logger.warning("⚠️ 이미지 생성 작업 등록 실패")
                     except Exception as img_err:
-                        logger.error(f"❌ 이미지 생성 오류: {img_err}")
-                        state["image_path"] = None
+                        logger.error(f"❌ 이미지 생성 작업 등록 오류: {img_err}")
+                        state["image_job_id"] = None
 
                     state["next_node"] = "end"
                     return state
@@ -467,20 +473,17 @@ class ProductService:
                             "recommendation_type": state["recommendation_type"],
                         }
 
-                        # 이미지 생성 시도
+                        # 이미지 생성 작업 등록 (생성은 백그라운드에서 진행)
                         try:
                             image_state = self.image_generator(state)
-                            state["image_path"] = image_state.get("image_path")
-                            if state["image_path"] and state["image_path"] != "failed":
-                                logger.info(
-                                    f"✅ 이미지 생성 성공: {state['image_path']}"
-                                )
-                                state["response"]["image_path"] = state["image_path"]
+                            job_id = image_state.get("image_job_id")
+                            if job_id:
+                                logger.info(f"✅ 이미지 생성 작업 등록: {job_id}")
                             else:
-                                logger.warning("⚠️ 이미지 생성 실패")
+                                logger.warning("⚠️ 이미지 생성 작업 등록 실패")
                         except Exception as img_err:
-                            logger.error(f"❌ 이미지 생성 오류: {img_err}")
-                            state["image_path"] = None
+                            logger.error(f"❌ 이미지 생성 작업 등록 오류: {img_err}")
+                            state["image_job_id"] = None
 
                         state["next_node"] = "end"
                         return state
@@ -526,19 +529,17 @@ class ProductService:
                         "recommendation_type": state["recommendation_type"],
                     }
 
-                    # 이미지 생성 시도
+                    # 이미지 생성 작업 등록 (생성은 백그라운드에서 진행)
                     try:
                         image_state = self.image_generator(state)
-                        state["image_path"] = image_state.get("image_path")
-
-                        if state["image_path"] and state["image_path"] != "failed":
-                            logger.info(f"✅ 이미지 생성 성공: {state['image_path']}")
-                            state["response"]["image_path"] = state["image_path"]
+                        job_id = image_state.get("image_job_id")
+                        if job_id:
+                            logger.info(f"✅ 이미지 생성 작업 등록: {job_id}")
                         else:
-                            logger.warning("⚠️ 이미지 생성 실패")
+                            logger.warning("⚠️ 이미지 생성 작업 등록 실패")
                     except Exception as img_err:
-                        logger.error(f"❌ 이미지 생성 오류: {img_err}")
-                        state["image_path"] = None
+                        logger.error(f"❌ 이미지 생성 작업 등록 오류: {img_err}")
+                        state["image_job_id"] = None
 
                     state["next_node"] = "end"
                     return state
@@ -568,20 +569,17 @@ class ProductService:
                             "recommendation_type": state["recommendation_type"],
                         }
 
-                        # 이미지 생성 시도
+                        # 이미지 생성 작업 등록 (생성은 백그라운드에서 진행)
                         try:
                             image_state = self.image_generator(state)
-                            state["image_path"] = image_state.get("image_path")
-                            if state["image_path"] and state["image_path"] != "failed":
-                                logger.info(
-                                    f"✅ 이미지 생성 성공: {state['image_path']}"
-                                )
-                                state["response"]["image_path"] = state["image_path"]
+                            job_id = image_state.get("image_job_id")
+                            if job_id:
+                                logger.info(f"✅ 이미지 생성 작업 등록: {job_id}")
                             else:
-                                logger.warning("⚠️ 이미지 생성 실패")
+                                logger.warning("⚠️ 이미지 생성 작업 등록 실패")
                         except Exception as img_err:
-                            logger.error(f"❌ 이미지 생성 오류: {img_err}")
-                            state["image_path"] = None
+                            logger.error(f"❌ 이미지 생성 작업 등록 오류: {img_err}")
+                            state["image_job_id"] = None
 
                         state["next_node"] = "end"
                         return state
@@ -624,18 +622,17 @@ class ProductService:
                         "recommendation_type": state["recommendation_type"],
                     }
 
-                    # 이미지 생성 시도
+                    # 이미지 생성 작업 등록 (생성은 백그라운드에서 진행)
                     try:
                         image_state = self.image_generator(state)
-                        state["image_path"] = image_state.get("image_path")
-                        if state["image_path"] and state["image_path"] != "failed":
-                            logger.info(f"✅ 이미지 생성 성공: {state['image_path']}")
-                            state["response"]["image_path"] = state["image_path"]
+                        job_id = image_state.get("image_job_id")
+                        if job_id:
+                            logger.info(f"✅ 이미지 생성 작업 등록: {job_id}")
                         else:
-                            logger.warning("⚠️ 이미지 생성 실패")
+                            logger.warning("⚠️ 이미지 생성 작업 등록 실패")
                     except Exception as img_err:
-                        logger.error(f"❌ 이미지 생성 오류: {img_err}")
-                        state["image_path"] = None
+                        logger.error(f"❌ 이미지 생성 작업 등록 오류: {img_err}")
+                        state["image_job_id"] = None
 
                     state["next_node"] = "end"
                     return state
@@ -678,18 +675,17 @@ class ProductService:
                         "recommendation_type": state["recommendation_type"],
                     }
 
-                    # 이미지 생성 시도
+                    # 이미지 생성 작업 등록 (생성은 백그라운드에서 진행)
                     try:
                         image_state = self.image_generator(state)
-                        state["image_path"] = image_state.get("image_path")
-                        if state["image_path"] and state["image_path"] != "failed":
-                            logger.info(f"✅ 이미지 생성 성공: {state['image_path']}")
-                            state["response"]["image_path"] = state["image_path"]
+                        job_id = image_state.get("image_job_id")
+                        if job_id:
+                            logger.info(f"✅ 이미지 생성 작업 등록: {job_id}")
                         else:
-                            logger.warning("⚠️ 이미지 생성 실패")
+                            logger.warning("⚠️ 이미지 생성 작업 등록 실패")
                     except Exception as img_err:
-                        logger.error(f"❌ 이미지 생성 오류: {img_err}")
-                        state["image_path"] = None
+                        logger.error(f"❌ 이미지 생성 작업 등록 오류: {img_err}")
+                        state["image_job_id"] = None
 
                     state["next_node"] = "end"
                     return state
@@ -766,7 +762,7 @@ class ProductService:
         return state
 
     def image_generator(self, state: ProductState) -> ProductState:
-        """추천된 향수 기반으로 이미지 생성"""
+        """추천된 향수 기반 이미지 생성 작업을 백그라운드 큐에 등록"""
         try:
             # ✅ response 객체 내부의 "recommendations" 및 "content" 안전하게 검증
             response = state.get("response") or {}
@@ -781,128 +777,101 @@ class ProductService:
                 state["next_node"] = "end"
                 return state
 
-            # 이미지 프롬프트 생성
-            prompt_parts = []
-
-            # Content 번역
-            try:
-                if content:
-                    # Content 번역을 위한 state 생성
-                    content_state = {"user_input": content}
-                    translated_content_state = self.text_translation(content_state)
-                    if translated_content_state.get("translated_input"):
-                        prompt_parts.append(
-                            translated_content_state["translated_input"]
-                        )
-                        logger.info("✅ Content 번역 완료")
-
-                # 각 추천 항목에 대해 영어로 번역
-                translated_recommendations = []
-                for rec in recommendations[:3]:  # 최대 3개만 처리
-                    if not isinstance(rec, dict):
-                        continue
-
-                    # 번역이 필요한 텍스트만 추출
-                    reason = rec.get("reason", "")
-                    situation = rec.get("situation", "")
-
-                    if reason or situation:
-                        translation_text = (
-                            f"Description: {reason}\nSituation: {situation}"
-                        )
-                        translation_state = {"user_input": translation_text}
-                        translated_state = self.text_translation(translation_state)
-
-                        if translated_state.get("translated_input"):
-                            translated_text = translated_state["translated_input"]
-                            parts = translated_text.split("\n")
-
-                            translated_rec = {
-                                "name": rec.get("name", ""),
-                                "brand": rec.get("brand", ""),
-                                "reason": (
-                                    parts[0].replace("Description:", "").strip()
-                                    if len(parts) > 0
-                                    else ""
-                                ),
-                                "situation": (
-                                    parts[1].replace("Situation:", "").strip()
-                                    if len(parts) > 1
-                                    else ""
-                                ),
-                            }
-                            translated_recommendations.append(translated_rec)
-
-                # 번역된 정보로 프롬프트 구성
-                for rec in translated_recommendations:
-                    if rec["reason"]:
-                        prompt_parts.append(rec["reason"])
-                    if rec["situation"]:
-                        prompt_parts.append(rec["situation"])
-
-                logger.info("✅ 텍스트 번역 완료")
-
-            except Exception as trans_err:
-                logger.error(f"❌ 번역 실패: {trans_err}")
-                # 기본 프롬프트 설정
-                prompt_parts = [
-                    "Elegant and sophisticated fragrance ambiance",
-                    "A refined and luxurious scent experience",
-                    "Aesthetic and harmonious fragrance composition",
-                    "An artistic representation of exquisite aromas",
-                    "A sensory journey of delicate and captivating scents",
-                ]
-
-            # 이미지 프롬프트 구성 (나머지 코드는 동일)
-            image_prompt = f"{''.join(prompt_parts)}"
-            logger.info(f"📸 이미지 생성 시작\n프롬프트: {image_prompt}")
-
-            # ✅ 이미지 저장 경로 지정 (generated_images 폴더)
-            save_directory = "generated_images"
-            os.makedirs(save_directory, exist_ok=True)  # 폴더가 없으면 생성
-
-            try:
-                image_result = self.image_service.generate_image(image_prompt)
-
-                if not image_result:
-                    raise ValueError("❌ 이미지 생성 결과가 비어있습니다")
-
-                if not isinstance(image_result, dict):
-                    raise ValueError(
-                        f"❌ 잘못된 이미지 결과 형식: {type(image_result)}"
-                    )
-
-                raw_output_path = image_result.get("output_path")
-                if not raw_output_path:
-                    raise ValueError("❌ 이미지 경로가 없습니다")
-
-                # ✅ 저장 경로를 `generated_images/` 폴더로 변경
-                filename = os.path.basename(raw_output_path)
-                output_path = os.path.join(save_directory, filename)
-
-                # ✅ 파일을 `generated_images/` 폴더로 이동
-                if os.path.exists(raw_output_path):
-                    os.rename(raw_output_path, output_path)
-
-                # ✅ `response["image_path"]`에 최종 경로 설정
-                response["image_path"] = output_path
-                logger.info(f"✅ 이미지 생성 완료: {output_path}")
-                state["image_path"] = output_path
-
-            except Exception as img_err:
-                logger.error(f"🚨 이미지 생성 실패: {img_err}")
-                response["image_path"] = "failed"  # ✅ 실패 시 "failed"로 설정
-                state["image_path"] = "failed"
+            # ✅ 번역 및 Stability 호출은 워커에서 실행되므로 추천 응답은 즉시 반환됨
+            recommendations = [dict(rec) for rec in recommendations[:3] if isinstance(rec, dict)]
+            job_id = self.image_job_service.submit(
+                lambda: self.build_image_prompt(content, recommendations)
+            )
 
+            response["image_job_id"] = job_id
+            response["image_status"] = "pending"
+            state["image_job_id"] = job_id
             state["next_node"] = "end"
             return state
 
         except Exception as e:
-            logger.error(f"❌ 이미지 생성 오류: {e}")
+            logger.error(f"❌ 이미지 생성 작업 등록 오류: {e}")
             state["error"] = str(e)
             state["next_node"] = "error_handler"
             return state
 
+    def build_image_prompt(self, content: str, recommendations: list) -> str:
+        """추천 결과(content, reason, situation)를 영어로 번역하여 이미지 프롬프트 생성"""
+        prompt_parts = []
+
+        # Content 번역
+        try:
+            if content:
+                # Content 번역을 위한 state 생성
+                content_state = {"user_input": content}
+                translated_content_state = self.text_translation(content_state)
+                if translated_content_state.get("translated_input"):
+                    prompt_parts.append(
+                        translated_content_state["translated_input"]
+                    )
+                    logger.info("✅ Content 번역 완료")
+
+            # 각 추천 항목에 대해 영어로 번역
+            translated_recommendations = []
+            for rec in recommendations[:3]:  # 최대 3개만 처리
+                if not isinstance(rec, dict):
+                    continue
+
+                # 번역이 필요한 텍스트만 추출
+                reason = rec.get("reason", "")
+                situation = rec.get("situation", "")
+
+                if reason or situation:
+                    translation_text = (
+                        f"Description: {reason}\nSituation: {situation}"
+                    )
+                    translation_state = {"user_input": translation_text}
+                    translated_state = self.text_translation(translation_state)
+
+                    if translated_state.get("translated_input"):
+                        translated_text = translated_state["translated_input"]
+                        parts = translated_text.split("\n")
+
+                        translated_rec = {
+                            "name": rec.get("name", ""),
+                            "brand": rec.get("brand", ""),
+                            "reason": (
+                                parts[0].replace("Description:", "").strip()
+                                if len(parts) > 0
+                                else ""
+                            ),
+                            "situation": (
+                                parts[1].replace("Situation:", "").strip()
+                                if len(parts) > 1
+                                else ""
+                            ),
+                        }
+                        translated_recommendations.append(translated_rec)
+
+            # 번역된 정보로 프롬프트 구성
+            for rec in translated_recommendations:
+                if rec["reason"]:
+                    prompt_parts.append(rec["reason"])
+                if rec["situation"]:
+                    prompt_parts.append(rec["situation"])
+
+            logger.info("✅ 텍스트 번역 완료")
+
+        except Exception as trans_err:
+            logger.error(f"❌ 번역 실패: {trans_err}")
+            # 기본 프롬프트 설정
+            prompt_parts = [
+                "Elegant and sophisticated fragrance ambiance",
+                "A refined and luxurious scent experience",
+                "Aesthetic and harmonious fragrance composition",
+                "An artistic representation of exquisite aromas",
+                "A sensory journey of delicate and captivating scents",
+            ]
+
+        image_prompt = f"{''.join(prompt_parts)}"
+        logger.info(f"📸 이미지 생성 시작\n프롬프트: {image_prompt}")
+        return image_prompt
+
     def chat_handler(self, state: ProductState) -> ProductState:
         try:
             # ✅ 요청에서 user_id 가져오기 (없으면 anonymous_user 사용)
@@ -921,6 +890,7 @@ class ProductService:
             if chat_summary:
                 context.append(f"📌 사용자 요약: {chat_summary}")  # 요약 추가
             context.extend(recent_chats)  # 최근 대화 추가
+            context_text = "\n".join(context)  # Python 3.12 미만은 f-string 표현식에 백슬래시 불가
 
             template = self.prompt_loader.get_prompt("chat")
 
@@ -940,7 +910,7 @@ class ProductService:
                 "### Example:\n"
                 "If the image or user input refers to something like pizza or chocolate, bring up a fragrance that might evoke similar sensory experiences, but don't immediately recommend a specific perfume.\n"
                 "Instead, gently ask the user about their fragrance preferences or what kinds of scents they enjoy, guiding the conversation toward fragrance naturally.\n\n"
-                f"{'\n'.join(context)}\n\n"
+                f"{context_text}\n\n"
                 "### Important Rule: You must respond only **in Korean**\n\n"
             )
 
@@ -1043,6 +1013,7 @@ class ProductService:
                 "recommendation_type": None,
                 "spices": None,
                 "image_path": None,
+                "image_job_id": None,
                 "response": None,
                 "line_id": None,
                 "translated_input": None,
@@ -0,0 +1,152 @@
+import os
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken이 없으면 글자 수로 토큰 수 추정
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+PROMPT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+# 짧은 프롬프트 사용 (few-shot 예시/매핑 목록 축약)
+PROMPT_COMPACT = os.getenv("PROMPT_COMPACT", "false").lower() == "true"
+
+
+@lru_cache(maxsize=4)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """프롬프트 토큰 수 (tiktoken이 없으면 영문 4글자당 1토큰, 한글 등은 1글자당 1토큰으로 추정)"""
+    if not text:
+        return 0
+    if tiktoken is not None:
+        return len(_encoding(model or PROMPT_MODEL).encode(text))
+    ascii_chars = sum(1 for char in text if char.isascii())
+    return ascii_chars // 4 + (len(text) - ascii_chars)
+
+
+class PromptStats:
+    """프롬프트 이름별 토큰 사용량 누적 (회귀 추적용, /metrics/prompts)"""
+
+    def __init__(self):
+        self._stats: Dict[str, dict] = {}
+        self._usage = {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, tokens: int, static_tokens: int, dropped: int) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(name, {"calls": 0, "total_tokens": 0, "max_tokens": 0, "static_tokens": 0, "trimmed_calls": 0})
+            stats["calls"] += 1
+            stats["total_tokens"] += tokens
+            stats["max_tokens"] = max(stats["max_tokens"], tokens)
+            stats["static_tokens"] = static_tokens
+            stats["trimmed_calls"] += 1 if dropped else 0
+
+    def record_usage(self, input_tokens: int, cached_tokens: int, output_tokens: int) -> None:
+        """OpenAI 응답의 실제 토큰 사용량 (cached_tokens: 프롬프트 캐싱으로 재사용된 입력 토큰)"""
+        with self._lock:
+            self._usage["calls"] += 1
+            self._usage["input_tokens"] += input_tokens
+            self._usage["cached_tokens"] += cached_tokens
+            self._usage["output_tokens"] += output_tokens
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            usage = dict(self._usage)
+            usage["cache_hit_ratio"] = round(usage["cached_tokens"] / usage["input_tokens"], 3) if usage["input_tokens"] else 0.0
+            return {
+                "budget_tokens": PROMPT_TOKEN_BUDGET,
+                "compact": PROMPT_COMPACT,
+                "prompts": {
+                    name: {**stats, "avg_tokens": round(stats["total_tokens"] / stats["calls"], 1)}
+                    for name, stats in self._stats.items()
+                },
+                "usage": usage,
+            }
+
+
+prompt_stats = PromptStats()
+
+
+class PromptBuilder:
+    """
+    토큰 예산을 지키는 프롬프트 조립기
+
+    - static(): 호출마다 같은 지시문/예시/출력 형식. 항상 프롬프트 맨 앞에 두어 OpenAI의 프롬프트 캐싱(동일한 앞부분 재사용)이 적용되도록 합니다.
+    - dynamic(): 사용자 입력처럼 호출마다 달라지는 부분 (static 뒤에 순서대로 붙음)
+    - candidates(): 상품 목록처럼 줄일 수 있는 후보 목록. 나머지 부분을 넣고 남은 예산만큼 앞에서부터 넣습니다.
+      (우선순위가 높은 후보를 앞에 두어야 함)
+    build()는 프롬프트 이름별 토큰 수를 로그로 남기고 prompt_stats에 누적합니다.
+    """
+
+    def __init__(self, name: str, budget: Optional[int] = None, model: Optional[str] = None):
+        self.name = name
+        self.budget = budget if budget is not None else PROMPT_TOKEN_BUDGET
+        self.model = model
+        self._static: List[str] = []
+        self._parts: List[tuple] = []  # ("text", 문자열) 또는 ("candidates", 머리말, 줄 목록, 최소 개수)
+        self.kept = 0
+        self.dropped = 0
+
+    def static(self, text: str) -> "PromptBuilder":
+        if self._parts:
+            raise ValueError("static 부분은 dynamic/candidates보다 먼저 추가해야 합니다.")
+        self._static.append(text)
+        return self
+
+    def dynamic(self, text: Optional[str]) -> "PromptBuilder":
+        if text:
+            self._parts.append(("text", text))
+        return self
+
+    def candidates(self, header: str, lines: List[str], min_items: int = 1) -> "PromptBuilder":
+        self._parts.append(("candidates", header, list(lines), min_items))
+        return self
+
+    def build(self) -> str:
+        static_text = "".join(self._static)
+        static_tokens = count_tokens(static_text, self.model)
+        fixed_tokens = static_tokens + sum(
+            count_tokens(part[1], self.model) for part in self._parts
+        )
+        remaining = self.budget - fixed_tokens
+
+        rendered = [static_text]
+        self.kept = self.dropped = 0
+        for part in self._parts:
+            if part[0] == "text":
+                rendered.append(part[1])
+                continue
+            _, header, lines, min_items = part
+            kept_lines = []
+            for line in lines:
+                line_tokens = count_tokens(line + "\n", self.model)
+                if len(kept_lines) >= min_items and line_tokens > remaining:
+                    break
+                kept_lines.append(line)
+                remaining -= line_tokens
+            self.kept += len(kept_lines)
+            self.dropped += len(lines) - len(kept_lines)
+            rendered.append(header + "\n".join(kept_lines) + "\n")
+
+        prompt = "".join(rendered)
+        tokens = count_tokens(prompt, self.model)
+        prompt_stats.record(self.name, tokens, static_tokens, self.dropped)
+        logger.info(
+            f"🧾 프롬프트 토큰 [{self.name}] 총 {tokens} (고정 앞부분 {static_tokens}, 예산 {self.budget}"
+            + (f", 후보 {self.kept}개 사용/{self.dropped}개 제외)" if self.kept or self.dropped else ")")
+        )
+        return prompt
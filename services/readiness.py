@@ -0,0 +1,125 @@
+import time
+import asyncio
+import inspect
+import logging
+from typing import Callable, Dict, Optional
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class Subsystem:
+    def __init__(self, name: str, loader: Callable):
+        self.name = name
+        self.loader = loader
+        self.status = PENDING
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.elapsed_seconds: Optional[float] = None
+        self.done = asyncio.Event()
+
+
+class ReadinessRegistry:
+    """
+    서브시스템(모델, 인덱스 등)별 준비 상태 관리
+
+    각 라우터/서비스는 import 시점에 무거운 초기화를 하는 대신 register()로 로더를 등록하고,
+    앱 시작 시 start()가 모든 로더를 백그라운드에서 동시에 실행합니다.
+    동기 로더는 작업 스레드에서 실행되므로 로드 중에도 /health 등 가벼운 요청은 바로 처리됩니다.
+    아직 준비되지 않은 서브시스템에 의존하는 라우트는 require()로 503을 반환합니다.
+    """
+
+    def __init__(self):
+        self._subsystems: Dict[str, Subsystem] = {}
+        self._tasks = []
+
+    def register(self, name: str, loader: Callable) -> None:
+        """로더 등록 (동기 함수 또는 코루틴 함수)"""
+        self._subsystems[name] = Subsystem(name, loader)
+
+    async def _run(self, subsystem: Subsystem) -> None:
+        subsystem.status = LOADING
+        subsystem.started_at = time.perf_counter()
+        logger.info(f"🔹 {subsystem.name} 초기화 시작")
+        try:
+            if inspect.iscoroutinefunction(subsystem.loader):
+                await subsystem.loader()
+            else:
+                await asyncio.to_thread(subsystem.loader)
+            subsystem.status = READY
+            logger.info(f"✅ {subsystem.name} 초기화 완료 ({time.perf_counter() - subsystem.started_at:.1f}s)")
+        except Exception as e:
+            subsystem.status = FAILED
+            subsystem.error = str(e)
+            logger.error(f"🚨 {subsystem.name} 초기화 실패: {e}")
+        finally:
+            subsystem.elapsed_seconds = time.perf_counter() - subsystem.started_at
+            subsystem.done.set()
+
+    def start(self) -> None:
+        """등록된 모든 로더를 백그라운드 태스크로 동시에 실행"""
+        for subsystem in self._subsystems.values():
+            if subsystem.status == PENDING:
+                self._tasks.append(asyncio.create_task(self._run(subsystem)))
+
+    async def stop(self) -> None:
+        """종료 시 아직 실행 중인 초기화 태스크 취소 (작업 스레드에서 실행 중인 로더는 끝날 때까지 실행됨)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def wait(self, name: str) -> bool:
+        """초기화가 끝날 때까지 대기 후 성공 여부 반환"""
+        subsystem = self._subsystems[name]
+        await subsystem.done.wait()
+        return subsystem.status == READY
+
+    def is_ready(self, name: str) -> bool:
+        subsystem = self._subsystems.get(name)
+        return subsystem is not None and subsystem.status == READY
+
+    @property
+    def all_ready(self) -> bool:
+        return all(subsystem.status == READY for subsystem in self._subsystems.values())
+
+    def status(self) -> Dict[str, dict]:
+        now = time.perf_counter()
+        return {
+            name: {
+                "status": subsystem.status,
+                "error": subsystem.error,
+                "elapsed_seconds": round(
+                    subsystem.elapsed_seconds if subsystem.elapsed_seconds is not None
+                    else (now - subsystem.started_at if subsystem.started_at is not None else 0.0),
+                    2,
+                ),
+            }
+            for name, subsystem in self._subsystems.items()
+        }
+
+    def require(self, *names: str) -> Callable:
+        """라우트 의존성: 필요한 서브시스템이 모두 준비되지 않았으면 503 (Retry-After 포함)"""
+
+        def dependency():
+            not_ready = {
+                name: self._subsystems[name].status if name in self._subsystems else PENDING
+                for name in names
+                if not self.is_ready(name)
+            }
+            if not_ready:
+                raise HTTPException(
+                    status_code=503,
+                    detail={"message": "서비스 초기화 중입니다. 잠시 후 다시 시도하세요.", "subsystems": not_ready},
+                    headers={"Retry-After": "10"},
+                )
+
+        return dependency
+
+
+readiness = ReadinessRegistry()
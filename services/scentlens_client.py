@@ -0,0 +1,200 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from typing import Any, List, Optional, Tuple
+import httpx
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class ScentlensClientError(RuntimeError):
+    """scentlens 원격 서버 호출 실패"""
+
+
+class CircuitOpenError(ScentlensClientError):
+    """연속 실패로 회로가 열려 호출을 시도하지 않음"""
+
+
+class CircuitBreaker:
+    """
+    연속 실패가 failure_threshold번 이상이면 reset_seconds 동안 호출을 차단(open)하고,
+    그 후 한 번의 시험 호출(half-open)이 성공하면 다시 닫습니다(closed).
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.half_open_trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.half_open_trial:
+            self.half_open_trial = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.half_open_trial = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.half_open_trial = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"⚠️ scentlens 서버 호출이 {self.failures}번 연속 실패하여 {self.reset_seconds}초 동안 차단합니다.")
+            self.opened_at = time.monotonic()
+
+
+class ScentlensClient:
+    """
+    scentlens 원격 서버(SCENTLENS_SERVER_URL) 비동기 HTTP 클라이언트
+
+    - httpx.AsyncClient 하나로 커넥션을 재사용하고 연결/읽기 타임아웃을 적용합니다.
+    - 연결 오류, 타임아웃, 429/5xx 응답은 지수 백오프(+지터)로 재시도합니다.
+    - 재시도 후에도 실패한 호출이 이어지면 회로 차단기가 열려 즉시 실패합니다.
+    - 초기화 시 상품 이미지 목록은 청크로 나누어 청크마다 다운로드 -> 임베딩 계산을 이어서 처리합니다.
+    """
+
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = base_url or os.getenv("SCENTLENS_SERVER_URL")
+        self.connect_timeout = float(os.getenv("SCENTLENS_CONNECT_TIMEOUT", "5"))
+        self.timeout = float(os.getenv("SCENTLENS_TIMEOUT", "30"))
+        self.batch_timeout = float(os.getenv("SCENTLENS_BATCH_TIMEOUT", "300"))
+        self.max_retries = int(os.getenv("SCENTLENS_MAX_RETRIES", "3"))
+        self.backoff_seconds = float(os.getenv("SCENTLENS_RETRY_BACKOFF_SECONDS", "0.5"))
+        self.max_connections = int(os.getenv("SCENTLENS_MAX_CONNECTIONS", "20"))
+        self.chunk_size = int(os.getenv("SCENTLENS_INIT_CHUNK_SIZE", "200"))
+        self.chunk_concurrency = int(os.getenv("SCENTLENS_INIT_CONCURRENCY", "2"))
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("SCENTLENS_CIRCUIT_FAILURE_THRESHOLD", "5")),
+            reset_seconds=float(os.getenv("SCENTLENS_CIRCUIT_RESET_SECONDS", "30")),
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            if not self.base_url:
+                raise ScentlensClientError("SCENTLENS_SERVER_URL 환경 변수가 설정되지 않았습니다.")
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _post(self, path: str, timeout: Optional[float] = None, **kwargs) -> Any:
+        """재시도/회로 차단을 적용한 POST 요청 후 JSON 응답 반환"""
+        trial = self.breaker.state == "half-open"
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"scentlens 서버 호출이 일시적으로 차단되었습니다: {path}")
+
+        try:
+            return await self._post_with_retries(path, timeout, **kwargs)
+        finally:
+            # 시험 호출이 성공/실패를 기록하지 못하고 끝나도(다른 예외, 취소) 다음 시험 호출을 허용
+            if trial:
+                self.breaker.half_open_trial = False
+
+    async def _post_with_retries(self, path: str, timeout: Optional[float] = None, **kwargs) -> Any:
+        client = self._get_client()
+        request_timeout = httpx.Timeout(timeout or self.timeout, connect=self.connect_timeout)
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = self.backoff_seconds * (2 ** (attempt - 1))
+                await asyncio.sleep(delay + random.uniform(0, delay))
+            try:
+                response = await client.post(path, timeout=request_timeout, **kwargs)
+            except httpx.TransportError as e:
+                last_error = f"{type(e).__name__}: {e}"
+                logger.warning(f"⚠️ scentlens 요청 실패 ({path}, 시도 {attempt + 1}/{self.max_retries + 1}): {last_error}")
+                continue
+
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                last_error = f"Status code: {response.status_code}"
+                logger.warning(f"⚠️ scentlens 요청 실패 ({path}, 시도 {attempt + 1}/{self.max_retries + 1}): {last_error}")
+                continue
+
+            # 4xx 등 재시도해도 결과가 같은 응답은 서버 장애로 보지 않음
+            self.breaker.record_success()
+            if response.status_code != 200:
+                raise ScentlensClientError(f"{path} failed. Status code: {response.status_code}")
+            try:
+                return response.json()
+            except ValueError as e:
+                raise ScentlensClientError(f"{path} returned invalid JSON: {e}")
+
+        self.breaker.record_failure()
+        raise ScentlensClientError(f"{path} failed after {self.max_retries + 1} attempts. {last_error}")
+
+    async def compute_embedding(self, image_bytes: bytes) -> Optional[List[float]]:
+        """업로드된 이미지 한 장의 임베딩 계산"""
+        data = await self._post(
+            "/compute_embedding_of_uploaded_file/",
+            files={"file": ("uploaded_image.png", image_bytes)},
+        )
+        return data.get("embedding")
+
+    async def download_images(self, product_image_data: List[dict]) -> List[dict]:
+        return await self._post("/download_images/", json=product_image_data, timeout=self.batch_timeout)
+
+    async def compute_embeddings(self, downloaded_images: List[dict]) -> List[dict]:
+        return await self._post("/get_or_compute_embeddings/", json=downloaded_images, timeout=self.batch_timeout)
+
+    async def download_and_compute_embeddings(self, product_image_data: List[dict]) -> Tuple[List[dict], int]:
+        """
+        상품 이미지 목록을 청크로 나누어 청크마다 다운로드 -> 임베딩 계산을 수행합니다.
+        동시에 chunk_concurrency개 청크까지 처리하며, 결과는 입력 순서대로 합쳐집니다.
+
+        Returns:
+            Tuple[List[dict], int]: (임베딩 결과 목록, 실패한 청크 수)
+        """
+        chunk_size = max(1, self.chunk_size)
+        chunks = [product_image_data[i:i + chunk_size] for i in range(0, len(product_image_data), chunk_size)]
+        semaphore = asyncio.Semaphore(max(1, self.chunk_concurrency))
+
+        async def process_chunk(number: int, chunk: List[dict]) -> Optional[List[dict]]:
+            async with semaphore:
+                try:
+                    downloaded_images = await self.download_images(chunk)
+                    embeddings_data = await self.compute_embeddings(downloaded_images)
+                    logger.info(f"Processed image chunk {number + 1}/{len(chunks)} ({len(chunk)} images).")
+                    return embeddings_data
+                except ScentlensClientError as e:
+                    logger.error(f"Failed to process image chunk {number + 1}/{len(chunks)}: {e}")
+                    return None
+
+        results = await asyncio.gather(*(process_chunk(number, chunk) for number, chunk in enumerate(chunks)))
+        embeddings_data = [item for result in results if result for item in result]
+        failed_chunks = sum(1 for result in results if result is None)
+        return embeddings_data, failed_chunks
+
+
+scentlens_client = ScentlensClient()
@@ -0,0 +1,545 @@
+import os
+import json
+import math
+import uuid
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import faiss
+import numpy as np
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+MANIFEST_VERSION = 2
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+PRODUCT_AGGREGATIONS = ("none", "mean", "max")
+
+# GPU 인덱스는 리소스 객체가 살아 있는 동안만 유효하므로 모듈 단위로 보관
+_gpu_resources = None
+
+
+def use_gpu() -> bool:
+    """SCENTLENS_INDEX_DEVICE(auto/cpu/gpu)와 faiss 빌드의 GPU 지원 여부로 장치 결정"""
+    device = os.getenv("SCENTLENS_INDEX_DEVICE", "auto").lower()
+    gpu_available = hasattr(faiss, "StandardGpuResources") and faiss.get_num_gpus() > 0
+
+    if device == "cpu":
+        return False
+    if device == "gpu" and not gpu_available:
+        logger.warning("⚠️ SCENTLENS_INDEX_DEVICE=gpu 이지만 사용 가능한 GPU가 없어 CPU 인덱스를 사용합니다.")
+    return gpu_available
+
+
+class IndexConfig:
+    """
+    FAISS 인덱스 종류와 파라미터 (기본값은 SCENTLENS_INDEX_* 환경 변수)
+
+    - flat: 정확한 내적 검색 (기본값)
+    - hnsw: 그래프 기반 근사 검색, M(이웃 수)/efConstruction/efSearch
+    - ivf_flat: k-means 클러스터(nlist) 중 nprobe개만 탐색
+    - ivf_pq: ivf_flat + Product Quantization으로 벡터 압축 (pq_m개 부분 벡터 x pq_bits 비트)
+
+    product_aggregation이 mean/max이면 상품별 이미지 벡터를 풀링한 상품 단위 인덱스를 함께 만들고,
+    검색 후 상위 rerank_candidates개 상품을 이미지 단위 벡터로 다시 정렬합니다.
+
+    증분 동기화 시 IVF 계열은 추가되는 벡터가 전체의 sync_rebuild_ratio를 넘으면
+    클러스터를 다시 학습하도록 인덱스 전체를 다시 만듭니다.
+    """
+
+    def __init__(
+        self,
+        index_type: Optional[str] = None,
+        nlist: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        hnsw_m: Optional[int] = None,
+        ef_construction: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        pq_m: Optional[int] = None,
+        pq_bits: Optional[int] = None,
+        product_aggregation: Optional[str] = None,
+        rerank_candidates: Optional[int] = None,
+        sync_rebuild_ratio: Optional[float] = None,
+    ):
+        self.index_type = (index_type or os.getenv("SCENTLENS_INDEX_TYPE", "flat")).lower()
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"지원하지 않는 FAISS 인덱스 종류입니다: {self.index_type} ({', '.join(INDEX_TYPES)})")
+
+        # nlist가 0이면 벡터 수에 맞춰 4 * sqrt(N)으로 결정
+        self.nlist = nlist if nlist is not None else int(os.getenv("SCENTLENS_INDEX_NLIST", "0"))
+        self.nprobe = nprobe if nprobe is not None else int(os.getenv("SCENTLENS_INDEX_NPROBE", "16"))
+        self.hnsw_m = hnsw_m if hnsw_m is not None else int(os.getenv("SCENTLENS_INDEX_M", "32"))
+        self.ef_construction = ef_construction if ef_construction is not None else int(os.getenv("SCENTLENS_INDEX_EF_CONSTRUCTION", "200"))
+        self.ef_search = ef_search if ef_search is not None else int(os.getenv("SCENTLENS_INDEX_EF_SEARCH", "64"))
+        self.pq_m = pq_m if pq_m is not None else int(os.getenv("SCENTLENS_INDEX_PQ_M", "16"))
+        self.pq_bits = pq_bits if pq_bits is not None else int(os.getenv("SCENTLENS_INDEX_PQ_BITS", "8"))
+
+        self.product_aggregation = (product_aggregation or os.getenv("SCENTLENS_PRODUCT_AGGREGATION", "none")).lower()
+        if self.product_aggregation not in PRODUCT_AGGREGATIONS:
+            raise ValueError(f"지원하지 않는 상품 벡터 집계 방식입니다: {self.product_aggregation} ({', '.join(PRODUCT_AGGREGATIONS)})")
+        # 0이면 재정렬 없이 상품 벡터 점수를 그대로 사용
+        self.rerank_candidates = rerank_candidates if rerank_candidates is not None else int(os.getenv("SCENTLENS_RERANK_CANDIDATES", "50"))
+        self.sync_rebuild_ratio = sync_rebuild_ratio if sync_rebuild_ratio is not None else float(os.getenv("SCENTLENS_SYNC_REBUILD_RATIO", "0.3"))
+
+    def build_params(self) -> Dict[str, Any]:
+        """인덱스를 다시 만들어야 하는 파라미터 (검색 파라미터 nprobe/efSearch는 제외)"""
+        params = {"type": self.index_type}
+        if self.index_type == "hnsw":
+            params.update({"M": self.hnsw_m, "efConstruction": self.ef_construction})
+        elif self.index_type in ("ivf_flat", "ivf_pq"):
+            params["nlist"] = self.nlist
+            if self.index_type == "ivf_pq":
+                params.update({"pq_m": self.pq_m, "pq_bits": self.pq_bits})
+        return params
+
+
+def base_index(cpu_index: faiss.Index) -> faiss.Index:
+    """IndexIDMap으로 감싼 인덱스면 내부 인덱스 반환"""
+    if isinstance(cpu_index, faiss.IndexIDMap):
+        return faiss.downcast_index(cpu_index.index)
+    return cpu_index
+
+
+def to_device(cpu_index: faiss.Index) -> faiss.Index:
+    """CPU 인덱스를 설정에 따라 GPU로 복사 (GPU가 없거나 GPU 미지원 인덱스면 그대로 반환)"""
+    global _gpu_resources
+
+    if not use_gpu():
+        return cpu_index
+    if isinstance(base_index(cpu_index), faiss.IndexHNSW):
+        return cpu_index
+    if _gpu_resources is None:
+        _gpu_resources = faiss.StandardGpuResources()
+    try:
+        return faiss.index_cpu_to_gpu(_gpu_resources, 0, cpu_index)
+    except Exception as e:
+        logger.warning(f"⚠️ GPU로 인덱스를 옮기지 못해 CPU 인덱스를 사용합니다: {e}")
+        return cpu_index
+
+
+def is_gpu_index(index: faiss.Index) -> bool:
+    """GPU 인덱스 또는 GPU 인덱스를 감싼 IndexIDMap(to_device 결과)인지 여부"""
+    if not hasattr(faiss, "GpuIndex"):
+        return False
+    return isinstance(index, faiss.GpuIndex) or isinstance(base_index(index), faiss.GpuIndex)
+
+
+def to_cpu(index: faiss.Index) -> faiss.Index:
+    """
+    GPU 인덱스면 CPU 복사본 반환 (IndexIDMap2로 감싼 GPU 인덱스 포함)
+
+    write_index/clone_index/remove_ids는 GPU 인덱스를 감싼 IndexIDMap2에서 동작하지 않으므로
+    저장/증분 갱신 전에 반드시 거쳐야 합니다.
+    """
+    if is_gpu_index(index):
+        return faiss.index_gpu_to_cpu(index)
+    return index
+
+
+def apply_search_params(cpu_index: faiss.Index, config: IndexConfig) -> None:
+    """검색 시점 파라미터 적용 (저장된 인덱스를 로드한 뒤에도 현재 설정을 반영)"""
+    cpu_index = base_index(cpu_index)
+    if isinstance(cpu_index, faiss.IndexHNSW):
+        cpu_index.hnsw.efSearch = config.ef_search
+    elif isinstance(cpu_index, faiss.IndexIVF):
+        cpu_index.nprobe = min(config.nprobe, cpu_index.nlist)
+
+
+def build_cpu_index(embeddings: np.ndarray, config: Optional[IndexConfig] = None, ids: Optional[np.ndarray] = None) -> faiss.Index:
+    """
+    정규화된 임베딩으로 내적(코사인 유사도) CPU 인덱스 생성 (IVF 계열은 같은 임베딩으로 학습)
+
+    ids를 주면 IndexIDMap2로 감싸 검색 결과로 행 번호 대신 해당 id를 반환하고, id 단위로 삭제할 수 있습니다.
+    """
+    config = config or IndexConfig()
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    count, dimension = embeddings.shape
+    index_type = config.index_type
+
+    if index_type == "ivf_pq" and count < 2 ** config.pq_bits:
+        logger.warning(f"⚠️ PQ 학습에 필요한 벡터 수({2 ** config.pq_bits})보다 적어 IVF-Flat 인덱스를 사용합니다.")
+        index_type = "ivf_flat"
+    if index_type in ("ivf_flat", "ivf_pq") and count == 0:
+        index_type = "flat"
+
+    if index_type == "hnsw":
+        cpu_index = faiss.IndexHNSWFlat(dimension, config.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        cpu_index.hnsw.efConstruction = config.ef_construction
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        nlist = config.nlist or int(4 * math.sqrt(count))
+        # k-means 학습에는 클러스터당 약 39개 이상의 벡터가 필요
+        nlist = max(1, min(nlist, count // 39 or 1))
+        quantizer = faiss.IndexFlatIP(dimension)
+        if index_type == "ivf_pq":
+            # 차원이 부분 벡터 수로 나누어떨어져야 하므로 pq_m 이하의 가장 큰 약수 사용
+            pq_m = max(m for m in range(1, min(config.pq_m, dimension) + 1) if dimension % m == 0)
+            cpu_index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, config.pq_bits, faiss.METRIC_INNER_PRODUCT)
+        else:
+            cpu_index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        cpu_index.train(embeddings)
+    else:
+        cpu_index = faiss.IndexFlatIP(dimension)
+
+    if ids is not None:
+        cpu_index = faiss.IndexIDMap2(cpu_index)
+        if count:
+            cpu_index.add_with_ids(embeddings, np.ascontiguousarray(ids, dtype=np.int64))
+    elif count:
+        cpu_index.add(embeddings)
+    apply_search_params(cpu_index, config)
+    logger.info(f"FAISS {index_type} 인덱스 생성: {count}개, 차원 {dimension}")
+    return cpu_index
+
+
+def normalize_query(embedding) -> np.ndarray:
+    """
+    검색 쿼리 임베딩을 (1, D) 단위 벡터로 정규화
+
+    인덱스 벡터도 정규화되어 있으므로 검색 점수는 쿼리 임베딩의 크기와 무관한 코사인 유사도(-1 ~ 1)입니다.
+    """
+    query = np.array(embedding, dtype=np.float32).reshape(1, -1)
+    query /= max(float(np.linalg.norm(query)), 1e-12)
+    return query
+
+
+def build_index(embeddings: np.ndarray, config: Optional[IndexConfig] = None, ids: Optional[np.ndarray] = None) -> faiss.Index:
+    return to_device(build_cpu_index(embeddings, config, ids))
+
+
+def update_cpu_index(
+    index: Optional[faiss.Index],
+    embeddings: np.ndarray,
+    ids: np.ndarray,
+    removed_ids: np.ndarray,
+    added_embeddings: np.ndarray,
+    added_ids: np.ndarray,
+    config: Optional[IndexConfig] = None,
+) -> faiss.Index:
+    """
+    기존 id 인덱스의 복사본에 삭제/추가만 적용한 새 CPU 인덱스 반환
+
+    원본 인덱스는 검색에 사용 중일 수 있으므로 수정하지 않습니다.
+    embeddings/ids는 변경 후 전체 목록으로, 증분 적용이 불가능하거나
+    (기존 인덱스 없음, 차원 변경, HNSW에서 삭제, IVF 계열 대량 추가) 비효율적인 경우 전체를 다시 만들 때 사용합니다.
+    """
+    config = config or IndexConfig()
+    current = to_cpu(index) if index is not None else None
+    rebuild_reason = None
+
+    if current is None or not isinstance(current, faiss.IndexIDMap):
+        rebuild_reason = "id 인덱스 없음"
+    elif len(added_embeddings) and current.d != added_embeddings.shape[1]:
+        rebuild_reason = f"임베딩 차원 변경 ({current.d} -> {added_embeddings.shape[1]})"
+    elif isinstance(base_index(current), faiss.IndexHNSW) and len(removed_ids):
+        rebuild_reason = "HNSW 인덱스는 삭제를 지원하지 않음"
+    elif isinstance(base_index(current), faiss.IndexIVF) and len(added_ids) > config.sync_rebuild_ratio * max(1, len(ids)):
+        rebuild_reason = "IVF 클러스터 재학습"
+
+    if rebuild_reason is not None:
+        logger.info(f"FAISS 인덱스를 전체 다시 생성합니다: {rebuild_reason}")
+        return build_cpu_index(embeddings, config, ids)
+
+    # GPU 인덱스는 to_cpu에서 이미 복사본이 만들어짐
+    updated = faiss.clone_index(current) if current is index else current
+    if len(removed_ids):
+        updated.remove_ids(np.ascontiguousarray(removed_ids, dtype=np.int64))
+    if len(added_ids):
+        updated.add_with_ids(
+            np.ascontiguousarray(added_embeddings, dtype=np.float32),
+            np.ascontiguousarray(added_ids, dtype=np.int64),
+        )
+    apply_search_params(updated, config)
+    logger.info(f"FAISS 인덱스 증분 갱신: 삭제 {len(removed_ids)}개, 추가 {len(added_ids)}개, 전체 {updated.ntotal}개")
+    return updated
+
+
+class ProductIndex:
+    """
+    상품 단위 인덱스: 상품별 이미지 임베딩을 평균(mean) 또는 차원별 최댓값(max)으로 풀링한 뒤 정규화
+
+    검색 결과가 처음부터 서로 다른 상품이므로 이미지 단위 인덱스처럼 중복 제거를 위해 과다 검색할 필요가 없습니다.
+    """
+
+    def __init__(self, index: faiss.Index, product_ids: List, image_rows: Dict[Any, List[int]], aggregation: str):
+        self.index = index
+        self.product_ids = product_ids
+        self.image_rows = image_rows  # 상품 id -> 임베딩 행 번호 목록
+        self.aggregation = aggregation
+
+    @staticmethod
+    def group_images(images: List[Dict]) -> Tuple[List, Dict[Any, List[int]]]:
+        """이미지 목록을 상품별 행 번호로 묶음 (상품 순서는 처음 등장한 순서)"""
+        image_rows: Dict[Any, List[int]] = {}
+        for row, image in enumerate(images):
+            image_rows.setdefault(image["product_id"], []).append(row)
+        return list(image_rows), image_rows
+
+    @classmethod
+    def build_cpu(cls, embeddings: np.ndarray, images: List[Dict], aggregation: str, config: IndexConfig) -> "ProductIndex":
+        product_ids, image_rows = cls.group_images(images)
+        vectors = np.zeros((len(product_ids), embeddings.shape[1]), dtype=np.float32)
+        for position, product_id in enumerate(product_ids):
+            product_embeddings = embeddings[image_rows[product_id]]
+            vectors[position] = product_embeddings.max(axis=0) if aggregation == "max" else product_embeddings.mean(axis=0)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return cls(build_cpu_index(vectors, config), product_ids, image_rows, aggregation)
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, images: List[Dict], aggregation: str, config: IndexConfig) -> "ProductIndex":
+        product_index = cls.build_cpu(embeddings, images, aggregation, config)
+        product_index.index = to_device(product_index.index)
+        return product_index
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[Any, float]]:
+        """(상품 id, 상품 벡터 유사도) 목록을 유사도 내림차순으로 반환"""
+        k = min(k, self.index.ntotal)
+        if k <= 0:
+            return []
+        D, I = self.index.search(query, k)
+        return [(self.product_ids[i], float(similarity)) for similarity, i in zip(D[0], I[0]) if i >= 0]
+
+
+def to_product_result(product: Dict, similarity: float, image: Dict) -> Dict:
+    return {
+        "id": product["id"],
+        "name": product["name_kr"],
+        "brand": product["brand"],
+        "content": product["content"],
+        "similarity": similarity,
+        "url": image["url"],
+    }
+
+
+def match_products(
+    index: faiss.Index,
+    query: np.ndarray,
+    image_by_id: Dict[int, Dict],
+    product_by_id: Dict[Any, Dict],
+    threshold: float,
+    max_results: int = 10,
+    max_candidates: int = 1024,
+    images_per_product: float = 1.0,
+) -> List[Dict]:
+    """
+    이미지 단위 인덱스에서 코사인 유사도가 threshold를 넘는 서로 다른 상품을 유사도 내림차순으로 최대 max_results개 반환
+
+    상품당 평균 이미지 수로 후보 수를 추정해 한 번 검색하고, 같은 상품의 이미지는 가장 유사한 것만 남깁니다.
+    후보가 모두 threshold 이상인데 상품 수가 부족할 때만 후보 수를 두 배로 늘려 다시 검색하며,
+    후보 수는 인덱스 크기와 max_candidates를 넘지 않습니다.
+
+    Args:
+        query (np.ndarray): normalize_query()로 정규화한 (1, D) 쿼리
+        image_by_id (Dict[int, Dict]): 이미지 id(FAISS 라벨) -> 이미지 정보
+        product_by_id (Dict[Any, Dict]): 상품 id -> 상품 정보
+    """
+    total = index.ntotal if index is not None else 0
+    if total == 0:
+        return []
+
+    limit = min(total, max_candidates)
+    candidates = min(limit, max(max_results, math.ceil(max_results * images_per_product * 2)))
+
+    while True:
+        D, I = index.search(query, candidates)
+
+        best_by_product = {}  # 상품 id -> 가장 유사한 이미지 (삽입 순서 = 유사도 내림차순)
+        below_threshold = False
+        for similarity, i in zip(D[0], I[0]):
+            # 근사 인덱스(IVF/HNSW)는 후보가 부족하면 -1을 반환
+            if i < 0:
+                continue
+            if similarity <= threshold:
+                below_threshold = True
+                break
+
+            image = image_by_id.get(int(i))
+            if image is None:
+                continue
+            product_id = image["product_id"]
+            if product_id in best_by_product or product_id not in product_by_id:
+                continue
+            best_by_product[product_id] = (float(similarity), image)
+            if len(best_by_product) >= max_results:
+                break
+
+        if len(best_by_product) >= max_results or below_threshold or candidates >= limit:
+            break
+        candidates = min(limit, candidates * 2)
+
+    return [
+        to_product_result(product_by_id[product_id], similarity, image)
+        for product_id, (similarity, image) in best_by_product.items()
+    ]
+
+
+def match_products_by_product(
+    product_index: ProductIndex,
+    query: np.ndarray,
+    db_embeddings: np.ndarray,
+    db_images: List[Dict],
+    product_by_id: Dict[Any, Dict],
+    threshold: float,
+    max_results: int = 10,
+    rerank_candidates: int = 0,
+) -> List[Dict]:
+    """
+    상품 단위 인덱스에서 바로 서로 다른 상품을 검색합니다. (threshold는 코사인 유사도)
+
+    rerank_candidates > 0이면 상위 후보 상품들의 이미지별 유사도 중 최댓값으로 점수를 다시 매겨
+    이미지 단위 검색과 같은 기준(가장 비슷한 상품 이미지)으로 정렬하고, 그 이미지의 url을 반환합니다.
+    """
+    candidates = [
+        (product_id, similarity)
+        for product_id, similarity in product_index.search(query, max(max_results, rerank_candidates))
+        if product_id in product_by_id
+    ]
+    if not candidates:
+        return []
+
+    results = []
+    if rerank_candidates > 0:
+        # 후보 상품들의 이미지 벡터를 한 번에 내적한 뒤 상품별 최댓값을 점수로 사용
+        rows_by_product = [product_index.image_rows[product_id] for product_id, _ in candidates]
+        rows = np.concatenate(rows_by_product)
+        image_similarities = np.asarray(db_embeddings[rows]) @ query[0]
+        offsets = np.cumsum([0] + [len(product_rows) for product_rows in rows_by_product[:-1]])
+        for (product_id, _), offset, product_rows in zip(candidates, offsets, rows_by_product):
+            best = int(np.argmax(image_similarities[offset:offset + len(product_rows)]))
+            similarity = float(image_similarities[offset + best])
+            if similarity > threshold:
+                results.append((similarity, product_id, db_images[product_rows[best]]))
+    else:
+        for product_id, similarity in candidates:
+            if similarity > threshold:
+                results.append((similarity, product_id, db_images[product_index.image_rows[product_id][0]]))
+
+    results.sort(key=lambda result: result[0], reverse=True)
+    return [
+        to_product_result(product_by_id[product_id], similarity, image)
+        for similarity, product_id, image in results[:max_results]
+    ]
+
+
+class ScentlensIndexStore:
+    """
+    FAISS 인덱스와 임베딩, 매니페스트를 디스크에 저장/로드
+
+    매니페스트에는 임베딩 모델(백엔드 이름)과 인덱스에 들어간 이미지 목록(id, product_id, url)을 기록합니다.
+    시작 시 임베딩 모델이 같으면 그대로 로드한 뒤 상품 이미지 캐시와의 차이만 증분 동기화하고,
+    인덱스 종류/빌드 파라미터만 바뀐 경우에는 저장된 임베딩으로 인덱스만 다시 만듭니다.
+    메인 인덱스는 이미지 id를 라벨로 사용하는 IndexIDMap2입니다.
+    상품 단위 인덱스(product_index.faiss)도 같은 디렉터리에 함께 저장됩니다.
+    """
+
+    def __init__(self, directory: Optional[str] = None, config: Optional[IndexConfig] = None):
+        self.directory = Path(directory or os.getenv("SCENTLENS_INDEX_DIR", "cache/scentlens"))
+        self.config = config or IndexConfig()
+        self.index_path = self.directory / "index.faiss"
+        self.embeddings_path = self.directory / "embeddings.npy"
+        self.manifest_path = self.directory / "manifest.json"
+        self.product_index_path = self.directory / "product_index.faiss"
+
+    def manifest_version(self) -> Optional[int]:
+        """매니페스트 수정 시각 (저장될 때마다 바뀜, 없으면 None)"""
+        try:
+            return self.manifest_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def load(self, embedding_model: str) -> Optional[Tuple[faiss.Index, np.ndarray, List[Dict], Optional[ProductIndex]]]:
+        """임베딩 모델이 일치하면 (인덱스, 임베딩, 이미지 목록, 상품 인덱스) 반환, 아니면 None"""
+        if not self.manifest_path.exists():
+            return None
+
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+
+            if manifest.get("version") != MANIFEST_VERSION or manifest.get("embedding_model") != embedding_model:
+                logger.info("임베딩 모델 또는 저장 형식이 변경되어 저장된 FAISS 인덱스를 사용하지 않습니다.")
+                return None
+
+            images = manifest["images"]
+            # 메모리가 부족한 노드(PQ 인덱스 사용 등)를 위해 원본 임베딩은 메모리 맵으로 로드
+            embeddings = np.load(self.embeddings_path, mmap_mode="r")
+            if len(embeddings) != len(images):
+                logger.warning("⚠️ 저장된 임베딩과 매니페스트의 항목 수가 달라 다시 생성합니다.")
+                return None
+
+            rebuilt = False
+            if manifest.get("index") != self.config.build_params():
+                logger.info(f"FAISS 인덱스 설정이 변경되어 저장된 임베딩으로 다시 생성합니다: {self.config.build_params()}")
+                cpu_index = build_cpu_index(embeddings, self.config, [image["id"] for image in images])
+                rebuilt = True
+            else:
+                cpu_index = faiss.read_index(str(self.index_path))
+                if cpu_index.ntotal != len(images):
+                    logger.warning("⚠️ 저장된 FAISS 인덱스와 매니페스트의 항목 수가 달라 다시 생성합니다.")
+                    return None
+                apply_search_params(cpu_index, self.config)
+
+            product_index = None
+            aggregation = self.config.product_aggregation
+            if aggregation != "none":
+                if not rebuilt and manifest.get("product_index") == aggregation and self.product_index_path.exists():
+                    product_ids, image_rows = ProductIndex.group_images(images)
+                    product_cpu_index = faiss.read_index(str(self.product_index_path))
+                    apply_search_params(product_cpu_index, self.config)
+                    product_index = ProductIndex(product_cpu_index, product_ids, image_rows, aggregation)
+                if product_index is None or product_index.index.ntotal != len(product_index.product_ids):
+                    logger.info(f"상품 단위 인덱스를 저장된 임베딩으로 다시 생성합니다: {aggregation}")
+                    product_index = ProductIndex.build_cpu(embeddings, images, aggregation, self.config)
+                    rebuilt = True
+
+            if rebuilt:
+                self.save(cpu_index, embeddings, images, embedding_model, product_index)
+
+            logger.info(f"✅ 저장된 FAISS 인덱스 로드 완료: {len(images)}개 ({self.directory})")
+            if product_index is not None:
+                product_index.index = to_device(product_index.index)
+            return to_device(cpu_index), embeddings, images, product_index
+
+        except Exception as e:
+            logger.error(f"Failed to load saved FAISS index: {e}")
+            return None
+
+    def save(self, index: faiss.Index, embeddings: np.ndarray, images: List[Dict], embedding_model: str, product_index: Optional[ProductIndex] = None) -> None:
+        """인덱스/임베딩을 먼저 기록하고 매니페스트를 마지막에 교체하여 불완전한 저장본을 로드하지 않도록 함"""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            suffix = f".{uuid.uuid4().hex}.tmp"
+
+            tmp_index_path = self.directory / f".{self.index_path.name}{suffix}"
+            faiss.write_index(to_cpu(index), str(tmp_index_path))
+            os.replace(tmp_index_path, self.index_path)
+
+            if product_index is not None:
+                tmp_product_index_path = self.directory / f".{self.product_index_path.name}{suffix}"
+                faiss.write_index(to_cpu(product_index.index), str(tmp_product_index_path))
+                os.replace(tmp_product_index_path, self.product_index_path)
+
+            tmp_embeddings_path = self.directory / f".{self.embeddings_path.name}{suffix}"
+            with open(tmp_embeddings_path, "wb") as f:
+                np.save(f, np.ascontiguousarray(embeddings, dtype=np.float32))
+            os.replace(tmp_embeddings_path, self.embeddings_path)
+
+            manifest = {
+                "version": MANIFEST_VERSION,
+                "embedding_model": embedding_model,
+                "count": len(images),
+                "dimension": int(embeddings.shape[1]) if embeddings.ndim == 2 else 0,
+                "index": self.config.build_params(),
+                "product_index": product_index.aggregation if product_index is not None else None,
+                "images": images,
+            }
+            tmp_manifest_path = self.directory / f".{self.manifest_path.name}{suffix}"
+            with open(tmp_manifest_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(tmp_manifest_path, self.manifest_path)
+
+            logger.info(f"✅ FAISS 인덱스 저장 완료: {len(images)}개 ({self.directory})")
+
+        except Exception as e:
+            logger.error(f"Failed to save FAISS index: {e}")
@@ -5,6 +5,8 @@ from transformers import ConvNextModel, ConvNextImageProcessor
 from sklearn.metrics.pairwise import cosine_similarity
 from services.db_service import Product, ProductImage, SessionLocal
 from embedding_utils import save_embedding, load_embedding
+from services.readiness import readiness
+from services.model_registry import model_registry, load_convnext
 import logging
 from concurrent.futures import ThreadPoolExecutor
 import requests
@@ -24,26 +26,36 @@ device = "cuda" if torch.cuda.is_available() else "cpu"
 # ✅ 사용할 이미지 모델 타입 설정
 IMAGE_MODEL_TYPE = "convnext"
 
-# ✅ 선택된 모델 타입에 따른 모델과 전처리기 초기화
-if IMAGE_MODEL_TYPE == "convnext":
-    # ConvNext 모델 설정 (Hugging Face에서 제공)
-    model_path = "facebook/convnext-base-224"
-    image_model = ConvNextModel.from_pretrained(model_path).to(device)
-    image_processor = ConvNextImageProcessor.from_pretrained(model_path)
-elif IMAGE_MODEL_TYPE == "swin":
-    # Swin Transformer V2 모델 설정 (torchvision 제공)
-    weights = Swin_V2_B_Weights.IMAGENET1K_V1  # ImageNet으로 학습된 가중치
-    image_model = swin_v2_b(weights=weights).to(device)
-    image_processor = weights.transforms()  # 이미지 전처리 파이프라인
-else:  # vit
-    # Vision Transformer 모델 설정 (torchvision 제공)
-    image_model = vit_b_16(pretrained=True).to(device)
-    image_processor = ConvNextImageProcessor.from_pretrained(
-        "facebook/convnext-base-224"
-    )
-
-# ✅ 모델을 평가 모드로 설정 (학습 비활성화)
-image_model.eval()
+# ✅ 모델과 전처리기는 model_registry에서 처음 필요할 때 로드 (앱 시작 시에는 readiness 백그라운드 로더가 미리 로드)
+model_path = "facebook/convnext-base-224" if IMAGE_MODEL_TYPE == "convnext" else None
+IMAGE_MODEL_NAME = model_path or IMAGE_MODEL_TYPE
+
+
+def load_image_model():
+    """선택된 모델 타입에 따른 (모델, 전처리기) 초기화 (model_registry 로더)"""
+    if IMAGE_MODEL_TYPE == "convnext":
+        # ConvNext 모델 설정 (Hugging Face에서 제공)
+        return load_convnext(model_path)
+
+    if IMAGE_MODEL_TYPE == "swin":
+        # Swin Transformer V2 모델 설정 (torchvision 제공)
+        weights = Swin_V2_B_Weights.IMAGENET1K_V1  # ImageNet으로 학습된 가중치
+        model = swin_v2_b(weights=weights).to(device)
+        processor = weights.transforms()  # 이미지 전처리 파이프라인
+    else:  # vit
+        # Vision Transformer 모델 설정 (torchvision 제공)
+        model = vit_b_16(pretrained=True).to(device)
+        processor = ConvNextImageProcessor.from_pretrained(
+            "facebook/convnext-base-224"
+        )
+
+    # ✅ 모델을 평가 모드로 설정 (학습 비활성화)
+    model.eval()
+    return model, processor
+
+
+model_registry.register(IMAGE_MODEL_NAME, load_image_model)
+readiness.register("similar_image", lambda: model_registry.get(IMAGE_MODEL_NAME))
 
 # ✅ 멀티스레딩을 위한 스레드 풀 생성
 executor = ThreadPoolExecutor(max_workers=4)
@@ -70,9 +82,9 @@ def get_similar_image_embedding(image_url: str):
         response.raise_for_status()
         image = Image.open(response.raw).convert("RGB")
 
-        with torch.no_grad():
-            inputs = image_processor(images=image, return_tensors="pt").to(device)
-            outputs = image_model(**inputs)
+        with model_registry.use(IMAGE_MODEL_NAME) as (model, processor), torch.no_grad():
+            inputs = processor(images=image, return_tensors="pt").to(device)
+            outputs = model(**inputs)
 
             # ✅ 차원 변환 추가 (1D → 2D 변환)
             embedding = outputs.last_hidden_state.mean(dim=1).squeeze().cpu().numpy()
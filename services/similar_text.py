@@ -1,10 +1,11 @@
 import torch
-from sentence_transformers import SentenceTransformer
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 from sqlalchemy.orm import sessionmaker
 from services.db_service import Product, Note, SessionLocal
 from embedding_utils import save_text_embedding, load_text_embedding
+from services.readiness import readiness
+from services.model_registry import model_registry, load_sentence_transformer
 
 # ✅ 텍스트 임베딩을 위한 모델 설정
 # mpnet: Microsoft의 MPNet 모델 (성능이 좋지만 상대적으로 느림)
@@ -20,8 +21,10 @@ TEXT_MODEL_CONFIG = {
     "minilm": "sentence-transformers/all-MiniLM-L6-v2",
 }
 
-# ✅ 선택된 모델로 텍스트 임베딩 모델 초기화 + GPU 지원 추가
-text_model = SentenceTransformer(TEXT_MODEL_CONFIG[TEXT_MODEL_TYPE]).to(device)
+# ✅ 선택된 텍스트 임베딩 모델은 model_registry에서 처음 필요할 때 로드 (GPU 지원, bookmark_service와 공유)
+TEXT_MODEL_NAME = TEXT_MODEL_CONFIG[TEXT_MODEL_TYPE]
+model_registry.register(TEXT_MODEL_NAME, lambda: load_sentence_transformer(TEXT_MODEL_NAME))
+readiness.register("similar_text", lambda: model_registry.get(TEXT_MODEL_NAME))
 
 # ✅ 세션 팩토리를 생성하여 세션 객체를 만듦
 Session = sessionmaker(bind=SessionLocal().bind)
@@ -35,7 +38,7 @@ def get_similar_text_embedding(text: str):
     if cached_embedding is not None:
         return cached_embedding
 
-    with torch.no_grad():
+    with model_registry.use(TEXT_MODEL_NAME) as text_model, torch.no_grad():
         embedding = text_model.encode(text, convert_to_tensor=True).cpu().numpy()  # ✅ GPU에서 연산 후 CPU로 변환
 
     save_text_embedding(text, embedding)
@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from services.diffuser_index import KLUE_MODEL_NAME, embed_texts
+from services.intent_classifier import INTENT_LOG_DIR, INTENT_LOG_ENABLED, INTENT_MODEL_DIR, LOCAL_INTENT_ENABLED
+
+try:
+    import joblib
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.multiclass import OneVsRestClassifier
+    from sklearn.preprocessing import MultiLabelBinarizer
+except ImportError:  # scikit-learn이 없으면 항상 GPT로 카테고리/효능 분류
+    joblib = None
+    LogisticRegression = None
+    OneVsRestClassifier = None
+    MultiLabelBinarizer = None
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# 카테고리/효능별 확률이 이 값 이상(양성) 또는 1 - 이 값 이하(음성)일 때만 확신한 것으로 판단
+THERAPY_CONFIDENCE_THRESHOLD = float(os.getenv("THERAPY_CONFIDENCE_THRESHOLD", "0.8"))
+
+# 테라피 효능 (spice_therapeutic_effect.effect 값)
+THERAPY_EFFECTS = (1, 2, 3, 4, 5, 6)
+PERFUME_CATEGORY_ID = 1
+DIFFUSER_CATEGORY_ID = 2
+# GPT 응답을 해석하지 못했을 때 사용하는 기본값 (디퓨저, 리프레시)
+DEFAULT_CATEGORY_ID = DIFFUSER_CATEGORY_ID
+DEFAULT_EFFECTS = [3]
+
+
+def parse_category(response: str) -> Optional[int]:
+    """GPT 카테고리 응답("1" 또는 "2") 해석. 해석할 수 없으면 None"""
+    try:
+        category_id = int(response.strip())
+    except ValueError:
+        return None
+    return category_id if category_id in (PERFUME_CATEGORY_ID, DIFFUSER_CATEGORY_ID) else None
+
+
+def parse_effects(response: str) -> Optional[List[int]]:
+    """GPT 효능 응답("3, 6" 등) 해석. 비어 있거나 1~6이 아닌 값이 있으면 None"""
+    try:
+        effects = [int(value) for value in response.split(",")]
+    except ValueError:
+        return None
+    return effects if effects and all(effect in THERAPY_EFFECTS for effect in effects) else None
+
+
+def train_therapy_classifier(
+    texts: List[str], category_ids: List[Optional[int]], effects: List[Optional[List[int]]], c: float = 1.0
+) -> dict:
+    """
+    카테고리(향수/디퓨저) 분류기와 효능 다중 라벨 분류기 학습
+
+    두 분류기는 같은 KLUE-SRoBERTa 임베딩을 입력으로 쓰며, 각각 라벨이 기록된 샘플로만 학습합니다.
+    """
+    if LogisticRegression is None:
+        raise RuntimeError("scikit-learn이 설치되어 있지 않아 테라피 분류기를 학습할 수 없습니다.")
+    embeddings = embed_texts(texts)
+    models = {"category": None, "effects": None, "effect_labels": None}
+
+    category_rows = [i for i, category_id in enumerate(category_ids) if category_id is not None]
+    if len({category_ids[i] for i in category_rows}) == 2:
+        models["category"] = LogisticRegression(C=c, max_iter=1000, class_weight="balanced").fit(
+            embeddings[category_rows], [category_ids[i] for i in category_rows]
+        )
+
+    effect_rows = [i for i, effect_list in enumerate(effects) if effect_list]
+    if effect_rows:
+        binarizer = MultiLabelBinarizer(classes=list(THERAPY_EFFECTS))
+        targets = binarizer.fit_transform([effects[i] for i in effect_rows])
+        # 한 번도 나오지 않은(또는 항상 나온) 효능은 학습할 수 없으므로 제외
+        trainable = [j for j in range(targets.shape[1]) if 0 < targets[:, j].sum() < len(effect_rows)]
+        if trainable:
+            models["effects"] = OneVsRestClassifier(LogisticRegression(C=c, max_iter=1000, class_weight="balanced")).fit(
+                embeddings[effect_rows], targets[:, trainable]
+            )
+            models["effect_labels"] = [THERAPY_EFFECTS[j] for j in trainable]
+    return models
+
+
+def therapy_probabilities(models: dict, embeddings: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """(향수일 확률 (N,), 효능별 확률 (N, len(effect_labels))). 학습되지 않은 쪽은 None"""
+    category_model, effects_model = models.get("category"), models.get("effects")
+    perfume_probability = None
+    if category_model is not None:
+        perfume_column = list(category_model.classes_).index(PERFUME_CATEGORY_ID)
+        perfume_probability = category_model.predict_proba(embeddings)[:, perfume_column]
+    effect_probabilities = effects_model.predict_proba(embeddings) if effects_model is not None else None
+    return perfume_probability, effect_probabilities
+
+
+class TherapyClassifier:
+    """
+    테라피 추천 앞단의 로컬 카테고리/효능 분류기
+
+    - 사용자 입력 문장 임베딩 한 번으로 카테고리(1: 향수, 2: 디퓨저)와 효능(1~6, 다중 라벨)을 함께 예측합니다.
+    - 카테고리와 효능은 각각 따로 확신 여부를 판단하며, 확신하지 못한 쪽만 GPT로 분류합니다.
+      둘 다 GPT가 필요하면 두 호출을 동시에 보내 왕복 시간을 한 번으로 줄입니다.
+    - GPT 분류 결과는 {INTENT_LOG_DIR}/therapy.jsonl에 기록되며 train_therapy_classifier.py의 학습 데이터가 됩니다.
+    """
+
+    task = "therapy"
+
+    def __init__(self, threshold: Optional[float] = None, model_dir: Optional[str] = None, log_dir: Optional[str] = None):
+        self.threshold = threshold if threshold is not None else THERAPY_CONFIDENCE_THRESHOLD
+        self.model_path = os.path.join(model_dir or INTENT_MODEL_DIR, f"{self.task}.joblib")
+        self.log_path = os.path.join(log_dir or INTENT_LOG_DIR, f"{self.task}.jsonl")
+        self.models: dict = {}
+        self.metadata: dict = {}
+        self.stats = {
+            "local_category": 0, "local_effects": 0, "gpt_category": 0, "gpt_effects": 0, "gpt_unparsed": 0,
+            "local_seconds": 0.0, "gpt_seconds": 0.0,
+        }
+        self._log_lock = threading.Lock()
+        self.load()
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.models.get("category") or self.models.get("effects"))
+
+    def load(self) -> None:
+        if joblib is None or not os.path.exists(self.model_path):
+            return
+        try:
+            bundle = joblib.load(self.model_path)
+        except Exception as e:
+            logger.warning(f"⚠️ 테라피 분류기 로드 실패 ({self.model_path}): {e}")
+            return
+        if bundle.get("embedding_model") != KLUE_MODEL_NAME:
+            logger.warning(f"⚠️ 테라피 분류기 임베딩 모델 불일치 ({bundle.get('embedding_model')}), GPT 분류 사용")
+            return
+        self.models = bundle["models"]
+        self.metadata = {key: value for key, value in bundle.items() if key != "models"}
+        logger.info(f"✅ 테라피 분류기 로드 완료 (학습 샘플 {self.metadata.get('samples')}개)")
+
+    def save(self, models: dict, samples: int, metrics: Optional[dict] = None) -> None:
+        os.makedirs(os.path.dirname(self.model_path) or ".", exist_ok=True)
+        bundle = {
+            "models": models,
+            "embedding_model": KLUE_MODEL_NAME,
+            "task": self.task,
+            "samples": samples,
+            "metrics": metrics or {},
+            "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        joblib.dump(bundle, self.model_path)
+        self.models = models
+        self.metadata = {key: value for key, value in bundle.items() if key != "models"}
+
+    def predict(self, user_input: str) -> Tuple[Optional[int], Optional[List[int]]]:
+        """로컬 예측 (category_id, 효능 목록). 확신하지 못한 쪽은 None"""
+        if not LOCAL_INTENT_ENABLED or not self.loaded:
+            return None, None
+        perfume_probability, effect_probabilities = therapy_probabilities(self.models, embed_texts([user_input]))
+        low = 1 - self.threshold
+
+        category_id = None
+        if perfume_probability is not None:
+            probability = float(perfume_probability[0])
+            if probability >= self.threshold:
+                category_id = PERFUME_CATEGORY_ID
+            elif probability <= low:
+                category_id = DIFFUSER_CATEGORY_ID
+
+        effects = None
+        if effect_probabilities is not None:
+            probabilities = effect_probabilities[0]
+            # 모든 효능이 확실히 양성/음성이고, 적어도 하나는 양성이어야 로컬 결과 사용
+            if all(p >= self.threshold or p <= low for p in probabilities) and (probabilities >= self.threshold).any():
+                effects = [label for label, p in zip(self.models["effect_labels"], probabilities) if p >= self.threshold]
+        return category_id, effects
+
+    def log(self, user_input: str, category_id: Optional[int], effects: Optional[List[int]]) -> None:
+        if not INTENT_LOG_ENABLED:
+            return
+        record = {"user_input": user_input, "category_id": category_id, "effects": effects, "logged_at": time.time()}
+        try:
+            with self._log_lock:
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning(f"⚠️ 테라피 분류 로그 저장 실패: {e}")
+
+    def classify(
+        self,
+        user_input: str,
+        gpt_category: Callable[[], Optional[int]],
+        gpt_effects: Callable[[], Optional[List[int]]],
+    ) -> Tuple[int, List[int]]:
+        """
+        (category_id, 효능 목록) 반환
+
+        로컬 분류기가 확신하지 못한 쪽만 GPT(gpt_category/gpt_effects)로 분류하며, 둘 다 필요하면 동시에 호출합니다.
+        GPT 응답을 해석하지 못한 쪽(None)은 기본값(DEFAULT_CATEGORY_ID, DEFAULT_EFFECTS)을 쓰고 학습 로그에는 남기지 않습니다.
+        """
+        started = time.perf_counter()
+        try:
+            category_id, effects = self.predict(user_input)
+        except Exception as e:
+            logger.warning(f"⚠️ 로컬 테라피 분류 실패, GPT 사용: {e}")
+            category_id, effects = None, None
+        self.stats["local_seconds"] += time.perf_counter() - started
+        self.stats["local_category"] += category_id is not None
+        self.stats["local_effects"] += effects is not None
+        if category_id is not None or effects is not None:
+            logger.info(f"⚡ 로컬 테라피 분류: 카테고리 {category_id}, 효능 {effects}")
+        if category_id is not None and effects is not None:
+            return category_id, effects
+
+        started = time.perf_counter()
+        gpt_category_id, gpt_effect_list = None, None
+        if category_id is None and effects is None:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                category_future = executor.submit(gpt_category)
+                gpt_effect_list = gpt_effects()
+                gpt_category_id = category_future.result()
+        elif category_id is None:
+            gpt_category_id = gpt_category()
+        else:
+            gpt_effect_list = gpt_effects()
+        self.stats["gpt_seconds"] += time.perf_counter() - started
+        self.stats["gpt_category"] += category_id is None
+        self.stats["gpt_effects"] += effects is None
+        self.stats["gpt_unparsed"] += (category_id is None and gpt_category_id is None) + (effects is None and gpt_effect_list is None)
+
+        # GPT 응답을 해석한 쪽만 학습 데이터로 기록 (로컬 예측과 기본값은 기록하지 않음)
+        if gpt_category_id is not None or gpt_effect_list is not None:
+            self.log(user_input, gpt_category_id, gpt_effect_list)
+        if category_id is None:
+            category_id = gpt_category_id if gpt_category_id is not None else DEFAULT_CATEGORY_ID
+        if effects is None:
+            effects = gpt_effect_list if gpt_effect_list is not None else list(DEFAULT_EFFECTS)
+        return category_id, effects
+
+    def snapshot(self) -> dict:
+        stats = dict(self.stats)
+        local_calls = stats["local_category"] + stats["local_effects"]
+        total = local_calls + stats["gpt_category"] + stats["gpt_effects"]
+        return {
+            "loaded": self.loaded,
+            "threshold": self.threshold,
+            "local_ratio": round(local_calls / total, 3) if total else 0.0,
+            "calls": {key: stats[key] for key in ("local_category", "local_effects", "gpt_category", "gpt_effects", "gpt_unparsed")},
+            "local_seconds": round(stats["local_seconds"], 3),
+            "gpt_seconds": round(stats["gpt_seconds"], 3),
+            **{key: value for key, value in self.metadata.items() if key in ("samples", "trained_at", "metrics")},
+        }
+
+
+therapy_classifier = TherapyClassifier()
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from services import diffuser_index as diffuser_index_module
+from services.diffuser_index import DiffuserIndex, load_diffuser_index, refresh_diffuser_index
+
+
+def diffuser(id_: int, name: str, brand: str = "브랜드") -> dict:
+    return {"id": id_, "name_kr": name, "name_en": name, "brand": brand, "category_id": 2}
+
+
+@pytest.fixture
+def embedded(monkeypatch):
+    """KLUE 모델 대신 문서마다 고정된 임베딩을 만들고 임베딩한 문서를 기록"""
+    documents = []
+
+    def embed_texts(texts, batch_size=None):
+        documents.extend(texts)
+        return np.stack([np.random.default_rng(abs(hash(text)) % 2**32).normal(size=8) for text in texts]).astype(np.float32)
+
+    monkeypatch.setattr(diffuser_index_module, "embed_texts", embed_texts)
+    monkeypatch.setattr(diffuser_index_module, "diffuser_index", DiffuserIndex(query_cache_size=0))
+    return documents
+
+
+@pytest.fixture
+def memory_store(monkeypatch, embedded):
+    monkeypatch.setattr(diffuser_index_module, "DIFFUSER_VECTOR_STORE", "memory")
+    return embedded
+
+
+def test_reload_embeds_only_changed_diffusers(memory_store):
+    descriptions = {1: "시트러스", 2: "우디", 3: "플로럴"}
+    index = load_diffuser_index([diffuser(1, "A"), diffuser(2, "B"), diffuser(3, "C")], descriptions)
+    before = index.search_embedding(index._state[1][0], k=1)
+    memory_store.clear()
+
+    index = load_diffuser_index([diffuser(1, "A"), diffuser(2, "B2"), diffuser(4, "D")], {**descriptions, 4: "머스크"})
+
+    assert [document.split("\n")[1] for document in memory_store] == ["B2 (B2)", "D (D)"]
+    assert sorted(metadata["id"] for metadata in index._state[0]) == [1, 2, 4]
+    assert index.search_embedding(index._state[1][0], k=1)[0]["id"] == before[0]["id"] == 1
+
+
+def test_refresh_requires_loaded_index(memory_store):
+    assert refresh_diffuser_index() is None
+    assert memory_store == []
+
+
+def test_follower_reads_chroma_without_writing(monkeypatch, tmp_path, embedded):
+    chromadb = pytest.importorskip("chromadb")
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    monkeypatch.setattr(diffuser_index_module, "DIFFUSER_VECTOR_STORE", "chroma")
+    monkeypatch.setattr(diffuser_index_module, "chroma_client", client)
+    diffusers, descriptions = [diffuser(1, "A"), diffuser(2, "B")], {1: "시트러스", 2: "우디"}
+
+    # leader: Chroma 동기화 후 인덱스 구성
+    load_diffuser_index(diffusers, descriptions)
+    assert len(embedded) == 2
+
+    # follower: 새 프로세스(빈 메모리 인덱스)에서 Chroma 임베딩을 재사용하고 새 디퓨저만 로컬에서 임베딩
+    embedded.clear()
+    monkeypatch.setattr(diffuser_index_module, "diffuser_index", DiffuserIndex(query_cache_size=0))
+    index = load_diffuser_index(diffusers + [diffuser(3, "C")], {**descriptions, 3: "플로럴"}, sync_store=False)
+
+    assert len(index) == 3
+    assert [document.split("\n")[1] for document in embedded] == ["C (C)"]
+    assert sorted(diffuser_index_module.get_diffuser_collection().get()["ids"]) == ["1", "2"]
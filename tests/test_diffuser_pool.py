@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+
+for required in ("openai", "sqlalchemy", "langchain_openai"):
+    pytest.importorskip(required)
+
+from services.diffuser_pool import DiffuserRecommendationPool
+from services.diffuser_service import THERAPY_TITLES
+
+
+class FakeDBService:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.closed = False
+
+    def get_diffusers_by_spice_ids(self, spice_ids, category_id):
+        if self.fail:
+            raise RuntimeError("mysql down")
+        return [{"id": spice_id, "name_kr": f"디퓨저{spice_id}", "brand": "브랜드", "content": ""} for spice_id in spice_ids]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeDiffuserService:
+    """GPT/MySQL 대신 고정된 향료 조합과 디퓨저를 반환하는 서비스"""
+
+    def __init__(self, fail: bool = False):
+        self.db_service = FakeDBService(fail)
+
+    async def get_recommended_notes(self, category):
+        return ["라벤더", "베르가못"]
+
+    async def get_usage_routine(self, category):
+        return f"{category} 루틴"
+
+    async def get_spices(self, notes):
+        return [{"id": 1}, {"id": 2}]
+
+
+@pytest.fixture
+def services():
+    created = []
+
+    def factory(fail: bool = False):
+        created.append(FakeDiffuserService(fail))
+        return created[-1]
+
+    return created, factory
+
+
+def test_each_round_closes_its_db_service(tmp_path, services):
+    created, factory = services
+    pool = DiffuserRecommendationPool(size=1, refresh_seconds=0, path=str(tmp_path / "pool.json"))
+
+    asyncio.run(pool.refresh(factory))
+    asyncio.run(pool.refresh(factory, rotate=True))
+
+    assert len(created) == 2
+    assert all(service.db_service.closed for service in created)
+    assert all(pool.sample(category) is not None for category in THERAPY_TITLES)
+
+
+def test_db_service_is_closed_when_round_fails(tmp_path, services, monkeypatch):
+    created, factory = services
+    pool = DiffuserRecommendationPool(size=1, refresh_seconds=0, path=str(tmp_path / "pool.json"))
+
+    def save():
+        raise OSError("disk full")
+
+    monkeypatch.setattr(pool, "save", save)
+
+    with pytest.raises(OSError):
+        asyncio.run(pool.refresh(lambda: factory(fail=True)))
+    assert created[0].db_service.closed
+    assert pool.stats["build_failures"] == len(THERAPY_TITLES)
@@ -0,0 +1,182 @@
+import io
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pytest
+from PIL import Image
+from services.embedding_backend import EmbeddingBackend, LocalEmbeddingBackend
+
+
+def png(color: str) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 4), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class ImageServer:
+    """경로별 (이미지 바이트, 응답 헤더)를 돌려주는 로컬 이미지 서버"""
+
+    def __init__(self):
+        self.images = {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def send_image(self, with_body: bool):
+                data, headers = server.images[self.path]
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if with_body:
+                    self.wfile.write(data)
+
+            def do_HEAD(self):
+                self.send_image(with_body=False)
+
+            def do_GET(self):
+                self.send_image(with_body=True)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def image_server():
+    server = ImageServer()
+    yield server
+    server.close()
+
+
+class FakeBackend(EmbeddingBackend):
+    """계산한 URL을 기록하고 호출 순서대로 다른 임베딩을 반환하는 백엔드"""
+
+    name = "fake"
+
+    def __init__(self, cache_dir: str):
+        super().__init__(cache_dir)
+        self.computed = []
+
+    async def _embed_catalog(self, product_image_data):
+        results = []
+        for item in product_image_data:
+            self.computed.append(item["url"])
+            results.append({**item, "status": "success", "embedding": [float(len(self.computed))]})
+        return results, 0
+
+    async def _embed_query(self, image_bytes):
+        self.computed.append(image_bytes)
+        return [float(len(self.computed))]
+
+
+def item(url: str) -> dict:
+    return {"id": 1, "url": url, "product_id": 1}
+
+
+def test_catalog_cache_is_invalidated_when_etag_changes(tmp_path, image_server):
+    backend = FakeBackend(str(tmp_path))
+    url = image_server.url + "/a.png"
+    image_server.images["/a.png"] = (png("red"), {"ETag": '"v1"'})
+
+    first, _ = asyncio.run(backend.embed_catalog([item(url)]))
+    cached, _ = asyncio.run(backend.embed_catalog([item(url)]))
+    assert backend.computed == [url]
+    assert list(cached[0]["embedding"]) == list(first[0]["embedding"])
+
+    # 같은 URL이지만 이미지가 교체됨
+    image_server.images["/a.png"] = (png("blue"), {"ETag": '"v2"'})
+    updated, _ = asyncio.run(backend.embed_catalog([item(url)]))
+
+    assert backend.computed == [url, url]
+    assert list(updated[0]["embedding"]) != list(first[0]["embedding"])
+
+
+def test_catalog_cache_uses_last_modified_without_etag(tmp_path, image_server):
+    backend = FakeBackend(str(tmp_path))
+    url = image_server.url + "/a.png"
+    image_server.images["/a.png"] = (png("red"), {"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+    asyncio.run(backend.embed_catalog([item(url)]))
+    asyncio.run(backend.embed_catalog([item(url)]))
+    assert backend.computed == [url]
+
+    image_server.images["/a.png"] = (png("blue"), {"Last-Modified": "Tue, 02 Jan 2024 00:00:00 GMT"})
+    asyncio.run(backend.embed_catalog([item(url)]))
+    assert backend.computed == [url, url]
+
+
+def test_catalog_url_without_validator_is_not_cached(tmp_path, image_server):
+    backend = FakeBackend(str(tmp_path))
+    url = image_server.url + "/a.png"
+    image_server.images["/a.png"] = (png("red"), {})
+
+    asyncio.run(backend.embed_catalog([item(url)]))
+    asyncio.run(backend.embed_catalog([item(url)]))
+
+    assert backend.computed == [url, url]
+
+
+def test_local_backend_reuses_embedding_for_same_image_bytes(tmp_path, image_server, monkeypatch):
+    backend = LocalEmbeddingBackend(model_path="fake-model", cache_dir=str(tmp_path))
+    inferred = []
+
+    def embed_images(images):
+        inferred.extend(images)
+        return np.stack([np.asarray(image, dtype=np.float32).mean(axis=(0, 1)) for image in images])
+
+    monkeypatch.setattr(backend, "embed_images", embed_images)
+    image_server.images["/a.png"] = (png("red"), {})
+    image_server.images["/b.png"] = (png("red"), {})  # 검증값 없이 다른 URL로 같은 이미지
+    image_server.images["/c.png"] = (png("blue"), {})
+
+    asyncio.run(backend.embed_catalog([item(image_server.url + "/a.png")]))
+    results, _ = asyncio.run(backend.embed_catalog([item(image_server.url + path) for path in ("/b.png", "/c.png")]))
+
+    assert len(inferred) == 2  # a, c만 추론
+    assert [result["status"] for result in results] == ["success", "success"]
+    assert sorted(list(result["embedding"]) for result in results) == [[0.0, 0.0, 255.0], [255.0, 0.0, 0.0]]
+
+
+def test_backend_must_implement_embedding_methods(tmp_path):
+    class CatalogOnly(EmbeddingBackend):
+        async def _embed_catalog(self, product_image_data):
+            return [], 0
+
+    with pytest.raises(TypeError):
+        CatalogOnly(str(tmp_path))
+
+
+def test_query_embeddings_are_kept_in_memory_only(tmp_path, monkeypatch):
+    monkeypatch.setenv("SCENTLENS_QUERY_EMBEDDING_CACHE_SIZE", "2")
+    backend = FakeBackend(str(tmp_path))
+
+    first = asyncio.run(backend.embed_query(b"a"))
+    assert asyncio.run(backend.embed_query(b"a")) == first
+    asyncio.run(backend.embed_query(b"b"))
+    asyncio.run(backend.embed_query(b"c"))  # 가장 오래된 a는 메모리 캐시에서 제거
+    asyncio.run(backend.embed_query(b"a"))
+
+    assert backend.computed == [b"a", b"b", b"c", b"a"]
+    assert list(tmp_path.iterdir()) == []  # 사용자 업로드는 디스크에 쓰지 않음
+
+
+def test_catalog_cache_is_bounded(tmp_path, image_server, monkeypatch):
+    monkeypatch.setenv("SCENTLENS_EMBEDDING_CACHE_MAX_FILES", "2")
+    backend = FakeBackend(str(tmp_path))
+    for name in ("a", "b", "c"):
+        image_server.images[f"/{name}.png"] = (png("red"), {"ETag": f'"{name}"'})
+
+    results, _ = asyncio.run(backend.embed_catalog([item(f"{image_server.url}/{name}.png") for name in "abc"]))
+
+    assert len(results) == 3
+    assert len(list(tmp_path.glob("embedding_*.npy"))) == 2
@@ -0,0 +1,75 @@
+import os
+import threading
+from services.image_cache import DiskImageCache, content_key
+
+
+def test_evict_keeps_legacy_files_with_same_prefix(tmp_path):
+    legacy = tmp_path / "generated_image_20250101_120000.jpeg"
+    legacy.write_bytes(b"x" * 100)
+    os.utime(legacy, (0, 0))  # 가장 오래된 파일이어도 캐시가 만든 파일이 아니면 삭제하지 않음
+    cache = DiskImageCache(str(tmp_path), prefix="generated_image_", max_files=1)
+
+    first = cache.put(content_key("first"), "jpeg", b"1")
+    os.utime(first, (1, 1))
+    second = cache.put(content_key("second"), "jpeg", b"2")
+
+    assert legacy.exists()
+    assert not first.exists()
+    assert second.exists()
+
+
+def test_evict_counts_only_managed_bytes(tmp_path):
+    (tmp_path / "generated_image_legacy.jpeg").write_bytes(b"x" * 1000)
+    cache = DiskImageCache(str(tmp_path), prefix="generated_image_", max_bytes=10)
+
+    path = cache.put(content_key("prompt"), "jpeg", b"12345")
+
+    assert path.exists()
+    assert (tmp_path / "generated_image_legacy.jpeg").exists()
+
+
+def test_is_managed(tmp_path):
+    cache = DiskImageCache(str(tmp_path), prefix="generated_image_")
+    key = content_key("prompt")
+
+    assert cache.is_managed(f"generated_image_{key}.jpeg")
+    assert not cache.is_managed("generated_image_20250101_120000.jpeg")
+    assert not cache.is_managed(f".generated_image_{key}.jpeg.abc.tmp")
+    assert not cache.is_managed(f"variant_{key}.webp")
+
+
+def test_get_touches_and_evicts_least_recently_used(tmp_path):
+    cache = DiskImageCache(str(tmp_path), prefix="variant_", max_files=2)
+    old = cache.put(content_key("old"), "webp", b"1")
+    new = cache.put(content_key("new"), "webp", b"2")
+    os.utime(old, (1, 1))
+    os.utime(new, (2, 2))
+
+    assert cache.get(content_key("old"), "webp") == old  # 최근 사용으로 갱신
+    cache.put(content_key("newest"), "webp", b"3")
+
+    assert old.exists()
+    assert not new.exists()
+
+
+def test_get_or_create_calls_producer_once_for_concurrent_requests(tmp_path):
+    cache = DiskImageCache(str(tmp_path), prefix="generated_image_")
+    started, release, calls, results = threading.Event(), threading.Event(), [], []
+
+    def producer():
+        calls.append(True)
+        started.set()
+        release.wait(timeout=5)
+        return b"image"
+
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_create(content_key("p"), "jpeg", producer)))
+    leader.start()
+    started.wait(timeout=5)
+    follower = threading.Thread(target=lambda: results.append(cache.get_or_create(content_key("p"), "jpeg", producer)))
+    follower.start()
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert calls == [True]
+    assert sorted(created for _, created in results) == [False, True]
@@ -0,0 +1,179 @@
+import os
+import time
+import threading
+from types import SimpleNamespace
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from services import image_job_service as image_job_module
+from services.image_job_service import JOB_COMPLETED, JOB_FAILED, JOB_PENDING, JOB_RUNNING, ImageJobService
+
+
+class FakeImageService:
+    """Stability 호출 대신 failures번 실패한 뒤 image_folder에 파일을 쓰는 가짜 이미지 생성 서비스"""
+
+    def __init__(self, image_folder: str, failures: int = 0, release: threading.Event = None):
+        self.image_folder = image_folder
+        self.failures = failures
+        self.release = release
+        self.prompts = []
+
+    def generate_image(self, prompt: str) -> dict:
+        if self.release is not None:
+            self.release.wait(timeout=5)
+        self.prompts.append(prompt)
+        if len(self.prompts) <= self.failures:
+            raise RuntimeError(f"stability error {len(self.prompts)}")
+        output_path = os.path.join(self.image_folder, f"generated_image_{len(self.prompts)}.jpeg")
+        with open(output_path, "wb") as f:
+            f.write(b"jpeg")
+        return {"output_path": output_path}
+
+
+def wait_for_status(get_job, job_id: str, status: str, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = get_job(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"{job_id}: {get_job(job_id)['status']} != {status}")
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """재시도 대기 시간을 기록하고 실제로는 기다리지 않음"""
+    delays = []
+    monkeypatch.setattr(image_job_module, "time", SimpleNamespace(sleep=delays.append, time=time.time))
+    monkeypatch.setattr(image_job_module.random, "random", lambda: 0.0)
+    return delays
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setenv("STABILITY_API_KEY", "test-key")
+    monkeypatch.setenv("IMAGE_FOLDER", str(tmp_path / "generated_images"))
+    from routers import image_generation_router
+
+    release = threading.Event()
+    image_service = FakeImageService(str(tmp_path), release=release)
+    jobs = ImageJobService(lambda: image_service, max_workers=1, max_retries=0, backoff_seconds=0.0, job_dir=str(tmp_path / "jobs"))
+    monkeypatch.setattr(image_generation_router, "image_job_service", jobs)
+
+    app = FastAPI()
+    app.include_router(image_generation_router.router, prefix="/image-generation")
+    with TestClient(app) as test_client:
+        yield test_client, jobs, release
+    release.set()
+
+
+def test_job_status_transitions_through_router(client, tmp_path):
+    test_client, jobs, release = client
+    get_job = lambda job_id: test_client.get(f"/image-generation/jobs/{job_id}").json()
+
+    first = jobs.submit(lambda: "first prompt")
+    second = jobs.submit(lambda: "second prompt")
+
+    # 워커가 하나이므로 첫 작업이 이미지 생성 중인 동안 두 번째 작업은 대기
+    wait_for_status(get_job, first, JOB_RUNNING)
+    assert get_job(second)["status"] == JOB_PENDING
+
+    release.set()
+    completed = wait_for_status(get_job, first, JOB_COMPLETED)
+    assert completed["attempts"] == 1
+    assert completed["error"] is None
+    assert completed["image_path"] == os.path.join(str(tmp_path), "generated_image_1.jpeg")
+    assert wait_for_status(get_job, second, JOB_COMPLETED)["image_path"].endswith("generated_image_2.jpeg")
+
+
+def test_unknown_job_returns_404(client):
+    test_client, _, _ = client
+
+    assert test_client.get("/image-generation/jobs/missing").status_code == 404
+
+
+def test_retries_with_exponential_backoff(sleeps, tmp_path):
+    image_service = FakeImageService(str(tmp_path), failures=2)
+    jobs = ImageJobService(lambda: image_service, max_workers=1, max_retries=3, backoff_seconds=0.5, job_dir=str(tmp_path / "jobs"))
+
+    job = wait_for_status(jobs.get_job, jobs.submit(lambda: "prompt"), JOB_COMPLETED)
+
+    assert job["attempts"] == 3
+    assert sleeps == [0.5, 1.0]
+    assert image_service.prompts == ["prompt"] * 3
+
+
+def test_job_fails_after_max_retries(sleeps, tmp_path):
+    image_service = FakeImageService(str(tmp_path), failures=10)
+    jobs = ImageJobService(lambda: image_service, max_workers=1, max_retries=2, backoff_seconds=1.0, job_dir=str(tmp_path / "jobs"))
+
+    job = wait_for_status(jobs.get_job, jobs.submit(lambda: "prompt"), JOB_FAILED)
+
+    assert job["attempts"] == 3
+    assert job["error"] == "stability error 3"
+    assert job["image_path"] is None
+    assert sleeps == [1.0, 2.0]
+
+
+def test_prompt_failure_marks_job_failed_without_calling_backend(tmp_path):
+    image_service = FakeImageService(str(tmp_path))
+    jobs = ImageJobService(lambda: image_service, max_workers=1, max_retries=3, backoff_seconds=0.0, job_dir=str(tmp_path / "jobs"))
+
+    def build_prompt():
+        raise ValueError("translation failed")
+
+    job = wait_for_status(jobs.get_job, jobs.submit(build_prompt), JOB_FAILED)
+
+    assert job["error"] == "translation failed"
+    assert image_service.prompts == []
+
+
+def test_product_response_includes_image_job(tmp_path):
+    for module in ("langgraph", "sqlalchemy", "pymongo", "openai"):
+        pytest.importorskip(module)
+    from services.product_service import ProductService
+
+    image_service = FakeImageService(str(tmp_path))
+    product_service = ProductService.__new__(ProductService)
+    product_service.image_job_service = ImageJobService(lambda: image_service, max_workers=1, max_retries=0, job_dir=str(tmp_path / "jobs"))
+    product_service.build_image_prompt = lambda content, recommendations: f"{content} / {recommendations[0]['name']}"
+    state = {"response": {"content": "상쾌한 시트러스", "recommendations": [{"name": "향수 A"}]}}
+
+    state = product_service.image_generator(state)
+
+    response = state["response"]
+    assert response["image_status"] == JOB_PENDING
+    assert state["image_job_id"] == response["image_job_id"]
+    assert state["next_node"] == "end"
+    wait_for_status(product_service.image_job_service.get_job, response["image_job_id"], JOB_COMPLETED)
+    assert image_service.prompts == ["상쾌한 시트러스 / 향수 A"]
+
+
+def test_job_is_readable_from_another_store(tmp_path):
+    # pre-fork 배포: 작업을 등록한 워커와 다른 워커(별도 ImageJobService)가 같은 작업 디렉터리에서 상태 조회
+    release = threading.Event()
+    image_service = FakeImageService(str(tmp_path), release=release)
+    submitter = ImageJobService(lambda: image_service, max_workers=1, max_retries=0, job_dir=str(tmp_path / "jobs"))
+    reader = ImageJobService(lambda: image_service, max_workers=1, max_retries=0, job_dir=str(tmp_path / "jobs"))
+
+    job_id = submitter.submit(lambda: "prompt")
+
+    wait_for_status(reader.get_job, job_id, JOB_RUNNING)
+    release.set()
+    job = wait_for_status(reader.get_job, job_id, JOB_COMPLETED)
+    assert job == submitter.get_job(job_id)
+    assert job["image_path"].endswith("generated_image_1.jpeg")
+    assert reader.get_job("0" * 32) is None
+    assert reader.get_job("../jobs") is None
+
+
+def test_evicted_jobs_are_removed_from_shared_storage(tmp_path):
+    image_service = FakeImageService(str(tmp_path))
+    jobs = ImageJobService(lambda: image_service, max_workers=1, max_retries=0, max_jobs=1, job_dir=str(tmp_path / "jobs"))
+
+    first = wait_for_status(jobs.get_job, jobs.submit(lambda: "first"), JOB_COMPLETED)["job_id"]
+    second = jobs.submit(lambda: "second")
+
+    assert jobs.get_job(first) is None
+    assert not os.path.exists(tmp_path / "jobs" / f"{first}.json")
+    assert wait_for_status(jobs.get_job, second, JOB_COMPLETED)["job_id"] == second
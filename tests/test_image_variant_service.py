@@ -0,0 +1,27 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+from services.image_variant_service import ImageVariantService
+
+
+@pytest.fixture
+def variant_service(monkeypatch, tmp_path):
+    monkeypatch.setenv("IMAGE_FOLDER", str(tmp_path))
+    Image.new("RGB", (8, 8), "red").save(tmp_path / "source.png")
+    return ImageVariantService()
+
+
+@pytest.mark.parametrize("quality", [0, -1, 101])
+def test_out_of_range_quality_is_rejected(variant_service, quality):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(variant_service.get_variant("/static/source.png", width=4, image_format="jpeg", quality=quality))
+
+    assert error.value.status_code == 400
+
+
+def test_default_quality_is_used_when_not_given(variant_service, tmp_path):
+    response = asyncio.run(variant_service.get_variant("/static/source.png", width=4, image_format="jpeg"))
+
+    assert response.status_code == 200
+    assert len(list((tmp_path / "variants").glob("variant_*.jpeg"))) == 1
@@ -0,0 +1,48 @@
+import json
+import pytest
+from services.intent_classifier import IntentClassifier, parse_intent
+
+
+def logged(classifier) -> list:
+    try:
+        with open(classifier.log_path, "r", encoding="utf-8") as f:
+            return [json.loads(line)["intent"] for line in f]
+    except FileNotFoundError:
+        return []
+
+
+@pytest.fixture
+def classifier(tmp_path):
+    # 모델이 없으므로 항상 GPT 분류 사용
+    return IntentClassifier("chat_intent", labels=("1", "3", "4", "5"), default_label="2", model_dir=str(tmp_path), log_dir=str(tmp_path))
+
+
+@pytest.mark.parametrize(
+    "response, intent",
+    [("1", "1"), ("(3) 패션 향수 추천", "3"), ("2", "2"), ("일반 대화입니다", None), ("", None)],
+)
+def test_parse_intent(response, intent):
+    assert parse_intent(response, ("1", "3", "4", "5"), "2") == intent
+
+
+def test_logs_parsed_gpt_intents(classifier):
+    assert classifier.classify("향수 추천해줘", None, lambda: " 1 ") == "1"
+    assert classifier.classify("안녕", None, lambda: "2") == "2"
+
+    assert logged(classifier) == ["1", "2"]
+
+
+def test_unparsed_gpt_answer_falls_back_without_logging(classifier):
+    assert classifier.classify("안녕", None, lambda: "잘 모르겠어요") == "2"
+
+    assert logged(classifier) == []
+    assert classifier.snapshot()["calls"] == {"local": 0, "gpt": 1, "gpt_unparsed": 1}
+
+
+def test_gpt_errors_are_not_logged(classifier):
+    def gpt_classify():
+        raise RuntimeError("openai down")
+
+    with pytest.raises(RuntimeError):
+        classifier.classify("안녕", None, gpt_classify)
+    assert logged(classifier) == []
@@ -0,0 +1,65 @@
+import asyncio
+import importlib
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from services.readiness import ReadinessRegistry, readiness
+
+
+def start_and_wait(registry: ReadinessRegistry, name: str) -> bool:
+    async def main():
+        registry.start()
+        return await registry.wait(name)
+
+    return asyncio.run(main())
+
+
+def test_require_rejects_before_building_route_dependencies():
+    registry = ReadinessRegistry()
+    registry.register("vector_db", lambda: None)
+    built = []
+
+    def get_service():
+        built.append(True)
+        return "service"
+
+    router = APIRouter()
+
+    @router.post("/recommend", dependencies=[Depends(registry.require("vector_db"))])
+    async def recommend(service: str = Depends(get_service)):
+        return {"service": service}
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    response = client.post("/recommend")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "10"
+    assert response.json()["detail"]["subsystems"] == {"vector_db": "pending"}
+    assert built == []  # 서비스(LLMService 등)는 준비되기 전에 생성하지 않음
+
+    assert start_and_wait(registry, "vector_db")
+    assert client.post("/recommend").json() == {"service": "service"}
+    assert built == [True]
+
+
+@pytest.mark.parametrize(
+    "module_name, path, required_modules",
+    [
+        ("routers.llm_router", "/process-input", ("sqlalchemy", "openai", "langgraph")),
+        ("routers.product_router", "/recommend", ("sqlalchemy", "openai", "langgraph", "pymongo")),
+    ],
+)
+def test_vector_db_routes_require_readiness(monkeypatch, module_name, path, required_modules):
+    for required in required_modules:
+        pytest.importorskip(required)
+    module = importlib.import_module(module_name)
+    monkeypatch.setattr(readiness, "is_ready", lambda name: name != "vector_db")
+
+    app = FastAPI()
+    app.include_router(module.router)
+    response = TestClient(app).post(path, json={"user_input": "숙면에 좋은 향"})
+
+    assert response.status_code == 503
+    assert response.json()["detail"]["subsystems"] == {"vector_db": "pending"}
@@ -0,0 +1,229 @@
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from services.scentlens_client import CircuitOpenError, ScentlensClient, ScentlensClientError
+
+
+class StubServer:
+    """
+    scentlens 서버를 흉내 내는 로컬 HTTP 서버
+
+    경로별로 등록한 응답을 순서대로 돌려주며(마지막 응답은 계속 반복), 응답은 (상태 코드, 본문) 또는
+    요청 본문을 받아 (상태 코드, 본문)을 반환하는 함수입니다.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.delay = 0.0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stub._lock:
+                    stub.requests.append(self.path)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    responses = stub.routes.get(self.path, [(404, {})])
+                    response = responses.pop(0) if len(responses) > 1 else responses[0]
+                try:
+                    time.sleep(stub.delay)
+                    status, payload = response(json.loads(body)) if callable(response) else response
+                    data = json.dumps(payload).encode()
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def count(self, path: str) -> int:
+        return self.requests.count(path)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def server():
+    stub = StubServer()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def make_client(monkeypatch):
+    monkeypatch.setenv("SCENTLENS_RETRY_BACKOFF_SECONDS", "0")
+    monkeypatch.setenv("SCENTLENS_TIMEOUT", "2")
+
+    def make(url: str, **settings) -> ScentlensClient:
+        for name, value in settings.items():
+            monkeypatch.setenv(f"SCENTLENS_{name.upper()}", str(value))
+        return ScentlensClient(url)
+
+    return make
+
+
+def run(coroutine_function, client: ScentlensClient):
+    """이벤트 루프마다 httpx 클라이언트를 새로 만들고 닫음"""
+
+    async def main():
+        try:
+            return await coroutine_function()
+        finally:
+            await client.aclose()
+
+    return asyncio.run(main())
+
+
+EMBEDDING_PATH = "/compute_embedding_of_uploaded_file/"
+
+
+def test_retries_retryable_status_then_succeeds(server, make_client):
+    server.routes[EMBEDDING_PATH] = [(503, {}), (502, {}), (200, {"embedding": [0.1, 0.2]})]
+    client = make_client(server.url, max_retries=3)
+
+    assert run(lambda: client.compute_embedding(b"image"), client) == [0.1, 0.2]
+    assert server.count(EMBEDDING_PATH) == 3
+    assert client.breaker.state == "closed"
+
+
+def test_client_error_is_not_retried(server, make_client):
+    server.routes[EMBEDDING_PATH] = [(400, {"detail": "bad image"})]
+    client = make_client(server.url, max_retries=3)
+
+    with pytest.raises(ScentlensClientError, match="Status code: 400"):
+        run(lambda: client.compute_embedding(b"image"), client)
+    assert server.count(EMBEDDING_PATH) == 1
+    assert client.breaker.failures == 0
+
+
+def test_breaker_opens_after_consecutive_failures(server, make_client):
+    server.routes[EMBEDDING_PATH] = [(500, {})]
+    client = make_client(server.url, max_retries=1, circuit_failure_threshold=2, circuit_reset_seconds=60)
+
+    async def calls():
+        for _ in range(2):
+            with pytest.raises(ScentlensClientError, match="failed after 2 attempts"):
+                await client.compute_embedding(b"image")
+        with pytest.raises(CircuitOpenError):
+            await client.compute_embedding(b"image")
+
+    run(calls, client)
+    assert server.count(EMBEDDING_PATH) == 4  # 차단된 세 번째 호출은 서버에 도달하지 않음
+    assert client.breaker.state == "open"
+
+
+def test_half_open_trial_closes_breaker(server, make_client):
+    server.routes[EMBEDDING_PATH] = [(500, {}), (200, {"embedding": [1.0]})]
+    client = make_client(server.url, max_retries=0, circuit_failure_threshold=1, circuit_reset_seconds=0.2)
+
+    async def calls():
+        with pytest.raises(ScentlensClientError):
+            await client.compute_embedding(b"image")
+        assert client.breaker.state == "open"
+        await asyncio.sleep(0.25)
+
+        server.delay = 0.2
+        trial = asyncio.create_task(client.compute_embedding(b"image"))
+        await asyncio.sleep(0.05)
+        # 시험 호출이 진행 중인 동안 다른 호출은 차단
+        with pytest.raises(CircuitOpenError):
+            await client.compute_embedding(b"image")
+        assert await trial == [1.0]
+
+    run(calls, client)
+    assert client.breaker.state == "closed"
+    assert server.count(EMBEDDING_PATH) == 2
+
+
+def test_half_open_trial_released_after_cancellation(server, make_client):
+    server.routes[EMBEDDING_PATH] = [(500, {}), (200, {"embedding": [1.0]})]
+    client = make_client(server.url, max_retries=0, circuit_failure_threshold=1, circuit_reset_seconds=0.1)
+
+    async def calls():
+        with pytest.raises(ScentlensClientError):
+            await client.compute_embedding(b"image")
+        await asyncio.sleep(0.15)
+
+        server.delay = 0.5
+        trial = asyncio.create_task(client.compute_embedding(b"image"))
+        await asyncio.sleep(0.05)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        assert client.breaker.half_open_trial is False
+
+        server.delay = 0.0
+        return await client.compute_embedding(b"image")
+
+    assert run(calls, client) == [1.0]
+    assert client.breaker.state == "closed"
+
+
+def test_half_open_trial_released_after_unexpected_error(server, make_client):
+    server.routes[EMBEDDING_PATH] = [(500, {})]
+    client = make_client(server.url, max_retries=0, circuit_failure_threshold=1, circuit_reset_seconds=0.1)
+
+    async def calls():
+        with pytest.raises(ScentlensClientError):
+            await client.compute_embedding(b"image")
+        await asyncio.sleep(0.15)
+        # 요청 본문 직렬화 실패처럼 성공/실패가 기록되지 않는 예외
+        with pytest.raises(TypeError):
+            await client._post(EMBEDDING_PATH, json=object())
+
+    run(calls, client)
+    assert client.breaker.half_open_trial is False
+    assert client.breaker.state == "half-open"
+
+
+def test_connection_errors_are_retried(make_client):
+    stub = StubServer()
+    url = stub.url
+    stub.close()  # 닫힌 포트로 연결 실패 유도
+    client = make_client(url, max_retries=2, circuit_failure_threshold=5)
+
+    with pytest.raises(ScentlensClientError, match="failed after 3 attempts. ConnectError"):
+        run(lambda: client.compute_embedding(b"image"), client)
+    assert client.breaker.failures == 1
+
+
+def test_chunked_init_keeps_order_and_counts_failed_chunks(server, make_client):
+    def download(images):
+        if any(image["id"] == 3 for image in images):
+            return 400, {"detail": "download failed"}
+        return 200, [{**image, "path": f"/tmp/{image['id']}.jpg"} for image in images]
+
+    server.routes["/download_images/"] = [download]
+    server.routes["/get_or_compute_embeddings/"] = [lambda images: (200, [{"id": image["id"], "embedding": [image["id"]]} for image in images])]
+    server.delay = 0.05
+    client = make_client(server.url, max_retries=0, init_chunk_size=2, init_concurrency=2)
+    images = [{"id": i, "url": f"https://example.com/{i}.jpg"} for i in range(1, 8)]
+
+    embeddings, failed_chunks = run(lambda: client.download_and_compute_embeddings(images), client)
+
+    # 청크: [1, 2], [3, 4](실패), [5, 6], [7]
+    assert [item["id"] for item in embeddings] == [1, 2, 5, 6, 7]
+    assert failed_chunks == 1
+    assert server.count("/download_images/") == 4
+    assert server.count("/get_or_compute_embeddings/") == 3
+    assert server.max_in_flight <= 2
@@ -0,0 +1,95 @@
+import faiss
+import numpy as np
+import pytest
+from services import scentlens_index
+from services.scentlens_index import IndexConfig, ProductIndex, ScentlensIndexStore, build_cpu_index, normalize_query, to_cpu, update_cpu_index
+
+
+def normalized(rows: int, dimension: int = 8, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(rows, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def fake_gpu(monkeypatch):
+    """IndexFlatIP를 GPU 인덱스로 취급 (to_device 결과인 'GPU 인덱스를 감싼 IndexIDMap2'를 흉내)"""
+    conversions = []
+
+    def index_gpu_to_cpu(index):
+        conversions.append(index)
+        return faiss.clone_index(index)
+
+    monkeypatch.setattr(faiss, "GpuIndex", faiss.IndexFlatIP, raising=False)
+    monkeypatch.setattr(faiss, "index_gpu_to_cpu", index_gpu_to_cpu, raising=False)
+    return conversions
+
+
+def test_to_cpu_converts_id_map_wrapping_gpu_index(fake_gpu):
+    index = build_cpu_index(normalized(4), IndexConfig(index_type="flat"), ids=np.arange(4))
+
+    assert to_cpu(index) is not index
+    assert fake_gpu == [index]
+
+
+def test_update_cpu_index_on_wrapped_gpu_index(fake_gpu):
+    embeddings = normalized(6)
+    index = build_cpu_index(embeddings[:4], IndexConfig(index_type="flat"), ids=np.arange(4))
+
+    updated = update_cpu_index(
+        index,
+        embeddings=embeddings[[0, 2, 3, 4, 5]],
+        ids=np.array([0, 2, 3, 4, 5]),
+        removed_ids=np.array([1]),
+        added_embeddings=embeddings[4:],
+        added_ids=np.array([4, 5]),
+        config=IndexConfig(index_type="flat"),
+    )
+
+    assert fake_gpu == [index]
+    assert index.ntotal == 4  # 검색 중인 원본은 수정하지 않음
+    assert updated.ntotal == 5
+    _, labels = updated.search(embeddings[5:6], 1)
+    assert labels[0][0] == 5
+
+
+def test_save_and_load_wrapped_gpu_index(fake_gpu, tmp_path, monkeypatch):
+    monkeypatch.setattr(scentlens_index, "use_gpu", lambda: False)
+    embeddings = normalized(3)
+    images = [{"id": 10 + i, "product_id": i, "url": f"https://example.com/{i}.jpg"} for i in range(3)]
+    index = build_cpu_index(embeddings, IndexConfig(index_type="flat"), ids=np.array([image["id"] for image in images]))
+    store = ScentlensIndexStore(str(tmp_path), IndexConfig(index_type="flat", product_aggregation="none"))
+
+    store.save(index, embeddings, images, "test-model")
+
+    assert fake_gpu == [index]
+    loaded_index, _, loaded_images, _ = store.load("test-model")
+    assert loaded_images == images
+    _, labels = loaded_index.search(embeddings[1:2], 1)
+    assert labels[0][0] == 11
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_search_scores_are_cosine_similarities(index_type):
+    embeddings = normalized(32)
+    index = build_cpu_index(embeddings, IndexConfig(index_type=index_type))
+    # ConvNeXt pooler_output처럼 크기가 큰 쿼리도 점수는 쿼리 크기와 무관한 코사인 유사도
+    raw_query = embeddings[5] * 40.0 + normalized(1, seed=1)[0]
+
+    D, I = index.search(normalize_query(raw_query), 32)
+
+    expected = embeddings @ (raw_query / np.linalg.norm(raw_query))
+    assert I[0][0] == 5
+    assert np.all(D[0] <= 1.0 + 1e-5) and np.all(D[0] >= -1.0 - 1e-5)
+    np.testing.assert_allclose(D[0], expected[I[0]], rtol=1e-4, atol=1e-5)
+    np.testing.assert_allclose(index.search(normalize_query(raw_query * 0.01), 32)[0], D, rtol=1e-4, atol=1e-5)
+
+
+def test_product_index_scores_are_cosine_similarities():
+    embeddings = normalized(6)
+    images = [{"product_id": product_id} for product_id in (1, 1, 2, 2, 3, 3)]
+    product_index = ProductIndex.build_cpu(embeddings, images, "mean", IndexConfig(index_type="flat"))
+
+    scores = [similarity for _, similarity in product_index.search(normalize_query(embeddings[0] * 25.0), 3)]
+
+    assert len(scores) == 3
+    assert all(-1.0 - 1e-5 <= score <= 1.0 + 1e-5 for score in scores)
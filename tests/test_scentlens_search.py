@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+from services.scentlens_index import IndexConfig, ProductIndex, build_cpu_index, match_products, match_products_by_product, normalize_query
+
+
+def product(id_: int) -> dict:
+    return {"id": id_, "name_kr": f"향수{id_}", "brand": "브랜드", "content": f"설명{id_}"}
+
+
+def catalog(similarities, product_ids):
+    """쿼리 [1, 0]에 대한 코사인 유사도가 similarities인 이미지들로 (인덱스, image_by_id, product_by_id) 구성"""
+    embeddings = np.array([[s, np.sqrt(1 - s * s)] for s in similarities], dtype=np.float32)
+    ids = np.arange(1, len(similarities) + 1)
+    index = build_cpu_index(embeddings, IndexConfig(index_type="flat"), ids=ids)
+    image_by_id = {int(i): {"id": int(i), "url": f"http://img/{i}", "product_id": product_id} for i, product_id in zip(ids, product_ids)}
+    product_by_id = {product_id: product(product_id) for product_id in set(product_ids)}
+    return index, image_by_id, product_by_id
+
+
+class CountingIndex:
+    """index.search 호출마다 요청한 후보 수를 기록"""
+
+    def __init__(self, index):
+        self.index = index
+        self.ntotal = index.ntotal
+        self.requests = []
+
+    def search(self, query, k):
+        self.requests.append(k)
+        return self.index.search(query, k)
+
+
+def test_keeps_best_image_per_product_and_hydrates():
+    index, image_by_id, product_by_id = catalog([0.9, 0.8, 0.7, 0.2], [1, 1, 2, 3])
+
+    results = match_products(index, normalize_query([1.0, 0.0]), image_by_id, product_by_id, threshold=0.3)
+
+    assert [result["id"] for result in results] == [1, 2]
+    assert results[0] == {
+        "id": 1, "name": "향수1", "brand": "브랜드", "content": "설명1", "similarity": pytest.approx(0.9), "url": "http://img/1",
+    }
+    assert results[1]["url"] == "http://img/3"
+
+
+def test_skips_images_of_unknown_products():
+    index, image_by_id, product_by_id = catalog([0.9, 0.8], [1, 2])
+    del product_by_id[1]
+
+    results = match_products(index, normalize_query([1.0, 0.0]), image_by_id, product_by_id, threshold=0.3)
+
+    assert [result["id"] for result in results] == [2]
+
+
+@pytest.mark.parametrize("scale", [0.01, 1.0, 40.0])
+def test_threshold_is_cosine_similarity_regardless_of_query_norm(scale):
+    index, image_by_id, product_by_id = catalog([1.0, 0.6, 0.2], [1, 2, 3])
+
+    results = match_products(index, normalize_query([scale, 0.0]), image_by_id, product_by_id, threshold=0.3)
+
+    assert [result["id"] for result in results] == [1, 2]
+    np.testing.assert_allclose([result["similarity"] for result in results], [1.0, 0.6], atol=1e-5)
+
+
+def test_stops_after_one_search_when_threshold_is_reached():
+    index, image_by_id, product_by_id = catalog([0.9 - 0.01 * i for i in range(40)], list(range(40)))
+    counting = CountingIndex(index)
+
+    results = match_products(counting, normalize_query([1.0, 0.0]), image_by_id, product_by_id, threshold=0.85, max_results=10)
+
+    assert len(results) == 5
+    assert counting.requests == [20]
+
+
+def test_doubles_candidates_while_all_pass_and_stops_at_limit():
+    # 상품 2개에 이미지가 많아 상품 수가 부족하지만 모든 후보가 threshold 이상
+    similarities = [0.95 - 0.001 * i for i in range(100)]
+    index, image_by_id, product_by_id = catalog(similarities, [1] * 99 + [2])
+    counting = CountingIndex(index)
+
+    results = match_products(counting, normalize_query([1.0, 0.0]), image_by_id, product_by_id, threshold=0.3, max_results=10, max_candidates=64)
+
+    assert counting.requests == [20, 40, 64]  # 후보 수 상한(max_candidates)에서 종료
+    assert [result["id"] for result in results] == [1]
+
+
+def test_ignores_missing_ids_from_approximate_index():
+    index, image_by_id, product_by_id = catalog([0.9, 0.8], [1, 2])
+
+    class PaddedIndex(CountingIndex):
+        def search(self, query, k):
+            D, I = self.index.search(query, min(k, self.ntotal))
+            return np.pad(D, ((0, 0), (0, 2)), constant_values=-1.0), np.pad(I, ((0, 0), (0, 2)), constant_values=-1)
+
+    results = match_products(PaddedIndex(index), normalize_query([1.0, 0.0]), image_by_id, product_by_id, threshold=0.3)
+
+    assert [result["id"] for result in results] == [1, 2]
+
+
+def test_empty_index_returns_nothing():
+    assert match_products(None, normalize_query([1.0, 0.0]), {}, {}, threshold=0.3) == []
+
+
+def test_product_index_reranks_by_best_image():
+    similarities = [0.95, 0.1, 0.7, 0.7]  # 상품 1은 평균이 낮지만 가장 비슷한 이미지를 가짐
+    embeddings = np.array([[s, np.sqrt(1 - s * s)] for s in similarities], dtype=np.float32)
+    images = [{"id": i, "url": f"http://img/{i}", "product_id": product_id} for i, product_id in enumerate([1, 1, 2, 2])]
+    product_index = ProductIndex.build_cpu(embeddings, images, "mean", IndexConfig(index_type="flat"))
+    product_by_id = {1: product(1), 2: product(2)}
+    query = normalize_query([1.0, 0.0])
+
+    without_rerank = match_products_by_product(product_index, query, embeddings, images, product_by_id, threshold=0.3)
+    reranked = match_products_by_product(product_index, query, embeddings, images, product_by_id, threshold=0.3, rerank_candidates=2)
+
+    assert [result["id"] for result in without_rerank] == [2, 1]
+    assert [result["id"] for result in reranked] == [1, 2]
+    assert reranked[0]["url"] == "http://img/0"
+    assert reranked[0]["similarity"] == pytest.approx(0.95)
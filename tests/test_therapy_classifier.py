@@ -0,0 +1,56 @@
+import json
+import pytest
+from services.therapy_classifier import TherapyClassifier, parse_category, parse_effects
+
+
+def logged(classifier) -> list:
+    try:
+        with open(classifier.log_path, "r", encoding="utf-8") as f:
+            return [{key: record[key] for key in ("category_id", "effects")} for record in map(json.loads, f)]
+    except FileNotFoundError:
+        return []
+
+
+@pytest.fixture
+def classifier(tmp_path):
+    # 모델이 없으므로 카테고리/효능 모두 GPT 분류 사용
+    return TherapyClassifier(model_dir=str(tmp_path), log_dir=str(tmp_path))
+
+
+@pytest.mark.parametrize("response, category_id", [("1", 1), (" 2 ", 2), ("3", None), ("디퓨저", None), ("", None)])
+def test_parse_category(response, category_id):
+    assert parse_category(response) == category_id
+
+
+@pytest.mark.parametrize("response, effects", [("4", [4]), ("3, 6", [3, 6]), ("7", None), ("수면", None), ("", None)])
+def test_parse_effects(response, effects):
+    assert parse_effects(response) == effects
+
+
+def test_logs_parsed_gpt_results(classifier):
+    assert classifier.classify("잠이 안 와요", lambda: 1, lambda: [4]) == (1, [4])
+
+    assert logged(classifier) == [{"category_id": 1, "effects": [4]}]
+
+
+def test_unparsed_side_uses_default_and_is_not_logged(classifier):
+    assert classifier.classify("잠이 안 와요", lambda: None, lambda: [4]) == (2, [4])
+    assert classifier.classify("기분 전환", lambda: 1, lambda: None) == (1, [3])
+
+    assert logged(classifier) == [{"category_id": None, "effects": [4]}, {"category_id": 1, "effects": None}]
+    assert classifier.snapshot()["calls"]["gpt_unparsed"] == 2
+
+
+def test_nothing_logged_when_no_gpt_answer_parses(classifier):
+    assert classifier.classify("음", lambda: None, lambda: None) == (2, [3])
+
+    assert logged(classifier) == []
+
+
+def test_gpt_errors_are_not_logged(classifier):
+    def gpt_category():
+        raise RuntimeError("openai down")
+
+    with pytest.raises(RuntimeError):
+        classifier.classify("잠이 안 와요", gpt_category, lambda: [4])
+    assert logged(classifier) == []
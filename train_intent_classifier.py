@@ -0,0 +1,106 @@
+"""
+로컬 의도 분류기 학습/평가
+
+GPT가 분류한 (입력, 의도) 로그(cache/intent_logs/{task}.jsonl)로 KLUE-SRoBERTa 임베딩 + 로지스틱 회귀 분류기를 학습합니다.
+
+1. 로그를 학습/평가 데이터로 나눠 평가 리포트를 출력합니다.
+   - 전체 정확도와 의도별 precision/recall
+   - threshold별 커버리지(GPT 호출 없이 처리되는 비율)와 그 요청들의 정확도
+2. 전체 로그로 다시 학습해 {INTENT_MODEL_DIR}/{task}.joblib에 저장하고, 평가 리포트를 {task}_report.json으로 저장합니다.
+
+사용 예:
+    python train_intent_classifier.py --task chat_intent
+    python train_intent_classifier.py --task product_intent --log cache/intent_logs/product_intent.jsonl --test-size 0.3
+    python train_intent_classifier.py --task chat_intent --dry-run
+"""
+import os
+import json
+import argparse
+import numpy as np
+from services.diffuser_index import embed_texts
+from services.intent_classifier import INTENT_CLASSIFIERS, load_samples, train_classifier
+
+try:
+    from sklearn.metrics import classification_report
+    from sklearn.model_selection import train_test_split
+except ImportError:
+    classification_report = None
+    train_test_split = None
+
+
+def coverage_report(classifier, texts, labels, thresholds) -> tuple:
+    probabilities = classifier.predict_proba(embed_texts(texts))
+    predicted = classifier.classes_[probabilities.argmax(axis=1)]
+    confidence = probabilities.max(axis=1)
+    correct = predicted == np.asarray(labels)
+    rows = []
+    for threshold in thresholds:
+        local = confidence >= threshold
+        rows.append({
+            "threshold": threshold,
+            "coverage": round(float(local.mean()), 3),
+            "local_accuracy": round(float(correct[local].mean()), 3) if local.any() else None,
+        })
+    return rows, predicted
+
+
+def main(args):
+    if train_test_split is None:
+        raise SystemExit("scikit-learn이 필요합니다: pip install scikit-learn")
+
+    intent_classifier = INTENT_CLASSIFIERS[args.task]
+    log_path = args.log or intent_classifier.log_path
+    texts, labels = load_samples(log_path)
+    print(f"[{args.task}] 샘플 {len(texts)}개 ({log_path})")
+    for label in sorted(set(labels)):
+        print(f"  의도 {label}: {labels.count(label)}개")
+    if len(set(labels)) < 2:
+        raise SystemExit("의도가 두 가지 이상 기록되어야 학습할 수 있습니다.")
+
+    # 1. 평가 (층화 분할, 샘플이 적은 의도가 있으면 무작위 분할)
+    stratify = labels if min(labels.count(label) for label in set(labels)) >= 2 else None
+    train_texts, test_texts, train_labels, test_labels = train_test_split(
+        texts, labels, test_size=args.test_size, random_state=args.seed, stratify=stratify
+    )
+    classifier = train_classifier(train_texts, train_labels, c=args.c)
+    thresholds = sorted(set(args.thresholds + [intent_classifier.threshold]))
+    coverage, predicted = coverage_report(classifier, test_texts, test_labels, thresholds)
+    accuracy = float((predicted == np.asarray(test_labels)).mean())
+
+    print(f"\n평가 (학습 {len(train_texts)}개 / 평가 {len(test_texts)}개)")
+    print(f"정확도: {accuracy:.3f}")
+    print(classification_report(test_labels, predicted, zero_division=0))
+    print(f"{'threshold':>10} {'coverage':>10} {'local_acc':>10}")
+    for row in coverage:
+        local_accuracy = "-" if row["local_accuracy"] is None else f"{row['local_accuracy']:.3f}"
+        marker = "  <- 현재 설정" if row["threshold"] == intent_classifier.threshold else ""
+        print(f"{row['threshold']:>10.2f} {row['coverage']:>10.3f} {local_accuracy:>10}{marker}")
+
+    metrics = {
+        "accuracy": round(accuracy, 3),
+        "test_samples": len(test_texts),
+        "coverage": coverage,
+        "report": classification_report(test_labels, predicted, zero_division=0, output_dict=True),
+    }
+    if args.dry_run:
+        return
+
+    # 2. 전체 데이터로 재학습 후 저장
+    classifier = train_classifier(texts, labels, c=args.c)
+    intent_classifier.save(classifier, samples=len(texts), metrics={key: metrics[key] for key in ("accuracy", "test_samples", "coverage")})
+    report_path = os.path.join(os.path.dirname(intent_classifier.model_path), f"{args.task}_report.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(metrics, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 저장 완료: {intent_classifier.model_path}, {report_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="local intent classifier training")
+    parser.add_argument("--task", choices=sorted(INTENT_CLASSIFIERS), default="chat_intent")
+    parser.add_argument("--log", help="의도 로그 경로 (기본: cache/intent_logs/{task}.jsonl)")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--c", type=float, default=1.0, help="로지스틱 회귀 규제 강도의 역수")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.5, 0.7, 0.8, 0.9, 0.95])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dry-run", action="store_true", help="평가만 하고 모델은 저장하지 않음")
+    main(parser.parse_args())
@@ -0,0 +1,147 @@
+"""
+로컬 테라피 카테고리/효능 분류기 학습/평가
+
+GPT가 분류한 테라피 로그(cache/intent_logs/therapy.jsonl)로
+카테고리(1: 향수, 2: 디퓨저) 분류기와 효능(1~6) 다중 라벨 분류기를 학습합니다.
+
+1. 로그를 학습/평가 데이터로 나눠 평가 리포트를 출력합니다.
+   - 카테고리 정확도, 효능 정확 일치율(exact match)과 효능별 precision/recall
+   - threshold별 커버리지(GPT 호출 없이 처리되는 비율)와 그 요청들의 정확도
+2. 전체 로그로 다시 학습해 {INTENT_MODEL_DIR}/therapy.joblib에 저장하고, 평가 리포트를 therapy_report.json으로 저장합니다.
+
+사용 예:
+    python train_therapy_classifier.py
+    python train_therapy_classifier.py --log cache/intent_logs/therapy.jsonl --test-size 0.3 --dry-run
+"""
+import os
+import json
+import argparse
+import numpy as np
+from services.diffuser_index import embed_texts
+from services.therapy_classifier import THERAPY_EFFECTS, therapy_classifier, therapy_probabilities, train_therapy_classifier
+
+try:
+    from sklearn.metrics import classification_report
+    from sklearn.model_selection import train_test_split
+except ImportError:
+    classification_report = None
+    train_test_split = None
+
+
+def load_therapy_samples(log_path: str):
+    """테라피 로그 읽기 (같은 입력은 마지막으로 기록된 카테고리/효능 사용)"""
+    samples = {}
+    with open(log_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            sample = samples.setdefault(record["user_input"], {"category_id": None, "effects": None})
+            if record.get("category_id") is not None:
+                sample["category_id"] = int(record["category_id"])
+            if record.get("effects"):
+                sample["effects"] = [int(effect) for effect in record["effects"] if int(effect) in THERAPY_EFFECTS]
+    texts = list(samples.keys())
+    return texts, [samples[text]["category_id"] for text in texts], [samples[text]["effects"] for text in texts]
+
+
+def evaluate(models: dict, texts, category_ids, effects, thresholds) -> dict:
+    perfume_probability, effect_probabilities = therapy_probabilities(models, embed_texts(texts))
+    metrics = {"test_samples": len(texts), "coverage": []}
+
+    category_rows = [i for i, category_id in enumerate(category_ids) if category_id is not None]
+    effect_rows = [i for i, effect_list in enumerate(effects) if effect_list]
+    if perfume_probability is not None and category_rows:
+        predicted = np.where(perfume_probability >= 0.5, 1, 2)
+        truth = np.asarray([category_ids[i] for i in category_rows])
+        metrics["category_accuracy"] = round(float((predicted[category_rows] == truth).mean()), 3)
+    if effect_probabilities is not None and effect_rows:
+        labels = models["effect_labels"]
+        predicted_sets = [{label for label, p in zip(labels, row) if p >= 0.5} for row in effect_probabilities]
+        metrics["effects_exact_match"] = round(float(np.mean([predicted_sets[i] == set(effects[i]) for i in effect_rows])), 3)
+        truth_matrix = np.asarray([[label in effects[i] for label in labels] for i in effect_rows], dtype=int)
+        predicted_matrix = np.asarray([[label in predicted_sets[i] for label in labels] for i in effect_rows], dtype=int)
+        metrics["effects_report"] = classification_report(
+            truth_matrix, predicted_matrix, target_names=[str(label) for label in labels], zero_division=0, output_dict=True
+        )
+
+    # threshold별로 TherapyClassifier.predict와 같은 기준으로 로컬 처리 여부 판단
+    for threshold in thresholds:
+        low = 1 - threshold
+        local_category, local_effects, category_correct, effects_correct = 0, 0, 0, 0
+        for i in range(len(texts)):
+            if perfume_probability is not None and category_ids[i] is not None:
+                probability = perfume_probability[i]
+                if probability >= threshold or probability <= low:
+                    local_category += 1
+                    category_correct += (1 if probability >= threshold else 2) == category_ids[i]
+            if effect_probabilities is not None and effects[i]:
+                row = effect_probabilities[i]
+                if all(p >= threshold or p <= low for p in row) and (row >= threshold).any():
+                    local_effects += 1
+                    effects_correct += {label for label, p in zip(models["effect_labels"], row) if p >= threshold} == set(effects[i])
+        metrics["coverage"].append({
+            "threshold": threshold,
+            "category_coverage": round(local_category / len(category_rows), 3) if category_rows else None,
+            "category_local_accuracy": round(category_correct / local_category, 3) if local_category else None,
+            "effects_coverage": round(local_effects / len(effect_rows), 3) if effect_rows else None,
+            "effects_local_accuracy": round(effects_correct / local_effects, 3) if local_effects else None,
+        })
+    return metrics
+
+
+def main(args):
+    if train_test_split is None:
+        raise SystemExit("scikit-learn이 필요합니다: pip install scikit-learn")
+
+    log_path = args.log or therapy_classifier.log_path
+    texts, category_ids, effects = load_therapy_samples(log_path)
+    print(f"[therapy] 샘플 {len(texts)}개 ({log_path})")
+    print(f"  카테고리 라벨 {sum(c is not None for c in category_ids)}개, 효능 라벨 {sum(bool(e) for e in effects)}개")
+
+    # 1. 평가
+    indices = list(range(len(texts)))
+    train_indices, test_indices = train_test_split(indices, test_size=args.test_size, random_state=args.seed)
+    pick = lambda values, rows: [values[i] for i in rows]
+    models = train_therapy_classifier(pick(texts, train_indices), pick(category_ids, train_indices), pick(effects, train_indices), c=args.c)
+    if models["category"] is None and models["effects"] is None:
+        raise SystemExit("학습할 수 있는 카테고리/효능 라벨이 부족합니다.")
+    thresholds = sorted(set(args.thresholds + [therapy_classifier.threshold]))
+    metrics = evaluate(models, pick(texts, test_indices), pick(category_ids, test_indices), pick(effects, test_indices), thresholds)
+
+    print(f"\n평가 (학습 {len(train_indices)}개 / 평가 {len(test_indices)}개)")
+    print(f"카테고리 정확도: {metrics.get('category_accuracy', '-')}")
+    print(f"효능 정확 일치율: {metrics.get('effects_exact_match', '-')}")
+    for label, row in metrics.get("effects_report", {}).items():
+        if label.isdigit():
+            print(f"  효능 {label}: precision={row['precision']:.3f} recall={row['recall']:.3f} support={row['support']}")
+    print(f"\n{'threshold':>10} {'cat_cov':>8} {'cat_acc':>8} {'eff_cov':>8} {'eff_acc':>8}")
+    for row in metrics["coverage"]:
+        values = [row[key] for key in ("category_coverage", "category_local_accuracy", "effects_coverage", "effects_local_accuracy")]
+        marker = "  <- 현재 설정" if row["threshold"] == therapy_classifier.threshold else ""
+        print(f"{row['threshold']:>10.2f} " + " ".join(f"{'-' if v is None else f'{v:.3f}':>8}" for v in values) + marker)
+    if args.dry_run:
+        return
+
+    # 2. 전체 데이터로 재학습 후 저장
+    models = train_therapy_classifier(texts, category_ids, effects, c=args.c)
+    therapy_classifier.save(models, samples=len(texts), metrics={key: value for key, value in metrics.items() if key != "effects_report"})
+    report_path = os.path.join(os.path.dirname(therapy_classifier.model_path), "therapy_report.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(metrics, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 저장 완료: {therapy_classifier.model_path}, {report_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="local therapy category/effect classifier training")
+    parser.add_argument("--log", help="테라피 로그 경로 (기본: cache/intent_logs/therapy.jsonl)")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--c", type=float, default=1.0, help="로지스틱 회귀 규제 강도의 역수")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.6, 0.7, 0.8, 0.9])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dry-run", action="store_true", help="평가만 하고 모델은 저장하지 않음")
+    main(parser.parse_args())